@@ -0,0 +1,108 @@
+# benchmarks/audit_search.py
+"""
+Audit log search over millions of rows: index build time, insert cost
+with the FTS triggers, and page latency for text + filter queries.
+
+    python -m benchmarks.audit_search --rows 2000000
+"""
+import argparse
+import os
+import random
+import time
+
+from benchmarks.seed import make_db, percentile
+from database import audit_search
+from database.db import get_conn
+
+EVENTS = (
+    ("TRANSFER", lambda r: f"To 4000{r.randrange(10**12):012d}"),
+    ("BILL_PAYMENT", lambda r: f"MERALCO-{r.randrange(10**8):08d}"),
+    ("LOGIN_FAIL", lambda r: f"Card {r.randrange(10**8):08d}"),
+    ("LOGIN_SUCCESS", lambda r: "Card login"),
+    ("CASH_DEPOSIT", lambda r: f"{r.randint(1, 9)}x1000, {r.randint(0, 5)}x500"),
+    ("CREATE_ACCOUNT", lambda r: f"Admin created account {r.randrange(10**8):08d}"),
+)
+
+QUERIES = (
+    dict(text="card"),
+    dict(text="admin created"),
+    dict(text="4000123"),
+    dict(text="meralco", event_type="BILL_PAYMENT"),
+    dict(text="card", account_id=42),
+    dict(event_type="LOGIN_FAIL"),
+    dict(account_id=4242),
+    dict(text="login", since="2026-06-01", until="2026-07-01"),
+    dict(text="1x1000", since="2026-06-01", until="2026-07-01"),
+)
+
+
+def fill(rows, accounts, seed=7):
+    """rows audit entries over the past year, written before the index exists."""
+    r = random.Random(seed)
+    start = time.time() - 365 * 86400
+
+    def entries():
+        for i in range(rows):
+            event, details = r.choice(EVENTS)
+            ts = time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.gmtime(start + i * 365 * 86400 / rows)
+            )
+            yield ts, r.randint(1, accounts), event, r.uniform(0, 5000), details(r)
+
+    with get_conn() as con:
+        con.executemany("""
+            INSERT INTO audit_log (ts, account_id, event_type, amount, details)
+            VALUES (?, ?, ?, ?, ?)
+        """, entries())
+        con.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = make_db(10)
+    try:
+        fill(args.rows, args.accounts)
+
+        t = time.perf_counter()
+        audit_search.init_db()
+        print(f"index build ({args.rows:,} rows): {time.perf_counter() - t:.1f}s")
+
+        with get_conn() as con:
+            n = 10_000
+            t = time.perf_counter()
+            con.executemany(
+                "INSERT INTO audit_log (account_id, event_type, details) VALUES (?, ?, ?)",
+                ((i, "TRANSFER", f"To 4000{i:012d}") for i in range(n))
+            )
+            con.commit()
+            print(f"insert with triggers: {(time.perf_counter() - t) / n * 1e6:.1f} µs/row")
+
+            for query in QUERIES:
+                first, second = [], []
+                for _ in range(args.repeat):
+                    page = audit_search.search(conn=con, **query)
+                    first.append(page["seconds"])
+                    if page["next_before"] is not None:
+                        older = audit_search.search(
+                            conn=con, before=page["next_before"], **query
+                        )
+                        second.append(older["seconds"])
+                print(
+                    f"{str(query):<70} rows={len(page['rows']):>3} "
+                    f"p50={percentile(first, 50) * 1000:6.2f} ms "
+                    f"p99={percentile(first, 99) * 1000:6.2f} ms "
+                    f"page2 p50={percentile(second, 50) * 1000:6.2f} ms"
+                )
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/backup_load.py
+"""
+Online backup throughput and its effect on live postings.
+
+    python -m benchmarks.backup_load --accounts 50000 --pages 64
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+from benchmarks.bill_runner import measure
+from benchmarks.seed import make_db, percentile
+from database import backup, idempotency, journal, ledger, limits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=50000)
+    parser.add_argument("--pages", type=int, default=backup.STEP_PAGES)
+    parser.add_argument("--sleep", type=float, default=backup.STEP_SLEEP)
+    args = parser.parse_args()
+
+    path = make_db(args.accounts)
+    for mod in (journal, ledger, idempotency, limits):
+        mod.init_db()
+    backup_dir = tempfile.mkdtemp(prefix="kiosk-backups-")
+
+    try:
+        idle, _ = measure(args.accounts, 2.0)
+        busy, report = measure(
+            args.accounts, 0,
+            lambda: backup.backup(backup_dir, pages=args.pages, sleep=args.sleep)
+        )
+    finally:
+        shutil.rmtree(backup_dir)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    print(
+        f"{report['pages']} pages, {report['bytes'] / 1048576:.1f} MB in "
+        f"{report['seconds']:.2f}s ({report['mb_per_sec']:.1f} MB/s), "
+        f"gzip {report['compressed_bytes'] / 1048576:.1f} MB"
+    )
+    print(
+        f"inside copy steps {report['lock_seconds'] * 1000:.0f} ms, "
+        f"longest step {report['max_step_ms']:.1f} ms, {report['restarts']} restarts"
+    )
+    for name, samples in (("idle", idle), ("during backup", busy)):
+        print(
+            f"live posting ms ({name}): p50={percentile(samples, 50) * 1000:.2f} "
+            f"p99={percentile(samples, 99) * 1000:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
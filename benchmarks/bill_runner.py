@@ -0,0 +1,80 @@
+# benchmarks/bill_runner.py
+"""
+Scheduled bill runner throughput, and what it does to live postings.
+
+    python -m benchmarks.bill_runner --schedules 20000 --chunk 200
+
+A background thread keeps posting deposits the way a kiosk would while
+the runner drains the due schedules; its latency is reported both ways.
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks.seed import make_db, percentile
+from database import db, idempotency, journal, ledger, limits, scheduled
+
+
+def live_postings(accounts, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            ledger.post(random.randint(1, accounts), "deposit", 1.0)
+        except ledger.PostingError:
+            pass
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.005)
+
+
+def measure(accounts, seconds, during=None):
+    latencies = []
+    stop = threading.Event()
+    thread = threading.Thread(target=live_postings, args=(accounts, stop, latencies))
+    thread.start()
+    result = during() if during else time.sleep(seconds)
+    stop.set()
+    thread.join()
+    return latencies, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--schedules", type=int, default=20000)
+    parser.add_argument("--chunk", type=int, default=scheduled.CHUNK_SIZE)
+    args = parser.parse_args()
+
+    # Small bills keep the run under the kiosk-wide daily limit
+    make_db(args.accounts, balance=100.0)
+    for mod in (journal, ledger, idempotency, limits, scheduled):
+        mod.init_db()
+
+    with db.get_conn() as con:
+        con.executemany("""
+            INSERT INTO scheduled_payments
+                (account_id, bill_ref, amount, interval_days, next_run)
+            VALUES (?, ?, ?, 30, datetime('now', '-1 day'))
+        """, (
+            (random.randint(1, args.accounts), f"BILL-{i}", random.choice((5.0, 20.0, 45.0)))
+            for i in range(args.schedules)
+        ))
+        con.commit()
+
+    idle, _ = measure(args.accounts, 2.0)
+    busy, summary = measure(args.accounts, 0, scheduled.BillRunner(args.chunk).run)
+
+    print(
+        f"paid={summary['paid']} failed={summary['failed']} "
+        f"chunks={summary['chunks']} in {summary['seconds']:.2f}s "
+        f"({summary['per_sec']:,.0f}/s)"
+    )
+    for name, samples in (("idle", idle), ("during run", busy)):
+        print(
+            f"live posting ms ({name}): p50={percentile(samples, 50) * 1000:.2f} "
+            f"p99={percentile(samples, 99) * 1000:.2f} max={max(samples) * 1000:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/cash_acceptor.py
+"""
+Note-to-screen latency and throughput of cash deposits under rapid
+insertion.
+
+A Simulator thread feeds notes to a CashAcceptor over tcp as fast as
+the escrow handshake allows (or every --interval seconds). Latency is
+the time from ESCROW being sent to the deposit screen's running count
+being repainted; the single posting on confirm is timed separately.
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.cash_acceptor --notes 500
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtWidgets import QApplication
+
+from benchmarks.seed import make_db, percentile
+from database import idempotency, intents, journal, ledger, limits
+from devices.cash_acceptor import CashAcceptor, Simulator, DENOMINATIONS, notes_text
+from screens.transaction import TransactionScreen
+
+
+class Probe(QObject):
+    """Connected after the screen, so it runs once the count is painted."""
+
+    def __init__(self):
+        super().__init__()
+        self.rendered = []
+
+    def on_counted(self, snap):
+        self.rendered.append(time.perf_counter())
+
+
+def feed(spec, notes, interval, sent):
+    sim = Simulator(spec)
+    try:
+        for _ in range(notes):
+            at = time.perf_counter()
+            if sim.insert(random.choice(DENOMINATIONS)):
+                sent.append(at)
+            if interval:
+                time.sleep(interval)
+    finally:
+        sim.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notes", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=7690)
+    args = parser.parse_args()
+
+    path = make_db(10, balance=0.0)
+    for mod in (journal, ledger, idempotency, limits, intents):
+        mod.init_db()
+
+    app = QApplication([])
+    spec = f"tcp://127.0.0.1:{args.port}"
+    acceptor = CashAcceptor(spec)
+    acceptor.start()
+
+    screen = TransactionScreen(lambda receipt: None, lambda: None)
+    screen.set_acceptor(acceptor)
+    probe = Probe()
+    acceptor.counted.connect(probe.on_counted)
+    screen.show()
+    screen.set_context("deposit", 1, 0.0)
+    app.processEvents()
+
+    sent = []
+    time.sleep(0.2)   # listener up
+    feeder = threading.Thread(
+        target=feed, args=(spec, args.notes, args.interval, sent), daemon=True
+    )
+    try:
+        start = time.perf_counter()
+        feeder.start()
+        while feeder.is_alive() or len(probe.rendered) < len(sent):
+            app.processEvents()
+            time.sleep(0.0005)
+        elapsed = time.perf_counter() - start
+
+        latencies = [r - s for s, r in zip(sent, probe.rendered)]
+        print(
+            f"notes={args.notes} stacked={len(sent)} in {elapsed:.2f}s "
+            f"({len(sent) / elapsed:.0f} notes/s)"
+        )
+        print(
+            f"note → screen ms: p50={percentile(latencies, 50) * 1000:.2f} "
+            f"p99={percentile(latencies, 99) * 1000:.2f} "
+            f"max={max(latencies, default=0) * 1000:.2f}"
+        )
+
+        t = time.perf_counter()
+        total = screen._close_cash()
+        posting = screen._post("deposit", total, notes_text(screen.cash["notes"]))
+        print(
+            f"confirm → posted: {(time.perf_counter() - t) * 1000:.2f} ms "
+            f"(one posting of {posting['amount']:.2f})"
+        )
+    finally:
+        acceptor.stop()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
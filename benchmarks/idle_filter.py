@@ -0,0 +1,88 @@
+# benchmarks/idle_filter.py
+"""
+Event-filter overhead under a synthetic input storm: the old per-event
+QTimer restart against IdleTracker's timestamp update.
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.idle_filter
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QObject, QTimer, QEvent, QPointF, Qt
+from PyQt5.QtGui import QMouseEvent
+from PyQt5.QtWidgets import QApplication, QWidget, QDialog
+
+from idle import IdleTracker
+
+
+class TimerRestartFilter(QObject):
+    """The previous MainWindow.eventFilter behaviour."""
+
+    def __init__(self):
+        super().__init__()
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setInterval(60_000)
+        self.idle_timer.start()
+
+    def eventFilter(self, obj, event):
+        if event.type() in (
+            QEvent.MouseMove,
+            QEvent.MouseButtonPress,
+            QEvent.KeyPress,
+            QEvent.KeyRelease
+        ):
+            self.idle_timer.start()
+        return False
+
+
+class _Dialog(QDialog):
+    def set_seconds(self, seconds):
+        pass
+
+
+def storm(app, target, events):
+    move = QMouseEvent(
+        QEvent.MouseMove, QPointF(10, 10), Qt.NoButton, Qt.NoButton, Qt.NoModifier
+    )
+    start = time.perf_counter()
+    for _ in range(events):
+        app.sendEvent(target, move)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200_000)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    target = QWidget()
+
+    baseline = storm(app, target, args.events)
+
+    results = {}
+    old = TimerRestartFilter()
+    app.installEventFilter(old)
+    results["timer restart"] = storm(app, target, args.events)
+    app.removeEventFilter(old)
+
+    tracker = IdleTracker(60, lambda: target, _Dialog(), lambda: None)
+    app.installEventFilter(tracker)
+    results["idle tracker"] = storm(app, target, args.events)
+    app.removeEventFilter(tracker)
+
+    print(f"events={args.events}")
+    print(f"{'no filter':<14} {baseline / args.events * 1e9:8.0f} ns/event")
+    for name, elapsed in results.items():
+        extra = (elapsed - baseline) / args.events * 1e9
+        print(
+            f"{name:<14} {elapsed / args.events * 1e9:8.0f} ns/event "
+            f"(+{extra:.0f} ns filter overhead)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/intent_recovery.py
+"""
+Boot recovery time with many interrupted postings.
+
+    python -m benchmarks.intent_recovery --intents 5000
+
+A third of the intents never reached the ledger, a third were posted
+but not audited (OPEN, so recovery has to look them up) and a third
+were audited but never showed a receipt.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import uuid
+
+from benchmarks.seed import make_db
+from database import db, idempotency, intents, journal, ledger, limits
+
+
+def seed(n, accounts):
+    with db.get_conn() as con:
+        rows = []
+        for i in range(n):
+            key = uuid.uuid4().hex
+            account_id = random.randint(1, accounts)
+            state, posting = "OPEN", None
+            if i % 3:
+                result = ledger.post(account_id, "deposit", 1.0, "", key, conn=con)
+                if i % 3 == 2:
+                    state, posting = "AUDITED", result
+            rows.append((key, account_id, "deposit", 1.0, "", state,
+                         posting and json.dumps(posting)))
+        con.executemany("""
+            INSERT INTO intents
+                (request_key, account_id, kind, amount, target, state, posting)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        con.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--intents", type=int, default=5000)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=intents.RECOVERY_BATCH)
+    args = parser.parse_args()
+
+    path = make_db(args.accounts)
+    intents.RECEIPT_DIR = tempfile.mkdtemp(prefix="kiosk-receipts-")
+    try:
+        for mod in (journal, ledger, idempotency, limits, intents):
+            mod.init_db()
+        # deposits of 1.0 each stay far under the daily limits
+        seed(args.intents, args.accounts)
+
+        summary = intents.recover(ledger, args.batch)
+        left = intents.open_count()
+    finally:
+        shutil.rmtree(intents.RECEIPT_DIR)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    print(
+        f"{args.intents} intents: {summary['finished']} finished "
+        f"({summary['audited']} audited), {summary['abandoned']} abandoned, "
+        f"{left} left open"
+    )
+    print(
+        f"recovery {summary['seconds'] * 1000:.0f} ms "
+        f"({args.intents / summary['seconds']:,.0f} intents/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/keypad_latency.py
+"""
+Key-to-render latency of the on-screen keypad, per field mode, against
+the cost of building the two QInputDialogs the old login used.
+
+A sample is one tap: Keypad.press() through to a synchronous repaint()
+of the field, so it includes formatting, setText and painting.
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.keypad_latency
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication, QInputDialog, QLineEdit
+
+from benchmarks.seed import percentile
+from widgets.keypad import KeypadField, Keypad, BACK, CLEAR, POINT
+
+# keys for one entry in each mode; CLEAR ends it so the next starts fresh
+SEQUENCES = {
+    "pin": ("1", "2", "3", "4", BACK, "4", CLEAR),
+    "card": tuple("4000123412341234") + (CLEAR,),
+    "digits": tuple("88021234567") + (CLEAR,),
+    "text": tuple("MER-2024/88AB") + (CLEAR,),
+    "amount": ("1", "2", "5", "0", "0", POINT, "7", "5", BACK, CLEAR),
+}
+
+
+def taps(app, keypad, field, mode, rounds):
+    field.set_mode(mode)
+    keypad.attach(field)
+    samples = []
+    for _ in range(rounds):
+        for key in SEQUENCES[mode]:
+            start = time.perf_counter()
+            keypad.press(key)
+            field.repaint()
+            samples.append(time.perf_counter() - start)
+        app.processEvents()
+    return samples
+
+
+def dialogs(app, logins):
+    """Build, show and close a card + PIN dialog pair per login."""
+    samples = []
+    for _ in range(logins):
+        start = time.perf_counter()
+        for echo in (QLineEdit.Normal, QLineEdit.Password):
+            dialog = QInputDialog()
+            dialog.setTextEchoMode(echo)
+            dialog.show()
+            app.processEvents()
+            dialog.close()
+            dialog.deleteLater()
+        app.processEvents()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--logins", type=int, default=100)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    field = KeypadField()
+    keypad = Keypad()
+    keypad.bind(field)
+    field.show()
+    keypad.show()
+    app.processEvents()
+
+    for mode in SEQUENCES:
+        samples = taps(app, keypad, field, mode, args.rounds)
+        print(
+            f"{mode:<7} taps={len(samples):>6}  "
+            f"p50={percentile(samples, 50) * 1000:.3f} ms  "
+            f"p99={percentile(samples, 99) * 1000:.3f} ms  "
+            f"max={max(samples) * 1000:.3f} ms"
+        )
+
+    start = time.perf_counter()
+    for _ in range(args.logins):
+        field.reset()
+    reset = (time.perf_counter() - start) / args.logins
+
+    samples = dialogs(app, args.logins)
+    print(f"keypad reset per login:   {reset * 1000:.3f} ms")
+    print(
+        f"QInputDialog pair/login:  p50={percentile(samples, 50) * 1000:.2f} ms "
+        f"p99={percentile(samples, 99) * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/ledger_load.py
+"""
+Load test for services.ledger_service with simulated kiosks.
+
+    python -m benchmarks.ledger_load --kiosks 50 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.seed import make_db, percentile
+
+# op mix per simulated kiosk request
+MIX = (
+    ("history", 0.6),
+    ("account", 0.2),
+    ("post", 0.2),
+)
+
+
+def _request(accounts):
+    account_id = random.randint(1, accounts)
+    op = random.choices([m[0] for m in MIX], [m[1] for m in MIX])[0]
+    if op == "post":
+        return op, {"account_id": account_id, "kind": "deposit", "amount": 1.0}
+    if op == "history":
+        return op, {"account_id": account_id, "limit": 20}
+    return op, {"account_id": account_id}
+
+
+async def kiosk(port, accounts, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    while time.perf_counter() < deadline:
+        op, args = _request(accounts)
+        start = time.perf_counter()
+        writer.write(json.dumps({"op": op, "args": args}).encode() + b"\n")
+        await writer.drain()
+        reply = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if not reply["ok"]:
+            errors.append(reply["error"])
+    writer.close()
+
+
+async def run(port, kiosks, accounts, seconds):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(
+        kiosk(port, accounts, deadline, latencies, errors)
+        for _ in range(kiosks)
+    ))
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kiosks", type=int, default=50)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+
+    path = make_db(args.accounts)
+    server = subprocess.Popen([
+        sys.executable, "-m", "services.ledger_service",
+        "--port", str(args.port), "--db", path
+    ])
+    try:
+        time.sleep(1.0)
+        latencies, errors = asyncio.run(
+            run(args.port, args.kiosks, args.accounts, args.seconds)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    total = len(latencies)
+    print(f"kiosks={args.kiosks} requests={total} errors={len(errors)}")
+    print(f"throughput: {total / args.seconds:,.0f} req/s")
+    print(
+        f"latency ms: p50={percentile(latencies, 50) * 1000:.2f} "
+        f"p99={percentile(latencies, 99) * 1000:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# benchmarks/metrics_overhead.py
+"""
+Per-sample cost of the metrics registry.
+
+    python -m benchmarks.metrics_overhead
+"""
+import timeit
+
+import metrics
+
+N = 1_000_000
+
+
+def main():
+    c = metrics.counter("bench_counter")
+    h = metrics.histogram("bench_seconds")
+
+    @metrics.timed("bench_timed_seconds")
+    def noop():
+        pass
+
+    cases = (
+        ("counter.inc", c.inc),
+        ("histogram.observe", lambda: h.observe(0.003)),
+        ("histogram.time", lambda: h.time().__enter__().__exit__()),
+        ("@timed call", noop),
+    )
+
+    for enabled in (True, False):
+        metrics.set_enabled(enabled)
+        for name, fn in cases:
+            ns = timeit.timeit(fn, number=N) / N * 1e9
+            print(f"{'on ' if enabled else 'off'} {name:<20} {ns:7.0f} ns/sample")
+
+
+if __name__ == "__main__":
+    main()
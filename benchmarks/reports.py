@@ -0,0 +1,143 @@
+# benchmarks/reports.py
+"""
+Admin reports as history grows: the first (cold) build, opening the tab
+again with nothing new, and refreshing after a burst of new activity,
+against aggregating the raw tables from scratch every time.
+
+    python -m benchmarks.reports --transactions 1000000 --logins 500000
+"""
+import argparse
+import os
+import random
+import time
+
+from benchmarks.seed import make_db, percentile
+from database import audit_search, fx, ledger, reports
+from database.db import get_conn
+
+TYPES = ("TRANSFER", "BILL_PAYMENT", "CASH_DEPOSIT")
+
+# what the tab would cost without the rollups
+FULL_SCAN = (
+    """
+    SELECT type, COUNT(*), SUM(amount) FROM transactions GROUP BY type
+    """,
+    """
+    SELECT date(timestamp) AS day, COUNT(*), SUM(amount),
+           SUM(SUM(amount)) OVER (ORDER BY date(timestamp))
+    FROM transactions
+    WHERE timestamp >= date('now', '-30 days')
+    GROUP BY day
+    """,
+    """
+    SELECT strftime('%H', timestamp) AS hod, COUNT(*), SUM(amount)
+    FROM transactions GROUP BY hod
+    """,
+    """
+    SELECT date(ts), SUM(event_type = 'LOGIN_SUCCESS'), SUM(event_type = 'LOGIN_FAIL')
+    FROM audit_log
+    WHERE event_type IN ('LOGIN_SUCCESS', 'LOGIN_FAIL')
+    GROUP BY date(ts)
+    """,
+    """
+    SELECT account_id, total, RANK() OVER (ORDER BY total DESC) AS rank
+    FROM (SELECT account_id, SUM(amount) AS total FROM transactions GROUP BY account_id)
+    ORDER BY rank LIMIT 10
+    """,
+)
+
+
+def fill(transactions, logins, accounts, days=365, start_id=0, seed=11):
+    """Transactions and login audit rows spread over the past `days`."""
+    r = random.Random(seed + start_id)
+    now = time.time()
+
+    def stamp(i, n):
+        at = now - days * 86400 + (i + 1) * days * 86400 / n
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(at))
+
+    with get_conn() as con:
+        con.executemany(
+            "INSERT INTO transactions (account_id, amount, type, timestamp) VALUES (?, ?, ?, ?)",
+            (
+                (r.randint(1, accounts), round(r.uniform(10, 5000), 2),
+                 r.choice(TYPES), stamp(i, transactions))
+                for i in range(transactions)
+            )
+        )
+        con.executemany(
+            "INSERT INTO audit_log (ts, account_id, event_type, details) VALUES (?, ?, ?, ?)",
+            (
+                (stamp(i, logins), r.randint(1, accounts),
+                 "LOGIN_FAIL" if r.random() < 0.1 else "LOGIN_SUCCESS", "Card login")
+                for i in range(logins)
+            )
+        )
+        con.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--logins", type=int, default=500_000)
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--burst", type=int, default=100,
+                        help="new transactions between refreshes")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = make_db(args.accounts)
+    try:
+        ledger.init_db()
+        audit_search.init_db()
+        fx.rates.reload()
+        fill(args.transactions, args.logins, args.accounts)
+
+        cache = reports.ReportCache()
+        t = time.perf_counter()
+        report = cache.report()
+        print(
+            f"cold build ({args.transactions:,} tx, {args.logins:,} logins): "
+            f"{(time.perf_counter() - t) * 1000:.0f} ms"
+        )
+
+        hits = [cache.report()["seconds"] for _ in range(args.repeat)]
+        print(f"reopen, nothing new: p50={percentile(hits, 50) * 1000:.3f} ms "
+              f"p99={percentile(hits, 99) * 1000:.3f} ms")
+
+        folds = []
+        for n in range(args.repeat):
+            fill(args.burst, args.burst // 10, args.accounts, days=1,
+                 start_id=args.transactions + n * args.burst)
+            report = cache.report()
+            assert not report["cached"]
+            folds.append(report["seconds"])
+        print(f"refresh after {args.burst} new tx: p50={percentile(folds, 50) * 1000:.2f} ms "
+              f"p99={percentile(folds, 99) * 1000:.2f} ms")
+
+        scans = []
+        with get_conn() as con:
+            for _ in range(max(3, args.repeat // 5)):
+                t = time.perf_counter()
+                for sql in FULL_SCAN:
+                    con.execute(sql).fetchall()
+                scans.append(time.perf_counter() - t)
+
+            # the rollups must agree with the raw tables
+            count, total = con.execute(
+                "SELECT COUNT(*), SUM(amount) FROM transactions"
+            ).fetchone()
+        print(f"full aggregate scan: p50={percentile(scans, 50) * 1000:.0f} ms")
+
+        folded = sum(row[1] for row in report["by_type"])
+        amount = sum(row[2] for row in report["by_type"])
+        assert folded == count and abs(amount - total) < 0.01 * count, (folded, count)
+        print(f"rollups match: {folded:,} tx, total {amount:,.2f}")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
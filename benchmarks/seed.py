@@ -0,0 +1,60 @@
+# benchmarks/seed.py
+"""
+Scratch databases for the benchmarks. The schema is copied from the
+shipped kiosk.db (opened immutable) so the benchmarks never touch it.
+"""
+import os
+import sqlite3
+import tempfile
+
+from database import db
+from security import hash_pin
+
+SOURCE_DB = os.path.join(os.path.dirname(__file__), "..", "database", "kiosk.db")
+
+TEST_PIN = "1234"
+
+
+def make_db(accounts=1000, balance=10_000.0, path=None):
+    """Create a seeded database and point database.db at it."""
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="kiosk-bench-", suffix=".db")
+        os.close(fd)
+        os.remove(path)
+
+    src = sqlite3.connect(f"file:{os.path.abspath(SOURCE_DB)}?immutable=1", uri=True)
+    ddl = [
+        row[0] for row in src.execute("""
+            SELECT sql FROM sqlite_master
+            WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+            ORDER BY type = 'table' DESC
+        """)
+    ]
+    src.close()
+
+    # One hash for every account: PBKDF2 is deliberately slow
+    pin_hash = hash_pin(TEST_PIN).hex()
+
+    con = sqlite3.connect(path)
+    for stmt in ddl:
+        con.execute(stmt)
+    con.executemany(
+        "INSERT INTO accounts (card_number, pin_hash, balance) VALUES (?, ?, ?)",
+        ((card_number(i), pin_hash, balance) for i in range(1, accounts + 1))
+    )
+    con.commit()
+    con.close()
+
+    db.DB_PATH = path
+    return path
+
+
+def card_number(i):
+    return f"4000{i:012d}"
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
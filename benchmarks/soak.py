@@ -0,0 +1,301 @@
+# benchmarks/soak.py
+"""
+Soak test: many simulated sessions through one MainWindow, watching for
+anything that grows per session.
+
+Sessions cycle through typed and card logins, transfers, bill payments,
+deposits, account info, history and an idle timeout, driving the real
+screens through their keypads and buttons (message boxes are answered
+as they open). Every --sample-every sessions the harness records
+tracemalloc's traced total, live QObjects (the widget trees and the
+Python wrappers), open file descriptors and SQLite handles.
+
+After --warmup sessions (caches and first-use allocations settle) the
+next sample is the baseline. At the end, growth per session is compared
+with the thresholds; if any is passed, the top allocation sites that
+grew since the baseline are printed and the exit status is 1.
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.soak --sessions 200000
+
+PBKDF2 makes a real PIN check cost tens of ms, so only every
+--login-every-th session types a card and PIN; the rest enter the menu
+the way a login does (MainWindow.go_menu).
+"""
+import argparse
+import gc
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# everything the kiosk writes goes to a scratch directory
+WORK_DIR = tempfile.mkdtemp(prefix="kiosk-soak-")
+for name, value in (
+    ("KIOSK_RECEIPT_DIR", "receipts"),
+    ("KIOSK_BACKUP_DIR", "backups"),
+    ("KIOSK_MAINTENANCE_LOG", "maintenance.log"),
+    ("KIOSK_METRICS_DUMP", "metrics.json"),
+    ("KIOSK_STALL_LOG", "stalls.log"),
+    ("KIOSK_TRACE_DIR", "traces"),
+):
+    os.environ.setdefault(name, os.path.join(WORK_DIR, value))
+os.environ.setdefault("KIOSK_METRICS_PORT", "0")
+
+from PyQt5.QtCore import QObject, QEvent, QCoreApplication, QTimer
+from PyQt5.QtWidgets import QApplication, QMessageBox
+
+import main as kiosk
+from benchmarks.seed import make_db, card_number, TEST_PIN
+from widgets.keypad import ENTER
+
+# import machinery and tracemalloc's own bookkeeping
+FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+    tracemalloc.Filter(False, "*/linecache.py"),
+)
+
+FLOWS = ("transfer", "bill", "deposit", "info", "statement", "idle")
+
+
+class BoxAnswerer(QObject):
+    """Accepts every QMessageBox as it is shown, counting them by text."""
+
+    def __init__(self):
+        super().__init__()
+        self.seen = {}
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Show and isinstance(obj, QMessageBox):
+            text = obj.text().splitlines()[0] if obj.text() else ""
+            self.seen[text] = self.seen.get(text, 0) + 1
+            button = obj.button(QMessageBox.Yes) or obj.button(QMessageBox.Ok)
+            QTimer.singleShot(0, button.click if button else obj.accept)
+        return False
+
+
+# ============================================================
+#  Sessions
+# ============================================================
+class Driver:
+    def __init__(self, app, window, accounts):
+        self.app = app
+        self.w = window
+        self.accounts = accounts
+
+    def settle(self):
+        """Run queued work, including deleteLater()s (not done outside exec())."""
+        self.app.processEvents()
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+    def type_into(self, keypad, text):
+        for key in text:
+            keypad.press(key)
+        keypad.press(ENTER)
+
+    def login(self, n, account_id):
+        w = self.w
+        card = card_number(account_id)
+        if n % 2:
+            # card reader: the PIN is all that is typed
+            w.on_card_inserted(card)
+        else:
+            w.go_auth()
+            self.type_into(w.auth.keypad, card)
+        self.type_into(w.auth.keypad, TEST_PIN)
+        self.settle()
+        return w.stack.currentWidget() is w.menu
+
+    def session(self, n, login_every):
+        w = self.w
+        account_id = 1 + n % self.accounts
+        flow = FLOWS[n % len(FLOWS)]
+
+        if login_every and n % login_every == 0:
+            if not self.login(n // login_every, account_id):
+                w.go_welcome()
+                return
+        else:
+            w.go_auth()
+            w.go_menu(account_id, None)
+        self.settle()
+
+        if flow == "idle":
+            # timeout, warning countdown, expiry -> welcome
+            w.idle.last_activity -= w.idle.timeout() + 1
+            w.idle._check()
+            w.idle.warning_since -= w.idle.WARNING_SECONDS
+            w.idle._check()
+            self.settle()
+            return
+
+        w.menu.open_option(flow)
+        self.settle()
+
+        if flow in ("info", "statement"):
+            screen = w.account_info if flow == "info" else w.history
+            screen.back_btn.click()
+        else:
+            keypad = w.transaction.keypad
+            if flow == "transfer":
+                self.type_into(keypad, card_number(1 + (account_id % self.accounts)))
+            elif flow == "bill":
+                self.type_into(keypad, f"{n % 10_000:08d}")
+            self.type_into(keypad, "1")
+            self.settle()
+            if w.stack.currentWidget() is w.receipt:
+                w.receipt.done_btn.click()
+            else:
+                w.go_home()
+
+        if w.card_session is not None:
+            w.on_card_removed()
+        self.settle()
+
+
+# ============================================================
+#  Sampling
+# ============================================================
+def _fd_targets():
+    fd_dir = "/proc/self/fd"
+    if not os.path.isdir(fd_dir):
+        return None
+    targets = []
+    for fd in os.listdir(fd_dir):
+        try:
+            targets.append(os.readlink(os.path.join(fd_dir, fd)))
+        except OSError:
+            pass
+    return targets
+
+
+def sample(app, db_path):
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot().filter_traces(FILTERS)
+
+    trees = sum(1 + len(w.findChildren(QObject)) for w in app.topLevelWidgets())
+    objects = gc.get_objects()
+    wrappers = sum(isinstance(o, QObject) for o in objects)
+    connections = sum(type(o) is sqlite3.Connection for o in objects)
+    del objects
+
+    fds = _fd_targets()
+    return snapshot, {
+        "py_bytes": sum(t.size for t in snapshot.traces),
+        "qobjects": trees,
+        "wrappers": wrappers,
+        "top_level": len(app.topLevelWidgets()),
+        "fds": len(fds) if fds is not None else 0,
+        "sqlite_fds": sum(t.startswith(db_path) for t in fds) if fds else 0,
+        "sqlite_conns": connections,
+    }
+
+
+def print_sample(n, elapsed, stats):
+    print(
+        f"{n:>9,} sessions {elapsed:8.1f}s "
+        f"py={stats['py_bytes'] / 1e6:8.2f} MB qobjects={stats['qobjects']:>6} "
+        f"wrappers={stats['wrappers']:>6} top-level={stats['top_level']:>3} "
+        f"fds={stats['fds']:>4} sqlite fds={stats['sqlite_fds']:>3} "
+        f"conns={stats['sqlite_conns']:>3}",
+        flush=True
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--warmup", type=int, default=2_000)
+    parser.add_argument("--sample-every", type=int, default=5_000)
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--login-every", type=int, default=100,
+                        help="sessions per real keypad login (0: never)")
+    parser.add_argument("--frames", type=int, default=8,
+                        help="traceback depth tracemalloc records")
+    parser.add_argument("--top", type=int, default=15)
+    # growth allowed per session once warm
+    parser.add_argument("--max-bytes", type=float, default=64.0)
+    parser.add_argument("--max-qobjects", type=float, default=0.001)
+    parser.add_argument("--max-fds", type=float, default=0.001)
+    args = parser.parse_args()
+
+    path = make_db(args.accounts, balance=1e9)
+    db_path = os.path.realpath(path)
+
+    app = QApplication([])
+    answerer = BoxAnswerer()
+    app.installEventFilter(answerer)
+    window = kiosk.MainWindow()
+    window.show()
+    driver = Driver(app, window, args.accounts)
+    driver.settle()
+
+    tracemalloc.start(args.frames)
+    start = time.perf_counter()
+    baseline = base_stats = None
+    base_n = 0
+    try:
+        for n in range(1, args.sessions + 1):
+            driver.session(n, args.login_every)
+            if n == args.warmup or (n > args.warmup and n % args.sample_every == 0):
+                snapshot, stats = sample(app, db_path)
+                print_sample(n, time.perf_counter() - start, stats)
+                if baseline is None:
+                    baseline, base_stats, base_n = snapshot, stats, n
+                last, last_stats, last_n = snapshot, stats, n
+    finally:
+        elapsed = time.perf_counter() - start
+        window.close()
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    if baseline is None or last_n == base_n:
+        print("not enough sessions after warmup to measure growth")
+        return
+
+    runs = last_n - base_n
+    growth = {k: (last_stats[k] - base_stats[k]) / runs for k in base_stats}
+    limits = {
+        "py_bytes": args.max_bytes,
+        "qobjects": args.max_qobjects,
+        "wrappers": args.max_qobjects,
+        "top_level": args.max_qobjects,
+        "fds": args.max_fds,
+        "sqlite_fds": args.max_fds,
+        "sqlite_conns": args.max_fds,
+    }
+    print(f"\n{args.sessions:,} sessions in {elapsed:.1f}s "
+          f"({args.sessions / elapsed:,.0f}/s); growth per session over {runs:,}:")
+    failed = []
+    for key, per_session in growth.items():
+        over = per_session > limits[key]
+        if over:
+            failed.append(key)
+        print(f"  {key:<13} {per_session:+12.4f} (limit {limits[key]:g})"
+              f"{'  FAIL' if over else ''}")
+    if answerer.seen:
+        print("message boxes:", ", ".join(
+            f"{text!r}x{count}" for text, count in sorted(answerer.seen.items())
+        ))
+
+    if failed:
+        key_type = "traceback" if args.frames > 1 else "lineno"
+        print(f"\ntop {args.top} allocation sites grown since session {base_n:,}:")
+        for stat in last.compare_to(baseline, key_type)[:args.top]:
+            print(f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8} blocks")
+            for line in stat.traceback.format(limit=4):
+                print("    " + line)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/statements.py
+"""
+Monthly statement batch at scale: accounts/s, output size and peak
+memory of the parent and the pool workers.
+
+    python -m benchmarks.statements --accounts 100000 --per-account 10
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from benchmarks.seed import make_db
+from database import ledger, statements
+from database.db import get_conn
+
+MONTH = "2026-09"
+KINDS = (
+    ("DEBIT", "TRANSFER"), ("DEBIT", "BILL_PAYMENT"), ("CREDIT", "CASH_DEPOSIT")
+)
+
+
+def add_postings(accounts, per_account, month=MONTH):
+    """per_account legs for every account, spread over the month."""
+    start, _ = statements.month_bounds(month)
+    day = start[:8]
+
+    def legs():
+        for account_id in range(1, accounts + 1):
+            balance = 10_000.0
+            for n in range(per_account):
+                leg, kind = random.choice(KINDS)
+                amount = round(random.uniform(10, 500), 2)
+                balance += amount if leg == "CREDIT" else -amount
+                ts = f"{day}{1 + n * 28 // per_account:02d} 12:{n % 60:02d}:00"
+                yield account_id, leg, amount, round(balance, 2), kind, ts
+
+    with get_conn() as con:
+        # accounts were opened (migrated) before the month
+        con.execute(
+            "UPDATE postings SET ts = datetime(?, '-1 day') WHERE type = 'OPENING_BALANCE'",
+            (start,)
+        )
+        con.executemany("""
+            INSERT INTO postings (account_id, leg, amount, balance_after, type, ts)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, legs())
+        con.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=100_000)
+    parser.add_argument("--per-account", type=int, default=10)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--range-size", type=int, default=statements.RANGE_SIZE)
+    args = parser.parse_args()
+
+    path = make_db(args.accounts)
+    ledger.init_db()
+    add_postings(args.accounts, args.per_account)
+    out_dir = tempfile.mkdtemp(prefix="kiosk-statements-")
+
+    try:
+        summary = statements.generate(
+            MONTH, out_dir, args.workers, args.range_size, statements.print_progress
+        )
+        print(file=sys.stderr)
+        print(
+            f"accounts={summary['accounts']} rows={summary['rows']} "
+            f"output={summary['bytes'] / 1e6:.1f} MB"
+        )
+        print(
+            f"{summary['seconds']:.2f}s, {summary['accounts_per_sec']:,.0f} accounts/s, "
+            f"peak RSS parent={summary['parent_rss_mb']:.0f} MB "
+            f"worker={summary['worker_rss_mb']:.0f} MB"
+        )
+    finally:
+        shutil.rmtree(out_dir)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# benchmarks/write_contention.py
+"""
+Several processes posting to one database file at once, through
+db.write (BEGIN IMMEDIATE, bounded jittered retry) or the previous
+path (deferred transaction, 5 s busy_timeout).
+
+Reports posting latency, failures by kind, and the contention metrics
+of db.write (retries, lock wait and hold), then checks that every
+successful posting, and nothing else, reached the balances (exit 1 if
+not: the deferred path loses updates, since it reads the balance
+before it holds the lock).
+
+    python -m benchmarks.write_contention --procs 8 --posts 500
+    python -m benchmarks.write_contention --procs 8 --posts 500 --mode deferred
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import time
+
+import metrics
+from benchmarks.seed import make_db, percentile
+from database import db, fx, idempotency, intents, journal, ledger, limits
+
+BALANCE = 10_000.0
+
+
+def _deferred_post(account_id, amount):
+    """ledger.post before db.write: lock taken at the first UPDATE."""
+    with db.get_conn() as con:
+        ledger.post(account_id, "deposit", amount, conn=con)
+        con.commit()
+
+
+def worker(path, mode, posts, accounts, hold_ms, start_at):
+    db.DB_PATH = path
+    post = (
+        (lambda a, amt: ledger.post(a, "deposit", amt))
+        if mode == "immediate" else _deferred_post
+    )
+    if hold_ms:
+        # a slow writer elsewhere (a bulk job) sitting on the lock
+        slow = lambda con: time.sleep(hold_ms / 1000)
+
+    rnd = random.Random(os.getpid())
+    latencies, errors, posted = [], {}, 0.0
+    time.sleep(max(0.0, start_at - time.time()))
+    for i in range(posts):
+        if hold_ms and i % 10 == 0:
+            try:
+                db.write("slow", slow)
+            except db.DatabaseBusy:
+                pass
+        amount = float(rnd.randint(1, 100))
+        start = time.perf_counter()
+        try:
+            post(rnd.randint(1, accounts), amount)
+            posted += amount
+        except db.DatabaseBusy:
+            errors["busy (gave up)"] = errors.get("busy (gave up)", 0) + 1
+        except sqlite3.OperationalError as e:
+            errors[str(e)] = errors.get(str(e), 0) + 1
+        latencies.append(time.perf_counter() - start)
+
+    stats = {}
+    for m in metrics.REGISTRY.snapshot()["metrics"]:
+        if m["name"].startswith("kiosk_db_") and m["labels"].get("stmt") == "post":
+            stats[m["name"]] = m
+    return latencies, errors, posted, stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--procs", type=int, default=8)
+    parser.add_argument("--posts", type=int, default=500, help="per process")
+    parser.add_argument("--accounts", type=int, default=50)
+    parser.add_argument("--mode", choices=("immediate", "deferred"), default="immediate")
+    parser.add_argument("--hold-ms", type=float, default=0.0,
+                        help="before every 10th posting, hold the lock this long")
+    args = parser.parse_args()
+
+    path = make_db(args.accounts, balance=BALANCE)
+    try:
+        for mod in (journal, ledger, idempotency, limits, intents):
+            mod.init_db()
+        fx.rates.reload()
+
+        start_at = time.time() + 0.5
+        started = time.perf_counter()
+        with multiprocessing.Pool(args.procs) as pool:
+            results = pool.starmap(worker, [
+                (path, args.mode, args.posts, args.accounts, args.hold_ms, start_at)
+            ] * args.procs)
+        elapsed = time.perf_counter() - started - 0.5
+
+        latencies, errors, posted = [], {}, 0.0
+        retries = busy = wait_sum = hold_sum = 0.0
+        wait_count = 0
+        for lat, errs, amount, stats in results:
+            latencies += lat
+            posted += amount
+            for k, v in errs.items():
+                errors[k] = errors.get(k, 0) + v
+            retries += stats.get("kiosk_db_write_retries_total", {}).get("value", 0)
+            busy += stats.get("kiosk_db_write_busy_total", {}).get("value", 0)
+            wait = stats.get("kiosk_db_lock_wait_seconds", {})
+            wait_sum += wait.get("sum", 0.0)
+            wait_count += wait.get("count", 0)
+            hold_sum += stats.get("kiosk_db_lock_hold_seconds", {}).get("sum", 0.0)
+
+        total = args.procs * args.posts
+        ok = total - sum(errors.values())
+        print(
+            f"{args.mode}: {args.procs} procs x {args.posts} posts in {elapsed:.2f}s "
+            f"({ok / elapsed:,.0f} postings/s)"
+        )
+        print(
+            f"latency ms: p50={percentile(latencies, 50) * 1000:.1f} "
+            f"p99={percentile(latencies, 99) * 1000:.1f} "
+            f"max={max(latencies, default=0) * 1000:.1f}"
+        )
+        print(f"failed: {sum(errors.values())} {errors or ''}")
+        if wait_count:
+            print(
+                f"db.write: {retries / total:.2f} retries/post, gave up {busy:.0f}, "
+                f"mean lock wait {wait_sum / wait_count * 1000:.2f} ms, "
+                f"mean hold {hold_sum / wait_count * 1000:.2f} ms"
+            )
+
+        with db.get_conn() as con:
+            balances, n = con.execute(
+                "SELECT (SELECT SUM(balance) FROM accounts), "
+                "(SELECT COUNT(*) FROM transactions)"
+            ).fetchone()
+        expected = args.accounts * BALANCE + posted
+        if abs(balances - expected) >= 0.01 or n != ok:
+            # the deferred path reads the balance before it holds the lock
+            print(
+                f"balances INCONSISTENT: {n} postings for {ok} successes, total "
+                f"{balances:,.2f} != {expected:,.2f} (lost updates)"
+            )
+            sys.exit(1)
+        print(f"balances consistent: {n} postings, total {balances:,.2f}")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
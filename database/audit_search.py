@@ -0,0 +1,257 @@
+# database/audit_search.py
+"""
+Full-text search over audit_log.details.
+
+audit_fts is an external-content FTS5 index on audit_log (the text is
+not stored twice); triggers keep it in step with every insert, update
+and delete, so log_event needs no changes. Searches combine a text
+query with event type, account and time filters and page backwards
+through ids:
+
+    page = search("1234", event_type="TRANSFER")
+    older = search("1234", event_type="TRANSFER", before=page["next_before"])
+
+Time bounds are turned into an id range through idx_audit_ts first, so
+filtered queries walk rowids instead of sorting.
+
+    python -m database.audit_search "admin created" --event CREATE_ACCOUNT
+"""
+import argparse
+import html
+import time
+
+from database.db import get_conn
+
+PAGE_SIZE = 50
+SNIPPET_TOKENS = 12
+
+# control characters never appear in details, so they survive escaping
+_MARK_ON, _MARK_OFF = "\x02", "\x03"
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS audit_fts USING fts5(
+    details,
+    content='audit_log',
+    content_rowid='id',
+    prefix='3'
+);
+
+CREATE TRIGGER IF NOT EXISTS audit_fts_ai AFTER INSERT ON audit_log BEGIN
+    INSERT INTO audit_fts(rowid, details) VALUES (new.id, new.details);
+END;
+
+CREATE TRIGGER IF NOT EXISTS audit_fts_ad AFTER DELETE ON audit_log BEGIN
+    INSERT INTO audit_fts(audit_fts, rowid, details)
+    VALUES ('delete', old.id, old.details);
+END;
+
+CREATE TRIGGER IF NOT EXISTS audit_fts_au AFTER UPDATE OF details ON audit_log BEGIN
+    INSERT INTO audit_fts(audit_fts, rowid, details)
+    VALUES ('delete', old.id, old.details);
+    INSERT INTO audit_fts(rowid, details) VALUES (new.id, new.details);
+END;
+
+CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit_log(ts);
+CREATE INDEX IF NOT EXISTS idx_audit_event ON audit_log(event_type, id);
+CREATE INDEX IF NOT EXISTS idx_audit_account ON audit_log(account_id, id);
+"""
+
+
+def init_db():
+    with get_conn() as con:
+        fresh = not con.execute(
+            "SELECT 1 FROM sqlite_master WHERE name='audit_fts'"
+        ).fetchone()
+        con.executescript(SCHEMA)
+        if fresh:
+            # index the history written before the triggers existed
+            con.execute("INSERT INTO audit_fts(audit_fts) VALUES ('rebuild')")
+        con.commit()
+
+
+def match_expression(text):
+    """
+    Free text -> FTS5 query: every word must appear. Words with a digit
+    (partial card numbers, references) or a trailing * match as
+    prefixes; other words match whole, since a short prefix of a common
+    word makes FTS5 merge its entire doclist. Words are quoted, so
+    punctuation users type ("To 1234…") is never syntax.
+    """
+    terms = []
+    for word in text.split():
+        word = word.strip("…")
+        prefix = word.endswith("*") or any(ch.isdigit() for ch in word)
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+def highlight(text):
+    """Snippet with match markers -> safe rich text for a QLabel."""
+    return (
+        html.escape(text or "")
+        .replace(_MARK_ON, "<b style='background:#fff3cd'>")
+        .replace(_MARK_OFF, "</b>")
+    )
+
+
+def event_types(conn=None):
+    if conn is None:
+        with get_conn() as con:
+            return event_types(conn=con)
+    return [r[0] for r in conn.execute(
+        "SELECT DISTINCT event_type FROM audit_log ORDER BY event_type"
+    )]
+
+
+def _id_range(conn, since, until):
+    """
+    Ids bounding a time window: one seek each on idx_audit_ts. ts is
+    CURRENT_TIMESTAMP at insert, so it rises with id (a kiosk clock
+    stepped backwards can hide a few rows at the window's edges).
+    """
+    lo = hi = None
+    if since:
+        row = conn.execute(
+            "SELECT id FROM audit_log WHERE ts >= ? ORDER BY ts, id LIMIT 1", (since,)
+        ).fetchone()
+        lo = row and row[0]
+    if until:
+        row = conn.execute(
+            "SELECT id FROM audit_log WHERE ts < ? ORDER BY ts DESC, id DESC LIMIT 1",
+            (until,)
+        ).fetchone()
+        hi = row and row[0]
+    return lo, hi
+
+
+def search(text="", event_type=None, account_id=None, since=None, until=None,
+           before=None, limit=PAGE_SIZE, conn=None):
+    """
+    One page of matching audit rows, newest first.
+
+    Returns {rows, next_before, seconds}; rows are (id, ts, account_id,
+    event_type, amount, snippet), matches in the snippet marked for
+    highlight(). Pass next_before back as `before` for the next (older)
+    page; it is None on the last page.
+    """
+    if conn is None:
+        with get_conn() as con:
+            return search(
+                text, event_type, account_id, since, until, before, limit, conn=con
+            )
+
+    start = time.perf_counter()
+    expr = match_expression(text)
+
+    # id bounds go on the driving table: FTS5 only seeks on its own rowid
+    key = "f.rowid" if expr and account_id is None else "a.id"
+    where, params = [], []
+
+    lo, hi = _id_range(conn, since, until)
+    if (since and lo is None) or (until and hi is None):
+        return {"rows": [], "next_before": None, "seconds": time.perf_counter() - start}
+    if lo is not None:
+        where.append(f"{key} >= ?")
+        params.append(lo)
+    if hi is not None:
+        where.append(f"{key} <= ?")
+        params.append(hi)
+    if before is not None:
+        where.append(f"{key} < ?")
+        params.append(before)
+    if since:
+        where.append("a.ts >= ?")
+        params.append(since)
+    if until:
+        where.append("a.ts < ?")
+        params.append(until)
+    if event_type:
+        where.append("a.event_type = ?")
+        params.append(event_type)
+    if account_id is not None:
+        where.append("a.account_id = ?")
+        params.append(account_id)
+
+    if expr and account_id is not None:
+        # an account has few rows: walk them and probe the index per row
+        # rather than filtering every match of a common word
+        return _search_account(conn, expr, where, params, limit, start)
+    if expr:
+        sql = f"""
+            SELECT a.id, a.ts, a.account_id, a.event_type, a.amount,
+                   snippet(audit_fts, 0, '{_MARK_ON}', '{_MARK_OFF}', '…', {SNIPPET_TOKENS})
+            FROM audit_fts f
+            JOIN audit_log a ON a.id = f.rowid
+            WHERE audit_fts MATCH ? {"".join(" AND " + w for w in where)}
+            ORDER BY f.rowid DESC
+            LIMIT ?
+        """
+        params = [expr] + params
+    else:
+        sql = f"""
+            SELECT a.id, a.ts, a.account_id, a.event_type, a.amount, a.details
+            FROM audit_log a
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY a.id DESC
+            LIMIT ?
+        """
+
+    found = conn.execute(sql, params + [limit + 1]).fetchall()
+    more = len(found) > limit
+    rows = found[:limit]
+
+    return {
+        "rows": rows,
+        "next_before": rows[-1][0] if more else None,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _search_account(conn, expr, where, params, limit, start):
+    found = conn.execute(f"""
+        SELECT a.id, a.ts, a.account_id, a.event_type, a.amount
+        FROM audit_log a
+        WHERE {" AND ".join(where)} AND EXISTS (
+            SELECT 1 FROM audit_fts WHERE audit_fts MATCH ? AND rowid = a.id
+        )
+        ORDER BY a.id DESC
+        LIMIT ?
+    """, params + [expr, limit + 1]).fetchall()
+    more = len(found) > limit
+    found = found[:limit]
+
+    snippets = dict(conn.execute(f"""
+        SELECT rowid,
+               snippet(audit_fts, 0, '{_MARK_ON}', '{_MARK_OFF}', '…', {SNIPPET_TOKENS})
+        FROM audit_fts
+        WHERE audit_fts MATCH ? AND rowid IN ({",".join("?" * len(found))})
+    """, [expr] + [row[0] for row in found])) if found else {}
+
+    rows = [row + (snippets.get(row[0], ""),) for row in found]
+    return {
+        "rows": rows,
+        "next_before": rows[-1][0] if more else None,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("text", nargs="?", default="")
+    parser.add_argument("--event")
+    parser.add_argument("--account", type=int)
+    parser.add_argument("--since", help="YYYY-MM-DD[ HH:MM:SS]")
+    parser.add_argument("--until")
+    parser.add_argument("--limit", type=int, default=PAGE_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    page = search(
+        args.text, args.event, args.account, args.since, args.until, limit=args.limit
+    )
+    for row in page["rows"]:
+        snippet = (row[5] or "").replace(_MARK_ON, "[").replace(_MARK_OFF, "]")
+        print(*row[:5], snippet, sep=" | ")
+    print(f"{len(page['rows'])} rows in {page['seconds'] * 1000:.2f} ms")
@@ -0,0 +1,21 @@
+# database/backend.py
+"""
+Picks the ledger the screens talk to.
+
+With LEDGER_ADDR=host:port set, every call goes to the central
+ledger service; otherwise the kiosk uses its local database.
+"""
+import os
+
+
+def _select():
+    addr = os.environ.get("LEDGER_ADDR")
+    if addr:
+        from services.ledger_client import LedgerClient
+        return LedgerClient(addr)
+
+    from database import ledger
+    return ledger
+
+
+backend = _select()
@@ -0,0 +1,251 @@
+# database/backup.py
+"""
+Online backups of kiosk.db.
+
+    python -m database.backup                  # take a snapshot now
+    python -m database.backup --list
+    python -m database.backup --restore "2026-10-19 08:00"
+
+Snapshots are taken with the SQLite online backup API, a few pages per
+step with a sleep between steps, from one pinned WAL read snapshot, so
+kiosk sessions keep writing while a backup runs. Each copy
+is checked with PRAGMA integrity_check before it is gzipped into
+BACKUP_DIR; the newest KEEP snapshots are kept.
+
+Restores are point-in-time at snapshot granularity: the newest snapshot
+taken at or before the requested time is verified and copied back into
+the live database, again through the backup API.
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+from datetime import datetime
+
+import metrics
+from database import db
+from database.db import log_event
+
+BACKUP_DIR = os.environ.get("KIOSK_BACKUP_DIR", "backups")
+KEEP = int(os.environ.get("KIOSK_BACKUP_KEEP", "14"))
+
+STEP_PAGES = 64
+STEP_SLEEP = 0.01
+# If the source changes under the copy anyway (e.g. not in WAL mode) it
+# restarts; after this many restarts finish in one step
+MAX_RESTARTS = 3
+
+STAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+BACKUP_SECONDS = metrics.histogram("kiosk_backup_seconds", "Backup wall time")
+BACKUP_LOCK_SECONDS = metrics.histogram(
+    "kiosk_backup_lock_seconds", "Time a backup spent inside copy steps"
+)
+
+
+class BackupError(Exception):
+    pass
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _integrity(path):
+    con = sqlite3.connect(path)
+    try:
+        return con.execute("PRAGMA integrity_check;").fetchone()[0]
+    finally:
+        con.close()
+
+
+def snapshots(backup_dir=BACKUP_DIR):
+    """[(taken_at, path)] oldest first."""
+    found = []
+    for name in os.listdir(backup_dir) if os.path.isdir(backup_dir) else ():
+        if not (name.startswith("kiosk-") and name.endswith(".db.gz")):
+            continue
+        try:
+            taken = datetime.strptime(name[6:-6], STAMP_FORMAT)
+        except ValueError:
+            continue
+        found.append((taken, os.path.join(backup_dir, name)))
+    return sorted(found)
+
+
+def _rotate(backup_dir, keep):
+    for _, path in snapshots(backup_dir)[:-keep]:
+        os.remove(path)
+
+
+# -------------------------------------------------
+# Backup
+# -------------------------------------------------
+def _copy(src, dst, pages, sleep):
+    """Stepwise copy; returns (lock_seconds, max_step_seconds, restarts)."""
+    state = {"lock": 0.0, "max": 0.0, "restarts": 0, "remaining": None,
+             "mark": time.perf_counter()}
+
+    def progress(status, remaining, total):
+        step = time.perf_counter() - state["mark"]
+        state["lock"] += step
+        state["max"] = max(state["max"], step)
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+        state["remaining"] = remaining
+        if state["restarts"] >= MAX_RESTARTS:
+            raise _Restarted
+        if remaining:
+            time.sleep(sleep)
+        state["mark"] = time.perf_counter()
+
+    try:
+        src.backup(dst, pages=pages, progress=progress)
+    except _Restarted:
+        state["mark"] = time.perf_counter()
+        src.backup(dst, pages=-1)
+        step = time.perf_counter() - state["mark"]
+        state["lock"] += step
+        state["max"] = max(state["max"], step)
+
+    return state["lock"], state["max"], state["restarts"]
+
+
+def backup(backup_dir=BACKUP_DIR, keep=KEEP, pages=STEP_PAGES, sleep=STEP_SLEEP):
+    """Take, verify, compress and rotate one snapshot. Returns a report dict."""
+    os.makedirs(backup_dir, exist_ok=True)
+    start = time.perf_counter()
+    fd, tmp = tempfile.mkstemp(prefix=".kiosk-", suffix=".db", dir=backup_dir)
+    os.close(fd)
+
+    try:
+        src = db.get_conn()
+        dst = sqlite3.connect(tmp)
+        try:
+            # Pin one WAL snapshot for the whole copy so concurrent
+            # postings neither block it nor force it to restart
+            src.execute("BEGIN")
+            src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            lock, max_step, restarts = _copy(src, dst, pages, sleep)
+            page_count = dst.execute("PRAGMA page_count;").fetchone()[0]
+        finally:
+            dst.close()
+            src.close()
+
+        result = _integrity(tmp)
+        if result != "ok":
+            raise BackupError(f"Snapshot failed integrity_check: {result}")
+
+        raw_bytes = os.path.getsize(tmp)
+        name = f"kiosk-{datetime.now().strftime(STAMP_FORMAT)}.db.gz"
+        path = os.path.join(backup_dir, name)
+        with open(tmp, "rb") as f_in, gzip.open(path + ".part", "wb", 6) as f_out:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        os.replace(path + ".part", path)
+    except Exception as e:
+        log_event(None, "BACKUP_FAILED", details=str(e))
+        raise
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    _rotate(backup_dir, keep)
+
+    seconds = time.perf_counter() - start
+    BACKUP_SECONDS.observe(seconds)
+    BACKUP_LOCK_SECONDS.observe(lock)
+    return {
+        "path": path,
+        "pages": page_count,
+        "bytes": raw_bytes,
+        "compressed_bytes": os.path.getsize(path),
+        "seconds": seconds,
+        "mb_per_sec": raw_bytes / 1048576 / seconds if seconds else 0.0,
+        "lock_seconds": lock,
+        "max_step_ms": max_step * 1000,
+        "restarts": restarts,
+    }
+
+
+# -------------------------------------------------
+# Restore
+# -------------------------------------------------
+def restore(at=None, backup_dir=BACKUP_DIR):
+    """
+    Restore the newest snapshot taken at or before `at` (a datetime;
+    None = latest) into the live database. Returns the snapshot path.
+    """
+    candidates = [s for s in snapshots(backup_dir) if at is None or s[0] <= at]
+    if not candidates:
+        raise BackupError("No snapshot at or before that time.")
+    taken, path = candidates[-1]
+
+    fd, tmp = tempfile.mkstemp(prefix=".restore-", suffix=".db", dir=backup_dir)
+    os.close(fd)
+    try:
+        with gzip.open(path, "rb") as f_in, open(tmp, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+
+        result = _integrity(tmp)
+        if result != "ok":
+            raise BackupError(f"{path} failed integrity_check: {result}")
+
+        src = sqlite3.connect(tmp)
+        dst = db.get_conn()
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+    finally:
+        os.remove(tmp)
+
+    log_event(None, "DB_RESTORE", details=f"Restored snapshot of {taken:%Y-%m-%d %H:%M:%S}")
+    return path
+
+
+def start_background(interval=6 * 3600, **kwargs):
+    """Take a snapshot every `interval` seconds on a daemon thread."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                backup(**kwargs)
+            except Exception:
+                traceback.print_exc()
+
+    thread = threading.Thread(target=loop, daemon=True, name="backup")
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--list", action="store_true")
+    parser.add_argument("--restore", metavar="YYYY-MM-DD HH:MM", nargs="?", const="")
+    parser.add_argument("--pages", type=int, default=STEP_PAGES)
+    parser.add_argument("--sleep", type=float, default=STEP_SLEEP)
+    args = parser.parse_args()
+
+    if args.list:
+        for taken, path in snapshots():
+            print(f"{taken:%Y-%m-%d %H:%M:%S}  {path}")
+    elif args.restore is not None:
+        at = datetime.strptime(args.restore, "%Y-%m-%d %H:%M") if args.restore else None
+        print(f"Restored {restore(at)}")
+    else:
+        report = backup(pages=args.pages, sleep=args.sleep)
+        print(
+            f"{report['path']}: {report['pages']} pages, "
+            f"{report['bytes'] / 1048576:.1f} MB -> "
+            f"{report['compressed_bytes'] / 1048576:.1f} MB in {report['seconds']:.2f}s "
+            f"({report['mb_per_sec']:.1f} MB/s); "
+            f"locks held {report['lock_seconds'] * 1000:.0f} ms total, "
+            f"longest step {report['max_step_ms']:.1f} ms, "
+            f"{report['restarts']} restarts"
+        )
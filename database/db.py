@@ -1,8 +1,45 @@
 # database/db.py
+import os
+import random
 import sqlite3
+import time
+import traceback
+
+import metrics
 
 DB_PATH = "database/kiosk.db"
 
+# Writers take the lock up front (BEGIN IMMEDIATE) and wait for it in
+# short slices with jittered backoff in between, giving up with
+# DatabaseBusy after WRITE_ATTEMPTS instead of hanging on busy_timeout.
+WRITE_ATTEMPT_MS = int(os.environ.get("KIOSK_WRITE_ATTEMPT_MS", "20"))
+WRITE_ATTEMPTS = int(os.environ.get("KIOSK_WRITE_ATTEMPTS", "8"))
+WRITE_BACKOFF = (0.005, 0.25)       # first and largest pause, seconds
+
+# Standalone audit rows (logins, recovery) have no request key to retry
+# with, so they wait about as long as the old 5 s busy_timeout did.
+AUDIT_WRITE_ATTEMPTS = int(os.environ.get("KIOSK_AUDIT_WRITE_ATTEMPTS", "40"))
+
+_BUSY_CODES = (5, 6)                # SQLITE_BUSY, SQLITE_LOCKED
+
+# Called as fn(account_id, event_type, amount, details, conn) for every
+# audit row; conn is the caller's connection, or None once committed.
+_listeners = []
+
+
+def add_listener(fn):
+    _listeners.append(fn)
+
+
+def _notify(account_id, event_type, amount, details, conn):
+    for fn in _listeners:
+        try:
+            fn(account_id, event_type, amount, details, conn)
+        except Exception:
+            traceback.print_exc()
+
+
+@metrics.timed("kiosk_db_connect_seconds", "Time to open a SQLite connection")
 def get_conn():
     con = sqlite3.connect(DB_PATH, timeout=5)
     con.execute("PRAGMA journal_mode=WAL;")
@@ -10,22 +47,97 @@ def get_conn():
     return con
 
 
+class DatabaseBusy(sqlite3.OperationalError):
+    """Another connection held the write lock for the whole retry budget."""
+
+
+def _is_busy(e):
+    code = getattr(e, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in _BUSY_CODES
+    return "locked" in str(e) or "busy" in str(e)
+
+
+def write(name, fn, attempts=None):
+    """
+    Run fn(con) as one BEGIN IMMEDIATE transaction on a new connection
+    and commit it; returns fn's result. name labels the contention
+    metrics: retries, time waited for the lock, and time it was held.
+
+    fn runs once, after the lock is taken, so it may have side effects.
+    Anything it raises rolls the transaction back and propagates.
+    """
+    attempts = attempts or WRITE_ATTEMPTS
+    con = get_conn()
+    try:
+        con.isolation_level = None
+        con.execute(f"PRAGMA busy_timeout = {WRITE_ATTEMPT_MS};")
+
+        start = time.perf_counter()
+        for attempt in range(attempts):
+            try:
+                con.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e):
+                    raise
+                if attempt == attempts - 1:
+                    metrics.counter(
+                        "kiosk_db_write_busy_total",
+                        "Writes that gave up waiting for the lock", stmt=name
+                    ).inc()
+                    raise DatabaseBusy(
+                        f"{name}: database busy for "
+                        f"{time.perf_counter() - start:.2f}s"
+                    ) from e
+                metrics.counter(
+                    "kiosk_db_write_retries_total",
+                    "Write lock attempts that found the database busy", stmt=name
+                ).inc()
+                first, largest = WRITE_BACKOFF
+                time.sleep(random.uniform(0, min(largest, first * 2 ** attempt)))
+
+        locked = time.perf_counter()
+        metrics.histogram(
+            "kiosk_db_lock_wait_seconds", "Time waiting for the write lock", stmt=name
+        ).observe(locked - start)
+        try:
+            result = fn(con)
+            con.execute("COMMIT")
+        except BaseException:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            raise
+        finally:
+            metrics.histogram(
+                "kiosk_db_lock_hold_seconds", "Time the write lock was held", stmt=name
+            ).observe(time.perf_counter() - locked)
+        return result
+    finally:
+        con.close()
+
+
+@metrics.timed("kiosk_audit_write_seconds", "Time to write an audit row")
 def log_event(account_id, event_type, amount=0.0, details="", conn=None):
     """
     If conn is provided, reuse it (prevents DB locking).
     Otherwise, open a safe standalone connection.
     """
+    if metrics.enabled():
+        metrics.counter(
+            "kiosk_audit_events_total", "Audit events written", event=event_type
+        ).inc()
+
     if conn is None:
-        with get_conn() as con:
-            cur = con.cursor()
-            cur.execute("""
-                INSERT INTO audit_log (account_id, event_type, amount, details)
-                VALUES (?, ?, ?, ?)
-            """, (account_id, event_type, amount, details))
-            con.commit()
+        write("audit", lambda con: con.execute("""
+            INSERT INTO audit_log (account_id, event_type, amount, details)
+            VALUES (?, ?, ?, ?)
+        """, (account_id, event_type, amount, details)), AUDIT_WRITE_ATTEMPTS)
+        _notify(account_id, event_type, amount, details, None)
     else:
         cur = conn.cursor()
         cur.execute("""
             INSERT INTO audit_log (account_id, event_type, amount, details)
             VALUES (?, ?, ?, ?)
         """, (account_id, event_type, amount, details))
+        _notify(account_id, event_type, amount, details, conn)
@@ -0,0 +1,278 @@
+# database/fx.py
+"""
+Account currencies and FX rates.
+
+    python -m database.fx --load rates.csv        # or rates.json
+    python -m database.fx --feed http://127.0.0.1:8767/rates
+
+Rates are stored as numbered versions (one row per currency, in units of
+BASE_CURRENCY per unit of the currency) and held in memory as immutable
+RateSnapshot objects. Posting converts with rates.current(), which is a
+plain attribute read: no query. A refresh writes a whole new version in
+one transaction and then swaps the snapshot in; versions stored by
+another process (`--load` above) are swapped in by watch(), a
+background MAX(version) poll that re-reads the rates only when the
+version changed.
+
+Each posting records the version it used, so a receipt can always be
+re-derived with snapshot(version).
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import threading
+import time
+import traceback
+import urllib.request
+
+from database.db import get_conn
+
+WATCH_SECONDS = float(os.environ.get("KIOSK_FX_WATCH", "60"))
+
+BASE_CURRENCY = "PHP"
+CASH_CURRENCY = BASE_CURRENCY        # notes the kiosk accepts
+
+SYMBOLS = {
+    "PHP": "₱",
+    "USD": "$",
+    "EUR": "€",
+    "JPY": "¥",
+    "SGD": "S$",
+}
+
+# Version 1 on a fresh database
+DEFAULT_RATES = {
+    "PHP": 1.0,
+    "USD": 56.0,
+    "EUR": 61.0,
+    "JPY": 0.38,
+    "SGD": 42.0,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fx_versions (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT,
+    loaded_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS fx_rates (
+    version INTEGER NOT NULL,
+    currency TEXT NOT NULL,
+    rate REAL NOT NULL,
+    PRIMARY KEY (version, currency)
+) WITHOUT ROWID;
+"""
+
+
+class FxError(Exception):
+    pass
+
+
+def format_amount(amount, currency=BASE_CURRENCY):
+    symbol = SYMBOLS.get(currency)
+    if symbol is None:
+        return f"{amount:,.2f} {currency}"
+    return f"{symbol}{amount:,.2f}"
+
+
+class RateSnapshot:
+    """One immutable rate version."""
+    __slots__ = ("version", "rates")
+
+    def __init__(self, version, rates):
+        self.version = version
+        self.rates = rates
+
+    def rate(self, from_currency, to_currency):
+        if from_currency == to_currency:
+            return 1.0
+        try:
+            return self.rates[from_currency] / self.rates[to_currency]
+        except KeyError as e:
+            raise FxError(f"No rate for {e.args[0]} in rates v{self.version}")
+
+    def convert(self, amount, from_currency, to_currency):
+        return round(amount * self.rate(from_currency, to_currency), 2)
+
+
+class RateCache:
+    # old versions kept for receipts and reprints
+    KEEP_VERSIONS = 16
+
+    def __init__(self):
+        self._current = None
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def current(self):
+        snap = self._current
+        if snap is None:
+            snap = self.reload()
+        return snap
+
+    def snapshot(self, version):
+        snap = self._versions.get(version)
+        if snap is None:
+            with get_conn() as con:
+                snap = self._read(con, version)
+            self._keep(snap)
+        return snap
+
+    # -------------------------------------------------
+    # Loading
+    # -------------------------------------------------
+    def reload(self, conn=None):
+        """Swap in the newest stored version (if it changed)."""
+        if conn is None:
+            with get_conn() as con:
+                return self.reload(conn=con)
+
+        version = conn.execute("SELECT MAX(version) FROM fx_versions").fetchone()[0]
+        if version is None:
+            raise FxError("No FX rates loaded.")
+        if self._current is not None and self._current.version == version:
+            return self._current
+
+        snap = self._read(conn, version)
+        self._keep(snap)
+        self._current = snap
+        return snap
+
+    def _read(self, conn, version):
+        rates = dict(conn.execute(
+            "SELECT currency, rate FROM fx_rates WHERE version = ?", (version,)
+        ).fetchall())
+        if not rates:
+            raise FxError(f"Unknown rates version {version}.")
+        rates[BASE_CURRENCY] = 1.0
+        return RateSnapshot(version, rates)
+
+    def _keep(self, snap):
+        with self._lock:
+            self._versions[snap.version] = snap
+            while len(self._versions) > self.KEEP_VERSIONS:
+                del self._versions[min(self._versions)]
+
+    # -------------------------------------------------
+    # Bulk refresh
+    # -------------------------------------------------
+    def store(self, rates, source, conn=None):
+        """
+        Write `rates` as a new version and make it current. Currencies
+        the source leaves out keep their current rate.
+        """
+        if conn is None:
+            with get_conn() as con:
+                snap = self.store(rates, source, conn=con)
+                con.commit()
+            return snap
+
+        incoming = {c.upper(): float(r) for c, r in rates.items()}
+        bad = [c for c, r in incoming.items() if r <= 0]
+        if bad:
+            raise FxError(f"Invalid rate for {', '.join(bad)}")
+
+        rates = dict(self._current.rates) if self._current else {}
+        rates.update(incoming)
+        rates[BASE_CURRENCY] = 1.0
+
+        version = conn.execute(
+            "INSERT INTO fx_versions (source) VALUES (?)", (source,)
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO fx_rates (version, currency, rate) VALUES (?, ?, ?)",
+            ((version, c, r) for c, r in rates.items())
+        )
+        snap = RateSnapshot(version, rates)
+        self._keep(snap)
+        self._current = snap
+        return snap
+
+    def refresh(self, source):
+        """Load a rate file (.csv/.json) or an http(s) feed as a new version."""
+        if source.startswith(("http://", "https://")):
+            with urllib.request.urlopen(source, timeout=10) as resp:
+                text = resp.read().decode()
+        else:
+            with open(source, encoding="utf-8") as f:
+                text = f.read()
+        return self.store(parse(text), source)
+
+
+def parse(text):
+    """{"USD": 56.1, ...} JSON, or CSV rows of currency,rate."""
+    text = text.strip()
+    if text.startswith("{"):
+        data = json.loads(text)
+        return data.get("rates", data)
+
+    rates = {}
+    for row in csv.reader(io.StringIO(text)):
+        if not row or row[0].strip().lower() in ("currency", ""):
+            continue
+        rates[row[0].strip()] = float(row[1])
+    return rates
+
+
+def init_db():
+    with get_conn() as con:
+        cols = [r[1] for r in con.execute("PRAGMA table_info(accounts)")]
+        if "currency" not in cols:
+            con.execute(
+                "ALTER TABLE accounts ADD COLUMN currency TEXT NOT NULL "
+                f"DEFAULT '{BASE_CURRENCY}'"
+            )
+        con.executescript(SCHEMA)
+        if con.execute("SELECT COUNT(*) FROM fx_versions").fetchone()[0] == 0:
+            rates.store(DEFAULT_RATES, "defaults", conn=con)
+        con.commit()
+        rates.reload(conn=con)
+
+
+def start_background(source, interval=900):
+    """Refresh from `source` every `interval` seconds on a daemon thread."""
+    def loop():
+        while True:
+            try:
+                rates.refresh(source)
+            except Exception:
+                traceback.print_exc()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, daemon=True, name="fx-refresh")
+    thread.start()
+    return thread
+
+
+def watch(interval=WATCH_SECONDS):
+    """Reload when another process stores a version, on a daemon thread."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                rates.reload()
+            except Exception:
+                traceback.print_exc()
+
+    thread = threading.Thread(target=loop, daemon=True, name="fx-watch")
+    thread.start()
+    return thread
+
+
+rates = RateCache()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--load", metavar="FILE")
+    group.add_argument("--feed", metavar="URL")
+    args = parser.parse_args()
+
+    init_db()
+    snap = rates.refresh(args.load or args.feed)
+    print(f"Loaded rates v{snap.version}: " + ", ".join(
+        f"{c}={r:g}" for c, r in sorted(snap.rates.items())
+    ))
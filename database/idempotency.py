@@ -0,0 +1,88 @@
+# database/idempotency.py
+"""
+Request-key dedup for postings.
+
+Each submission carries a key generated when the transaction screen is
+set up. A key seen before returns the stored posting instead of posting
+again: first from an in-memory LRU, then from the unique-indexed table.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from database.db import get_conn
+
+RECENT_MAX = 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS request_keys (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_key TEXT NOT NULL UNIQUE,
+    account_id INTEGER,
+    posting TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+_recent = OrderedDict()
+_lock = threading.Lock()
+
+
+def init_db():
+    with get_conn() as con:
+        con.executescript(SCHEMA)
+
+
+def _cache(request_key, posting):
+    with _lock:
+        _recent[request_key] = posting
+        _recent.move_to_end(request_key)
+        while len(_recent) > RECENT_MAX:
+            _recent.popitem(last=False)
+
+
+def lookup(request_key, conn):
+    """Stored posting for the key, or None."""
+    with _lock:
+        posting = _recent.get(request_key)
+        if posting is not None:
+            _recent.move_to_end(request_key)
+            return posting
+
+    row = conn.execute(
+        "SELECT posting FROM request_keys WHERE request_key = ?",
+        (request_key,)
+    ).fetchone()
+    if not row:
+        return None
+
+    posting = json.loads(row[0])
+    _cache(request_key, posting)
+    return posting
+
+
+def lookup_many(request_keys, conn, chunk=500):
+    """{request_key: posting} for the keys that were posted."""
+    found = {}
+    for i in range(0, len(request_keys), chunk):
+        keys = request_keys[i:i + chunk]
+        marks = ",".join("?" * len(keys))
+        for key, posting in conn.execute(
+            f"SELECT request_key, posting FROM request_keys WHERE request_key IN ({marks})",
+            keys
+        ):
+            found[key] = json.loads(posting)
+    return found
+
+
+def remember(request_key, account_id, posting, conn):
+    """Store the key in the posting's own transaction (before commit)."""
+    conn.execute(
+        "INSERT INTO request_keys (request_key, account_id, posting) VALUES (?, ?, ?)",
+        (request_key, account_id, json.dumps(posting))
+    )
+
+
+def committed(request_key, posting):
+    """Call once the posting's transaction has committed."""
+    _cache(request_key, posting)
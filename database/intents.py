@@ -0,0 +1,274 @@
+# database/intents.py
+"""
+Crash-safe intent journal for postings.
+
+Every posting made from the transaction screen moves one row through
+
+    OPEN -> POSTED -> AUDITED -> DONE
+
+with a local commit at each step: before the ledger call, after it
+returns, after its audit row is written and once the receipt is on
+screen. A kiosk that dies part-way leaves the row open. At boot,
+recover() finishes or flags every open intent:
+
+  * posted but not audited  -> audit row written, receipt re-issued
+  * audited, no receipt     -> receipt re-issued
+  * never reached the ledger -> INTENT_ABANDONED in the audit log
+
+Intents always live in the kiosk's own database, even when postings go
+to the central ledger service. Re-issued receipts are spooled to
+RECEIPT_DIR for staff to reprint.
+"""
+import json
+import os
+import time
+
+from database import fx
+from database.db import get_conn, write
+
+RECEIPT_DIR = os.environ.get("KIOSK_RECEIPT_DIR", "logs/receipts")
+RECOVERY_BATCH = 500
+KEEP_DAYS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS intents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_key TEXT NOT NULL UNIQUE,
+    account_id INTEGER,
+    kind TEXT NOT NULL,
+    amount REAL NOT NULL,
+    target TEXT,
+    state TEXT NOT NULL DEFAULT 'OPEN',
+    posting TEXT,
+    error TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    closed_at DATETIME
+);
+CREATE INDEX IF NOT EXISTS idx_intents_open
+    ON intents(id) WHERE closed_at IS NULL;
+"""
+
+RECEIPT_TITLES = {
+    "transfer": "Transfer Funds",
+    "bill": "Bill Payment",
+    "deposit": "Cash Deposit",
+}
+
+
+def init_db():
+    with get_conn() as con:
+        con.executescript(SCHEMA)
+
+
+# -------------------------------------------------
+# What a posting owes: one audit row and one receipt
+# -------------------------------------------------
+def audit_entry(posting):
+    """(event_type, amount, details) of the posting's audit row."""
+    kind, target = posting["kind"], posting["target"]
+    if kind == "transfer":
+        return "TRANSFER", posting["amount"], f"To {target}"
+    if kind == "bill":
+        return "BILL_PAYMENT", posting["amount"], target
+    # deposits from the cash acceptor carry their note breakdown
+    return "CASH_DEPOSIT", posting["amount"], target
+
+
+def receipt(posting):
+    # postings from before multi-currency carry no currency fields
+    currency = posting.get("currency", fx.BASE_CURRENCY)
+    data = {
+        "type": RECEIPT_TITLES[posting["kind"]],
+        "amount": posting["amount"],
+        "currency": currency,
+        "account_currency": posting.get("account_currency", currency),
+        "old_balance": posting["old_balance"],
+        "new_balance": posting["new_balance"],
+        "timestamp": posting["timestamp"],
+        "fx_version": posting.get("fx_version"),
+    }
+    if posting["target"]:
+        key = "notes" if posting["kind"] == "deposit" else "recipient"
+        data[key] = posting["target"]
+    if posting.get("credit_currency", currency) != currency:
+        data["converted"] = {
+            "amount": posting["credit_amount"],
+            "currency": posting["credit_currency"],
+            "rate": posting["rate"],
+        }
+    return data
+
+
+def conversion_text(data):
+    converted = data["converted"]
+    return (
+        f"Converted: {fx.format_amount(converted['amount'], converted['currency'])} "
+        f"(1 {data['currency']} = {converted['rate']:.6g} {converted['currency']}, "
+        f"FX rates v{data['fx_version']})"
+    )
+
+
+def receipt_lines(data):
+    """Receipt text shared by the receipt screen and re-issued receipts."""
+    account_currency = data.get("account_currency", fx.BASE_CURRENCY)
+    lines = [
+        f"Transaction Type: {data['type']}",
+        f"Amount: {fx.format_amount(data['amount'], data.get('currency', fx.BASE_CURRENCY))}",
+    ]
+    if data.get("converted"):
+        lines.append(conversion_text(data))
+    if data.get("recipient"):
+        lines.append(f"Recipient: {data['recipient']}")
+    if data.get("notes"):
+        lines.append(f"Notes: {data['notes']}")
+    lines += [
+        f"Balance: {fx.format_amount(data['old_balance'], account_currency)} → "
+        f"{fx.format_amount(data['new_balance'], account_currency)}",
+        f"Timestamp: {data['timestamp']}",
+    ]
+    return lines
+
+
+# -------------------------------------------------
+# Live path (one short commit each)
+# -------------------------------------------------
+def begin(request_key, account_id, kind, amount, target=""):
+    # A retry reuses the key: after a refused posting (FAILED), or after
+    # a failure that left no answer (e.g. the ledger service unreachable)
+    write("intent_begin", lambda con: con.execute("""
+        INSERT INTO intents (request_key, account_id, kind, amount, target)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(request_key) DO UPDATE SET
+            amount = excluded.amount,
+            target = excluded.target,
+            state = 'OPEN',
+            error = NULL,
+            closed_at = NULL
+        WHERE state = 'FAILED' OR (state = 'OPEN' AND posting IS NULL)
+    """, (request_key, account_id, kind, amount, target)))
+
+
+def posted(request_key, posting):
+    """Record the ledger's answer. Returns True if the audit row is still owed."""
+    def record(con):
+        state = con.execute(
+            "SELECT state FROM intents WHERE request_key = ?", (request_key,)
+        ).fetchone()
+        if state and state[0] in ("AUDITED", "DONE"):
+            return False
+        con.execute(
+            "UPDATE intents SET state = 'POSTED', posting = ? WHERE request_key = ?",
+            (json.dumps(posting), request_key)
+        )
+        return True
+
+    return write("intent_posted", record)
+
+
+def _set_state(request_key, state, error=None, closed=False):
+    write(f"intent_{state.lower()}", lambda con: con.execute(f"""
+        UPDATE intents
+        SET state = ?, error = COALESCE(?, error)
+            {", closed_at = CURRENT_TIMESTAMP" if closed else ""}
+        WHERE request_key = ?
+    """, (state, error, request_key)))
+
+
+def audited(request_key):
+    _set_state(request_key, "AUDITED")
+
+
+def close(request_key):
+    _set_state(request_key, "DONE", closed=True)
+
+
+def fail(request_key, error):
+    """The ledger refused the posting: nothing is owed."""
+    _set_state(request_key, "FAILED", error=error, closed=True)
+
+
+def open_count():
+    with get_conn() as con:
+        return con.execute(
+            "SELECT COUNT(*) FROM intents WHERE closed_at IS NULL"
+        ).fetchone()[0]
+
+
+# -------------------------------------------------
+# Boot recovery
+# -------------------------------------------------
+def _spool_receipt(request_key, data):
+    os.makedirs(RECEIPT_DIR, exist_ok=True)
+    lines = ["RE-ISSUED RECEIPT"] + receipt_lines(data) + [f"Reference: {request_key}"]
+    path = os.path.join(RECEIPT_DIR, f"{request_key}.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def recover(backend, batch=RECOVERY_BATCH):
+    """
+    Finish or flag every open intent. Ledger lookups and audit rows go
+    through `backend` in batches; if it is unreachable the intents stay
+    open for the next boot. Returns a summary dict.
+    """
+    start = time.perf_counter()
+    summary = {"finished": 0, "audited": 0, "abandoned": 0}
+
+    with get_conn() as con:
+        rows = con.execute("""
+            SELECT request_key, account_id, kind, amount, target, state, posting
+            FROM intents WHERE closed_at IS NULL ORDER BY id
+        """).fetchall()
+
+    for i in range(0, len(rows), batch):
+        chunk = rows[i:i + batch]
+        unknown = [r[0] for r in chunk if r[6] is None]
+        found = backend.lookup_requests(unknown) if unknown else {}
+
+        audits, updates = [], []
+        for key, account_id, kind, amount, target, state, posting in chunk:
+            posting = json.loads(posting) if posting else found.get(key)
+
+            if posting is None:
+                what = f"{kind} {target}" if target else kind
+                audits.append((
+                    account_id, "INTENT_ABANDONED", amount,
+                    f"{what} interrupted before posting ({key})"
+                ))
+                updates.append(("ABANDONED", None, key))
+                summary["abandoned"] += 1
+                continue
+
+            if state in ("OPEN", "POSTED"):
+                audits.append((account_id, *audit_entry(posting)))
+                summary["audited"] += 1
+            _spool_receipt(key, receipt(posting))
+            updates.append(("RECOVERED", json.dumps(posting), key))
+            summary["finished"] += 1
+
+        # audit first: a crash in between re-audits, it never drops one
+        if audits:
+            backend.audit_many(audits)
+        with get_conn() as con:
+            con.executemany("""
+                UPDATE intents
+                SET state = ?, posting = COALESCE(?, posting),
+                    closed_at = CURRENT_TIMESTAMP
+                WHERE request_key = ?
+            """, updates)
+            con.commit()
+
+    with get_conn() as con:
+        con.execute(
+            "DELETE FROM intents WHERE closed_at < datetime('now', ?)",
+            (f"-{KEEP_DAYS} days",)
+        )
+        con.commit()
+
+    summary["seconds"] = time.perf_counter() - start
+    if rows:
+        backend.audit(
+            None, "INTENT_RECOVERY", 0.0,
+            f"{summary['finished']} finished, {summary['abandoned']} abandoned"
+        )
+    return summary
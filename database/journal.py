@@ -0,0 +1,100 @@
+# database/journal.py
+import os
+import uuid
+
+from database.db import get_conn
+
+# Identifies this kiosk to the central ledger
+KIOSK_ID = os.environ.get("KIOSK_ID", "kiosk-01")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entry_key TEXT UNIQUE NOT NULL,
+    kiosk_id TEXT NOT NULL,
+    account_id INTEGER,
+    type TEXT NOT NULL,
+    amount REAL DEFAULT 0,
+    details TEXT,
+    currency TEXT,
+    credit_amount REAL,
+    credit_currency TEXT,
+    fx_version INTEGER,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    shipped_at DATETIME
+);
+CREATE INDEX IF NOT EXISTS idx_journal_pending
+    ON journal(id) WHERE shipped_at IS NULL;
+"""
+
+# Added with per-account currencies: `amount` is in `currency`, the
+# credited side in `credit_currency`, both at rates `fx_version`
+FX_COLUMNS = (
+    ("currency", "TEXT"),
+    ("credit_amount", "REAL"),
+    ("credit_currency", "TEXT"),
+    ("fx_version", "INTEGER"),
+)
+
+
+def init_db():
+    with get_conn() as con:
+        con.executescript(SCHEMA)
+        cols = [r[1] for r in con.execute("PRAGMA table_info(journal)")]
+        for name, decl in FX_COLUMNS:
+            if name not in cols:
+                con.execute(f"ALTER TABLE journal ADD COLUMN {name} {decl}")
+        con.commit()
+
+
+# -------------------------------------------------
+# Outbound entries
+# -------------------------------------------------
+def record(conn, account_id, entry_type, amount=0.0, details="",
+           currency=None, credit_amount=None, credit_currency=None, fx_version=None):
+    """
+    Must be called on the posting's own connection, before commit,
+    so the journal row lands in the same transaction as the balances.
+    """
+    entry_key = f"{KIOSK_ID}:{uuid.uuid4().hex}"
+    conn.execute("""
+        INSERT INTO journal
+            (entry_key, kiosk_id, account_id, type, amount, details,
+             currency, credit_amount, credit_currency, fx_version)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (entry_key, KIOSK_ID, account_id, entry_type, amount, details,
+          currency, credit_amount, credit_currency, fx_version))
+    return entry_key
+
+
+def pending(limit=500):
+    with get_conn() as con:
+        cur = con.cursor()
+        cur.execute("""
+            SELECT entry_key, kiosk_id, account_id, type, amount, details,
+                   currency, credit_amount, credit_currency, fx_version, created_at
+            FROM journal
+            WHERE shipped_at IS NULL
+            ORDER BY id
+            LIMIT ?
+        """, (limit,))
+        cols = [c[0] for c in cur.description]
+        return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def pending_count():
+    with get_conn() as con:
+        return con.execute(
+            "SELECT COUNT(*) FROM journal WHERE shipped_at IS NULL"
+        ).fetchone()[0]
+
+
+def mark_shipped(entry_keys):
+    if not entry_keys:
+        return
+    with get_conn() as con:
+        con.executemany(
+            "UPDATE journal SET shipped_at = CURRENT_TIMESTAMP WHERE entry_key = ?",
+            [(k,) for k in entry_keys]
+        )
+        con.commit()
@@ -0,0 +1,474 @@
+# database/ledger.py
+"""
+Local ledger operations.
+
+Screens reach these through database.backend, which is either this module
+or a services.ledger_client.LedgerClient with the same functions. Every
+function takes an optional conn like log_event: when given, the caller owns
+the transaction and nothing is committed here.
+"""
+import sqlite3
+from datetime import datetime
+
+from database.db import get_conn, log_event, write
+from database import fx, idempotency, journal, limits, risk, scheduled
+from security import verify_pin
+
+TX_TYPES = {
+    "transfer": "TRANSFER",
+    "bill": "BILL_PAYMENT",
+    "deposit": "CASH_DEPOSIT",
+}
+
+# Internal clearing accounts for the far leg of deposits and bills.
+# Negative ids never collide with customer accounts.
+CASH_ACCOUNT = -1
+BILLER_ACCOUNT = -2
+
+# Every transactions row is a header; its legs live in postings with the
+# running balance of the leg's account after the leg was applied.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tx_id INTEGER,
+    account_id INTEGER NOT NULL,
+    leg TEXT NOT NULL CHECK (leg IN ('DEBIT', 'CREDIT')),
+    amount REAL NOT NULL,
+    balance_after REAL,
+    type TEXT NOT NULL,
+    counterparty TEXT,
+    ts DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_postings_account
+    ON postings(account_id, id);
+CREATE INDEX IF NOT EXISTS idx_postings_account_ts
+    ON postings(account_id, ts, id);
+CREATE INDEX IF NOT EXISTS idx_postings_tx
+    ON postings(tx_id);
+"""
+
+
+def init_db():
+    # posting converts with the cached rates (and needs accounts.currency)
+    fx.init_db()
+    with get_conn() as con:
+        fresh = not con.execute(
+            "SELECT 1 FROM sqlite_master WHERE name='postings'"
+        ).fetchone()
+        con.executescript(SCHEMA)
+        if fresh:
+            _migrate(con)
+        con.commit()
+
+
+def _migrate(con):
+    """
+    One-off move to double entry. Legacy one-sided rows are kept as legs
+    without a running balance, then every account is opened at its
+    current balance so running balances are exact from here on.
+    """
+    con.execute("""
+        INSERT INTO postings (tx_id, account_id, leg, amount, type, ts)
+        SELECT id, account_id,
+               CASE type WHEN 'CASH_DEPOSIT' THEN 'CREDIT' ELSE 'DEBIT' END,
+               amount, type, timestamp
+        FROM transactions
+        ORDER BY id
+    """)
+    con.execute("""
+        INSERT INTO postings (account_id, leg, amount, balance_after, type)
+        SELECT id, 'CREDIT', balance, balance, 'OPENING_BALANCE'
+        FROM accounts
+        ORDER BY id
+    """)
+
+
+class PostingError(Exception):
+    """A posting was refused; the message is safe to show the user."""
+
+
+class PostingHeld(PostingError):
+    """Refused by the risk scorer; audit it once the rollback is done."""
+
+    def __init__(self, reasons):
+        super().__init__("Transaction held for review. Please contact the bank.")
+        self.reasons = reasons
+
+
+# -------------------------------------------------
+# Reads
+# -------------------------------------------------
+def authenticate(card_number, pin, conn=None):
+    if conn is None:
+        with get_conn() as con:
+            return authenticate(card_number, pin, conn=con)
+
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id, balance, pin_hash
+        FROM accounts
+        WHERE card_number = ?
+    """, (card_number,))
+    row = cur.fetchone()
+
+    if not row:
+        return None
+
+    account_id, balance, stored_hash_hex = row
+    if verify_pin(pin, stored_hash_hex):
+        return account_id, balance
+    return None
+
+
+def account(account_id, conn=None):
+    if conn is None:
+        with get_conn() as con:
+            return account(account_id, conn=con)
+
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT id, card_number, balance, currency FROM accounts WHERE id=?",
+        (account_id,)
+    )
+    return cur.fetchone()
+
+
+def history(account_id, limit=20, conn=None):
+    """
+    Latest legs for the account, both sides of every transfer.
+    Rows: (type, signed amount, balance after, counterparty, tx id).
+    """
+    if conn is None:
+        with get_conn() as con:
+            return history(account_id, limit, conn=con)
+
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT type,
+               CASE leg WHEN 'CREDIT' THEN amount ELSE -amount END,
+               balance_after, counterparty, tx_id
+        FROM postings
+        WHERE account_id = ?
+        ORDER BY id DESC
+        LIMIT ?
+    """, (account_id, limit))
+    return cur.fetchall()
+
+
+def latest_balance(account_id, conn=None):
+    """Running balance from the newest leg (index seek, no scan)."""
+    if conn is None:
+        with get_conn() as con:
+            return latest_balance(account_id, conn=con)
+
+    row = conn.execute("""
+        SELECT balance_after FROM postings
+        WHERE account_id = ? AND balance_after IS NOT NULL
+        ORDER BY id DESC
+        LIMIT 1
+    """, (account_id,)).fetchone()
+    return row[0] if row else 0.0
+
+
+def balance_at(account_id, ts, conn=None):
+    """Balance as of `ts` ('YYYY-MM-DD HH:MM:SS'), None if unknown."""
+    if conn is None:
+        with get_conn() as con:
+            return balance_at(account_id, ts, conn=con)
+
+    row = conn.execute("""
+        SELECT balance_after FROM postings
+        WHERE account_id = ? AND ts <= ?
+        ORDER BY ts DESC, id DESC
+        LIMIT 1
+    """, (account_id, ts)).fetchone()
+    return row[0] if row else None
+
+
+# -------------------------------------------------
+# Writes
+# -------------------------------------------------
+def post(account_id, kind, amount, target="", request_key=None, conn=None):
+    """
+    Apply a transfer, bill payment or deposit.
+
+    Returns the posting as a dict (tx_id, kind, amount, target,
+    old_balance, new_balance, timestamp, duplicate). A request_key that
+    was already posted returns the original posting with duplicate=True
+    and leaves balances untouched.
+    """
+    if conn is None:
+        posted = []
+
+        def apply(con):
+            posted.append(post(account_id, kind, amount, target, request_key, conn=con))
+            return posted[0]
+
+        try:
+            result = write("post", apply)
+        except PostingHeld as e:
+            held(account_id, amount, e)
+            raise
+        except sqlite3.IntegrityError:
+            # lost a race with the same key on another connection
+            if request_key is None:
+                raise
+            with get_conn() as con:
+                result = idempotency.lookup(request_key, con)
+            if result is None:
+                raise
+            return dict(result, duplicate=True)
+        except BaseException:
+            if posted:
+                # post() returned but the COMMIT failed
+                rolled_back(account_id, posted[0])
+            raise
+
+        committed(account_id, result, request_key)
+        return result
+
+    if request_key is not None:
+        previous = idempotency.lookup(request_key, conn)
+        if previous is not None:
+            return dict(previous, duplicate=True)
+
+    tx_type = TX_TYPES.get(kind)
+    if tx_type is None:
+        raise PostingError("Unsupported transaction.")
+
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT balance, card_number, currency FROM accounts WHERE id=?",
+        (account_id,)
+    )
+    row = cur.fetchone()
+    if not row:
+        raise PostingError("Account not found.")
+    old_balance, card_number, currency = row
+
+    # Deposits are counted in kiosk cash; everything else is entered in
+    # the account's currency. Clearing accounts keep the base currency.
+    rates = fx.rates.current()
+    entry_currency = fx.CASH_CURRENCY if kind == "deposit" else currency
+    base_amount = _convert(rates, amount, entry_currency, fx.BASE_CURRENCY)
+
+    # in-memory, inside the write transaction: a later posting in the
+    # same group commit already sees this one's amount
+    try:
+        bucket = limits.engine.reserve(account_id, kind, base_amount)
+    except limits.LimitExceeded as e:
+        raise PostingError(str(e))
+
+    try:
+        result = _apply(
+            cur, account_id, kind, amount, target, request_key, tx_type,
+            row, rates, entry_currency, base_amount
+        )
+    except BaseException:
+        limits.engine.release(account_id, kind, base_amount, bucket)
+        raise
+    # for rolled_back(), if the caller's transaction doesn't commit
+    result["limit_bucket"] = bucket
+    return result
+
+
+def _apply(cur, account_id, kind, amount, target, request_key, tx_type,
+           row, rates, entry_currency, base_amount):
+    conn = cur.connection
+    old_balance, card_number, currency = row
+
+    verdict = risk.scorer.assess(account_id, kind, amount, target)
+    if verdict.action == "hold":
+        raise PostingHeld(verdict.reasons)
+
+    if kind != "deposit" and amount > old_balance:
+        raise PostingError("Insufficient balance.")
+
+    rec = None
+    details = target
+    if kind == "transfer":
+        cur.execute(
+            "SELECT id, balance, currency FROM accounts WHERE card_number=?",
+            (target,)
+        )
+        rec = cur.fetchone()
+        if not rec:
+            raise PostingError("Recipient not found.")
+        if rec[0] == account_id:
+            raise PostingError("Cannot transfer to the same account.")
+        credit_currency = rec[2]
+        details = f"To {target}"
+    elif kind == "bill":
+        credit_currency = fx.BASE_CURRENCY
+    else:
+        credit_currency = currency
+    credit_amount = _convert(rates, amount, entry_currency, credit_currency)
+
+    if kind == "deposit":
+        new_balance = old_balance + credit_amount
+    else:
+        new_balance = old_balance - amount
+
+    cur.execute(
+        "UPDATE accounts SET balance=? WHERE id=?",
+        (new_balance, account_id)
+    )
+    cur.execute(
+        "INSERT INTO transactions(account_id, amount, type) VALUES(?,?,?)",
+        (account_id, amount, tx_type)
+    )
+    tx_id = cur.lastrowid
+
+    if kind == "transfer":
+        rec_id, rec_balance, _ = rec
+        cur.execute(
+            "UPDATE accounts SET balance=? WHERE id=?",
+            (rec_balance + credit_amount, rec_id)
+        )
+        _leg(cur, tx_id, account_id, "DEBIT", amount, new_balance, tx_type, masked_card(target))
+        _leg(cur, tx_id, rec_id, "CREDIT", credit_amount, rec_balance + credit_amount,
+             tx_type, masked_card(card_number))
+    elif kind == "bill":
+        _leg(cur, tx_id, account_id, "DEBIT", amount, new_balance, tx_type, target)
+        _leg(cur, tx_id, BILLER_ACCOUNT, "CREDIT", credit_amount, None, tx_type, masked_card(card_number))
+    else:
+        _leg(cur, tx_id, CASH_ACCOUNT, "DEBIT", amount, None, tx_type, masked_card(card_number))
+        _leg(cur, tx_id, account_id, "CREDIT", credit_amount, new_balance, tx_type, "Cash")
+
+    journal.record(
+        conn, account_id, tx_type, amount, details,
+        entry_currency, credit_amount, credit_currency, rates.version
+    )
+
+    if verdict.action == "flag":
+        log_event(
+            account_id, "RISK_FLAG", amount,
+            f"{tx_type} {details}: " + "; ".join(verdict.reasons),
+            conn=conn
+        )
+
+    result = {
+        "tx_id": tx_id,
+        "kind": kind,
+        "amount": amount,
+        "target": target,
+        "currency": entry_currency,
+        "credit_amount": credit_amount,
+        "credit_currency": credit_currency,
+        "rate": rates.rate(entry_currency, credit_currency),
+        "base_amount": base_amount,
+        "account_currency": currency,
+        "fx_version": rates.version,
+        "old_balance": old_balance,
+        "new_balance": new_balance,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "duplicate": False,
+    }
+    if request_key is not None:
+        idempotency.remember(request_key, account_id, result, conn)
+
+    return result
+
+
+def committed(account_id, result, request_key=None):
+    """Bookkeeping once a posting's transaction has committed."""
+    if result["duplicate"]:
+        return
+    if request_key is not None:
+        idempotency.committed(request_key, result)
+
+
+def rolled_back(account_id, result):
+    """A posting returned but its transaction rolled back after all."""
+    if not result["duplicate"]:
+        limits.engine.release(
+            account_id, result["kind"], result["base_amount"], result["limit_bucket"]
+        )
+
+
+def held(account_id, amount, error, conn=None):
+    """Audit a held posting (after its transaction rolled back)."""
+    log_event(account_id, "RISK_HOLD", amount, "; ".join(error.reasons), conn=conn)
+
+
+def remaining_limit(account_id, kind, conn=None):
+    return limits.engine.remaining(account_id, kind)
+
+
+def lookup_requests(request_keys, conn=None):
+    """{request_key: posting} for the keys that reached the ledger."""
+    if conn is None:
+        with get_conn() as con:
+            return idempotency.lookup_many(list(request_keys), con)
+    return idempotency.lookup_many(list(request_keys), conn)
+
+
+def _convert(rates, amount, from_currency, to_currency):
+    try:
+        return rates.convert(amount, from_currency, to_currency)
+    except fx.FxError as e:
+        raise PostingError(str(e))
+
+
+def masked_card(card_number):
+    """Counterparty as shown to the other side: last four digits only."""
+    return "•••• " + str(card_number)[-4:]
+
+
+def _leg(cur, tx_id, account_id, leg, amount, balance_after, tx_type, counterparty):
+    if balance_after is None:
+        # clearing accounts have no accounts row: seek their last leg
+        delta = amount if leg == "CREDIT" else -amount
+        balance_after = latest_balance(account_id, conn=cur.connection) + delta
+
+    cur.execute("""
+        INSERT INTO postings
+            (tx_id, account_id, leg, amount, balance_after, type, counterparty)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (tx_id, account_id, leg, amount, balance_after, tx_type, counterparty))
+
+
+def open_account(account_id, balance, conn):
+    """Opening leg for a newly created account."""
+    conn.execute("""
+        INSERT INTO postings (account_id, leg, amount, balance_after, type)
+        VALUES (?, 'CREDIT', ?, ?, 'OPENING_BALANCE')
+    """, (account_id, balance, balance))
+
+
+def reset_history(conn):
+    """
+    Wipe transactions and legs, then reopen every account at its
+    current balance.
+    """
+    conn.execute("DELETE FROM transactions")
+    conn.execute("DELETE FROM postings")
+    conn.execute("""
+        INSERT INTO postings (account_id, leg, amount, balance_after, type)
+        SELECT id, 'CREDIT', balance, balance, 'OPENING_BALANCE'
+        FROM accounts
+        ORDER BY id
+    """)
+
+
+def schedule_bill(account_id, bill_ref, amount, interval_days, conn=None):
+    """Repeat a bill payment every interval_days; returns the schedule id."""
+    if amount <= 0 or interval_days <= 0:
+        raise PostingError("Invalid schedule")
+    return scheduled.schedule(account_id, bill_ref, amount, interval_days, conn=conn)
+
+
+def audit(account_id, event_type, amount=0.0, details="", conn=None):
+    log_event(account_id, event_type, amount, details, conn=conn)
+
+
+def audit_many(entries, conn=None):
+    """Write [(account_id, event_type, amount, details)] in one transaction."""
+    if conn is None:
+        with get_conn() as con:
+            audit_many(entries, conn=con)
+            con.commit()
+        return
+
+    for account_id, event_type, amount, details in entries:
+        log_event(account_id, event_type, amount, details, conn=conn)
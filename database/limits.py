@@ -0,0 +1,249 @@
+# database/limits.py
+"""
+Rolling 24h transaction limits.
+
+Sums are kept in memory as per-minute buckets for every (account, type)
+and for the kiosk as a whole, in the base currency, seeded once from an
+aggregate query over the covering timestamp index. A check is a
+dictionary lookup plus expiring at most a few old buckets. Postings
+reserve their amount inside the write transaction (check and add under
+one lock hold, so postings batched into one commit can't each see the
+same headroom) and release it again if the transaction rolls back.
+
+Limits come from DEFAULT_LIMITS / KIOSK_DAILY_LIMIT, optionally
+overridden by a JSON file at KIOSK_LIMITS:
+    {"types": {"transfer": 20000},
+     "kiosk": 300000,
+     "accounts": {"12": {"transfer": 5000}}}
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from database import fx
+from database.db import get_conn
+
+WINDOW = 24 * 3600
+BUCKET = 60
+SWEEP_BUCKETS = 60               # drop idle windows at most once an hour
+
+DEFAULT_LIMITS = {
+    "transfer": 50_000.0,
+    "bill": 50_000.0,
+    "deposit": 100_000.0,
+}
+KIOSK_DAILY_LIMIT = 1_000_000.0
+LIMITS_PATH = os.environ.get("KIOSK_LIMITS", "database/limits.json")
+
+# transactions.type -> kind used by the screens
+_KINDS = {
+    "TRANSFER": "transfer",
+    "BILL_PAYMENT": "bill",
+    "CASH_DEPOSIT": "deposit",
+}
+
+SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_transactions_ts
+    ON transactions(timestamp, account_id, type, amount);
+"""
+
+
+class LimitExceeded(Exception):
+    pass
+
+
+class _Window:
+    """Rolling sum over per-minute buckets."""
+    __slots__ = ("buckets", "total")
+
+    def __init__(self):
+        self.buckets = deque()
+        self.total = 0.0
+
+    def expire(self, now_bucket):
+        oldest = now_bucket - WINDOW // BUCKET
+        while self.buckets and self.buckets[0][0] <= oldest:
+            self.total -= self.buckets.popleft()[1]
+
+    def add(self, bucket, amount):
+        if self.buckets and self.buckets[-1][0] == bucket:
+            self.buckets[-1][1] += amount
+        else:
+            self.buckets.append([bucket, amount])
+        self.total += amount
+
+    def remove(self, bucket, amount):
+        # newest first: a released reservation is only moments old. An
+        # expired bucket already left the total.
+        for entry in reversed(self.buckets):
+            if entry[0] == bucket:
+                entry[1] -= amount
+                self.total -= amount
+                return
+            if entry[0] < bucket:
+                return
+
+
+class LimitsEngine:
+    def __init__(self, path=LIMITS_PATH):
+        self.type_limits = dict(DEFAULT_LIMITS)
+        self.kiosk_limit = KIOSK_DAILY_LIMIT
+        self.account_limits = {}
+        self.windows = {}
+        self.kiosk = _Window()
+        self.seeded = False
+        self._swept = 0
+        self._lock = threading.Lock()
+        self.load_config(path)
+
+    # -------------------------------------------------
+    # Config
+    # -------------------------------------------------
+    def load_config(self, path):
+        if not path or not os.path.exists(path):
+            return
+        with open(path) as f:
+            cfg = json.load(f)
+        self.type_limits.update(cfg.get("types", {}))
+        self.kiosk_limit = cfg.get("kiosk", self.kiosk_limit)
+        self.account_limits = {
+            int(acc): limits for acc, limits in cfg.get("accounts", {}).items()
+        }
+
+    def limit(self, account_id, kind):
+        override = self.account_limits.get(account_id, {})
+        return override.get(kind, self.type_limits.get(kind))
+
+    # -------------------------------------------------
+    # Seeding
+    # -------------------------------------------------
+    def seed(self):
+        with get_conn() as con:
+            rows = con.execute("""
+                SELECT t.account_id, t.type,
+                       CAST(strftime('%s', t.timestamp) AS INTEGER) / ? AS bucket,
+                       SUM(t.amount), a.currency
+                FROM transactions t
+                LEFT JOIN accounts a ON a.id = t.account_id
+                WHERE t.timestamp >= datetime('now', ?)
+                GROUP BY t.account_id, t.type, bucket
+                ORDER BY bucket
+            """, (BUCKET, f"-{WINDOW} seconds")).fetchall()
+
+        # Headers are in the entry currency (cash for deposits); today's
+        # rates are close enough for a rolling 24h window
+        rates = fx.rates.current()
+
+        with self._lock:
+            self.windows = {}
+            self.kiosk = _Window()
+            for account_id, tx_type, bucket, total, currency in rows:
+                kind = _KINDS.get(tx_type)
+                if kind is None:
+                    continue
+                if kind != "deposit" and currency:
+                    try:
+                        total = rates.convert(total, currency, fx.BASE_CURRENCY)
+                    except fx.FxError:
+                        pass
+                self._window(account_id, kind).add(bucket, total)
+                self.kiosk.add(bucket, total)
+            self.seeded = True
+
+    def _window(self, account_id, kind):
+        key = (account_id, kind)
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = _Window()
+        return window
+
+    # -------------------------------------------------
+    # Checks
+    # -------------------------------------------------
+    def remaining(self, account_id, kind):
+        if not self.seeded:
+            self.seed()
+
+        now_bucket = int(time.time()) // BUCKET
+        with self._lock:
+            return self._remaining(account_id, kind, now_bucket)
+
+    def _remaining(self, account_id, kind, now_bucket):
+        self._sweep(now_bucket)
+        self.kiosk.expire(now_bucket)
+
+        remaining = self.kiosk_limit - self.kiosk.total
+        limit = self.limit(account_id, kind)
+        if limit is not None:
+            window = self.windows.get((account_id, kind))
+            if window is not None:
+                window.expire(now_bucket)
+                limit -= window.total
+            remaining = min(remaining, limit)
+        return max(0.0, remaining)
+
+    def _sweep(self, now_bucket):
+        """Forget windows with nothing left in the last 24h."""
+        if now_bucket - self._swept < SWEEP_BUCKETS:
+            return
+        self._swept = now_bucket
+        for key, window in list(self.windows.items()):
+            window.expire(now_bucket)
+            if not window.buckets:
+                del self.windows[key]
+
+    def check(self, account_id, kind, amount):
+        remaining = self.remaining(account_id, kind)
+        if amount > remaining:
+            raise _exceeded(remaining)
+
+    def reserve(self, account_id, kind, amount):
+        """
+        check() and record() under one lock hold. Returns the bucket
+        the amount went into, for release().
+        """
+        if not self.seeded:
+            self.seed()
+
+        now_bucket = int(time.time()) // BUCKET
+        with self._lock:
+            remaining = self._remaining(account_id, kind, now_bucket)
+            if amount > remaining:
+                raise _exceeded(remaining)
+            self._window(account_id, kind).add(now_bucket, amount)
+            self.kiosk.add(now_bucket, amount)
+        return now_bucket
+
+    def release(self, account_id, kind, amount, bucket):
+        """Give back a reservation whose posting did not commit."""
+        with self._lock:
+            window = self.windows.get((account_id, kind))
+            if window is not None:
+                window.remove(bucket, amount)
+            self.kiosk.remove(bucket, amount)
+
+    def record(self, account_id, kind, amount):
+        if not self.seeded:
+            return
+        bucket = int(time.time()) // BUCKET
+        with self._lock:
+            self._window(account_id, kind).add(bucket, amount)
+            self.kiosk.add(bucket, amount)
+
+
+def _exceeded(remaining):
+    return LimitExceeded(
+        "Daily limit exceeded. Remaining today: "
+        + fx.format_amount(remaining, fx.BASE_CURRENCY)
+    )
+
+
+def init_db():
+    with get_conn() as con:
+        con.executescript(SCHEMA)
+    engine.seed()
+
+
+engine = LimitsEngine()
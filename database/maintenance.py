@@ -0,0 +1,232 @@
+# database/maintenance.py
+"""
+Background SQLite maintenance.
+
+    python -m database.maintenance [--task checkpoint|optimize|vacuum]
+
+get_conn() puts the database in WAL mode, but nothing in the app ever
+checkpoints it. This scheduler does, on its own thread:
+
+  * a PASSIVE checkpoint every tick (never waits on readers or writers),
+  * while the kiosk is idle on the welcome screen, a TRUNCATE checkpoint,
+    PRAGMA optimize and incremental vacuum as they fall due,
+  * a WAL size alarm in the audit log when the -wal file keeps growing.
+
+A database created without auto_vacuum has to be converted once with a
+full VACUUM, which locks it for the whole run; the scheduler skips
+vacuum until that is done offline with --task vacuum.
+
+Idle-only tasks are re-checked between steps and stop as soon as a
+session starts. Every run is timed into kiosk_maintenance_seconds and
+appended to logs/maintenance.log.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import traceback
+
+import metrics
+from database import db
+from database.db import log_event
+
+LOG_PATH = os.environ.get("KIOSK_MAINTENANCE_LOG", "logs/maintenance.log")
+WAL_ALARM_BYTES = int(os.environ.get("KIOSK_WAL_ALARM_MB", "64")) * 1024 * 1024
+
+TICK_SECONDS = 30
+IDLE_GRACE_SECONDS = 20          # welcome screen must be quiet this long
+TRUNCATE_INTERVAL = 15 * 60
+OPTIMIZE_INTERVAL = 6 * 3600
+VACUUM_INTERVAL = 24 * 3600
+VACUUM_STEP_PAGES = 256
+ALARM_REPEAT_SECONDS = 3600
+
+# Short busy timeout: maintenance gives way instead of queueing behind postings
+BUSY_TIMEOUT_MS = 200
+
+TASK_TIMERS = {
+    task: metrics.histogram(
+        "kiosk_maintenance_seconds", "Database maintenance task time", task=task
+    )
+    for task in ("passive_checkpoint", "truncate_checkpoint", "optimize", "vacuum")
+}
+WAL_BYTES = metrics.gauge("kiosk_wal_bytes", "Size of the SQLite -wal file")
+
+
+def wal_size():
+    try:
+        return os.path.getsize(db.DB_PATH + "-wal")
+    except OSError:
+        return 0
+
+
+def _connect():
+    con = db.get_conn()
+    con.isolation_level = None
+    con.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS};")
+    return con
+
+
+def _log(task, seconds, **details):
+    os.makedirs(os.path.dirname(LOG_PATH) or ".", exist_ok=True)
+    entry = {"ts": time.strftime("%Y-%m-%d %H:%M:%S"), "task": task,
+             "seconds": round(seconds, 4), **details}
+    with open(LOG_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+# -------------------------------------------------
+# Tasks (each returns details for the log line)
+# -------------------------------------------------
+def checkpoint(con, mode="PASSIVE"):
+    busy, wal_pages, moved = con.execute(
+        f"PRAGMA wal_checkpoint({mode});"
+    ).fetchone()
+    return {"busy": busy, "wal_pages": wal_pages, "checkpointed": moved}
+
+
+def optimize(con):
+    con.execute("PRAGMA optimize;")
+    return {}
+
+
+def vacuum(con, keep_going=lambda: True, convert=False):
+    """
+    Incremental vacuum in small steps. A database created without
+    auto_vacuum is skipped, or with `convert` converted once with a
+    full VACUUM (exclusive for its whole run: offline only).
+    """
+    if con.execute("PRAGMA auto_vacuum;").fetchone()[0] != 2:
+        if not convert:
+            return {"skipped": "auto_vacuum off; convert with --task vacuum"}
+        con.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+        con.execute("VACUUM;")
+        return {"converted": True}
+
+    freed = 0
+    while keep_going():
+        free = con.execute("PRAGMA freelist_count;").fetchone()[0]
+        if not free:
+            break
+        step = min(free, VACUUM_STEP_PAGES)
+        con.execute(f"PRAGMA incremental_vacuum({step});").fetchall()
+        freed += step
+    return {"freed_pages": freed}
+
+
+# -------------------------------------------------
+# Scheduler
+# -------------------------------------------------
+class MaintenanceScheduler(threading.Thread):
+    def __init__(self, tick=TICK_SECONDS):
+        super().__init__(daemon=True, name="db-maintenance")
+        self.tick = tick
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._idle_since = None
+        self._last = {}              # task -> monotonic time of last run
+        self._last_alarm = None
+        self._wal_pages = 0
+
+    # Called from the GUI thread on navigation
+    def set_idle(self, idle):
+        if idle:
+            if self._idle_since is None:
+                self._idle_since = time.monotonic()
+            self._wake.set()
+        else:
+            self._idle_since = None
+
+    def idle(self):
+        since = self._idle_since
+        return since is not None and time.monotonic() - since >= IDLE_GRACE_SECONDS
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                traceback.print_exc()
+            self._wake.wait(self.tick)
+            self._wake.clear()
+
+    def run_once(self):
+        now = time.monotonic()
+        con = _connect()
+        try:
+            self._timed("passive_checkpoint", checkpoint, con)
+            self._check_wal()
+
+            due = [
+                (name, interval) for name, interval in (
+                    ("truncate_checkpoint", TRUNCATE_INTERVAL),
+                    ("optimize", OPTIMIZE_INTERVAL),
+                    ("vacuum", VACUUM_INTERVAL),
+                )
+                if name not in self._last or now - self._last[name] >= interval
+            ]
+            for name, _ in due:
+                if not self.idle():
+                    break
+                if name == "truncate_checkpoint":
+                    self._timed(name, checkpoint, con, "TRUNCATE")
+                elif name == "optimize":
+                    self._timed(name, optimize, con)
+                else:
+                    self._timed(name, vacuum, con, self.idle)
+                self._last[name] = time.monotonic()
+        finally:
+            con.close()
+
+    def _timed(self, task, fn, *args):
+        start = time.perf_counter()
+        with TASK_TIMERS[task].time():
+            details = fn(*args)
+        if task == "passive_checkpoint":
+            # only worth a line when the WAL moved since the last tick
+            changed = details["wal_pages"] != self._wal_pages
+            self._wal_pages = details["wal_pages"]
+            if not changed:
+                return details
+        _log(task, time.perf_counter() - start, **details)
+        return details
+
+    def _check_wal(self):
+        size = wal_size()
+        WAL_BYTES.set(size)
+        if size < WAL_ALARM_BYTES:
+            return
+        if (self._last_alarm is not None and
+                time.monotonic() - self._last_alarm < ALARM_REPEAT_SECONDS):
+            return
+        self._last_alarm = time.monotonic()
+        log_event(None, "WAL_ALARM", details=f"kiosk.db-wal is {size / 1048576:.1f} MB")
+
+
+maintenance = MaintenanceScheduler()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--task", choices=("checkpoint", "optimize", "vacuum"), default=None
+    )
+    args = parser.parse_args()
+
+    con = _connect()
+    tasks = {
+        "checkpoint": lambda: checkpoint(con, "TRUNCATE"),
+        "optimize": lambda: optimize(con),
+        "vacuum": lambda: vacuum(con, convert=True),
+    }
+    for name in ([args.task] if args.task else tasks):
+        start = time.perf_counter()
+        details = tasks[name]()
+        print(f"{name}: {time.perf_counter() - start:.3f}s {details}")
+    print(f"WAL now {wal_size() / 1024:.0f} KB")
+    con.close()
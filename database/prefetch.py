@@ -0,0 +1,118 @@
+# database/prefetch.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database.backend import backend
+
+HISTORY_PAGE = 20
+
+
+class Prefetcher:
+    """
+    Loads the account snapshot and first history page in the background
+    so AccountInfoScreen and TransactionHistoryScreen can render at once.
+    Entries live for TTL seconds; a read that finds a load in flight
+    waits for it instead of issuing its own query.
+    """
+    TTL = 10.0
+    WAIT = 5.0
+
+    def __init__(self, workers=2):
+        self._pool = ThreadPoolExecutor(workers, "prefetch")
+        self._cache = {}
+        self._inflight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------
+    # Scheduling
+    # -------------------------------------------------
+    def prefetch_account(self, account_id):
+        self._schedule(("account", account_id), backend.account, account_id)
+
+    def prefetch_history(self, account_id, limit=HISTORY_PAGE):
+        self._schedule(
+            ("history", account_id, limit), backend.history, account_id, limit
+        )
+
+    def _schedule(self, key, fn, *args):
+        if key[1] is None:
+            return
+        with self._lock:
+            if self._fresh(key) or key in self._inflight:
+                return
+            self._inflight[key] = self._pool.submit(
+                self._load, self._generation, key, fn, *args
+            )
+
+    def _load(self, generation, key, fn, *args):
+        try:
+            value = fn(*args)
+            with self._lock:
+                # drop results that raced with an invalidate()
+                if generation == self._generation:
+                    self._cache[key] = (time.monotonic(), value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    # -------------------------------------------------
+    # Reads
+    # -------------------------------------------------
+    def _fresh(self, key):
+        entry = self._cache.get(key)
+        return entry is not None and time.monotonic() - entry[0] < self.TTL
+
+    def get(self, key, fn, *args, block=True):
+        """
+        Fresh cached value, else the in-flight load, else a direct query.
+        With block=False only a fresh cached value is returned (or None).
+        """
+        with self._lock:
+            if self._fresh(key):
+                return self._cache[key][1]
+            if not block:
+                return None
+            pending = self._inflight.get(key)
+            generation = self._generation
+
+        if pending is not None:
+            try:
+                return pending.result(self.WAIT)
+            except Exception:
+                pass
+
+        value = fn(*args)
+        with self._lock:
+            # same race with invalidate() as _load
+            if generation == self._generation:
+                self._cache[key] = (time.monotonic(), value)
+        return value
+
+    def account(self, account_id, block=True):
+        return self.get(
+            ("account", account_id), backend.account, account_id, block=block
+        )
+
+    def history(self, account_id, limit=HISTORY_PAGE, block=True):
+        return self.get(
+            ("history", account_id, limit), backend.history, account_id, limit,
+            block=block
+        )
+
+    # -------------------------------------------------
+    # Invalidation
+    # -------------------------------------------------
+    def invalidate(self, account_id=None):
+        with self._lock:
+            self._generation += 1
+            if account_id is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[1] == account_id]:
+                    del self._cache[key]
+
+
+prefetcher = Prefetcher()
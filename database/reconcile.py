@@ -0,0 +1,193 @@
+# database/reconcile.py
+"""
+Incremental balance reconciliation.
+
+    python -m database.reconcile [--workers 4] [--range-size 1000]
+
+Expected balances are rebuilt from the postings legs and compared with
+accounts.balance. Each account keeps a checkpoint of the last rows it has
+folded in, so later runs only read new postings. Account id ranges are
+reconciled in parallel; mismatches are written to the audit log.
+"""
+import argparse
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from database.db import get_conn, log_event
+
+TOLERANCE = 0.005
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recon_checkpoints (
+    account_id INTEGER PRIMARY KEY,
+    last_posting_id INTEGER NOT NULL DEFAULT 0,
+    expected_balance REAL NOT NULL DEFAULT 0,
+    mismatch REAL NOT NULL DEFAULT 0,
+    checked_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Unseen accounts start from their latest opening leg
+_START = """
+    SELECT a.id, a.balance,
+           c.account_id IS NOT NULL,
+           COALESCE(c.expected_balance, o.balance_after, 0),
+           COALESCE(c.last_posting_id, o.id, 0),
+           COALESCE(c.mismatch, 0)
+    FROM accounts a
+    LEFT JOIN recon_checkpoints c ON c.account_id = a.id
+    LEFT JOIN postings o ON o.id = (
+        SELECT MAX(id) FROM postings
+        WHERE account_id = a.id AND type = 'OPENING_BALANCE'
+    )
+    WHERE a.id BETWEEN ? AND ?
+"""
+
+_DELTA = """
+    WITH start AS (
+        SELECT a.id AS account_id,
+               COALESCE(c.last_posting_id, (
+                   SELECT MAX(id) FROM postings
+                   WHERE account_id = a.id AND type = 'OPENING_BALANCE'
+               ), 0) AS after_id
+        FROM accounts a
+        LEFT JOIN recon_checkpoints c ON c.account_id = a.id
+        WHERE a.id BETWEEN ? AND ?
+    )
+    SELECT p.account_id,
+           SUM(CASE p.leg WHEN 'CREDIT' THEN p.amount ELSE -p.amount END),
+           MAX(p.id)
+    FROM start s
+    JOIN postings p ON p.account_id = s.account_id AND p.id > s.after_id
+    GROUP BY p.account_id
+"""
+
+
+def init_db():
+    with get_conn() as con:
+        cols = [r[1] for r in con.execute("PRAGMA table_info(recon_checkpoints)")]
+        if cols and "last_posting_id" not in cols:
+            # checkpoints are derived data: rebuild for the postings ledger
+            con.execute("DROP TABLE recon_checkpoints")
+        con.executescript(SCHEMA)
+
+
+def clear_checkpoints(conn):
+    conn.execute("DELETE FROM recon_checkpoints")
+
+
+class Reconciler:
+    def __init__(self, workers=4, range_size=1000):
+        self.workers = workers
+        self.range_size = range_size
+
+    # -------------------------------------------------
+    # Entry point
+    # -------------------------------------------------
+    def run(self):
+        """Reconcile every account. Returns a summary dict."""
+        start = time.perf_counter()
+        with get_conn() as con:
+            lo, hi = con.execute(
+                "SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), -1) FROM accounts"
+            ).fetchone()
+
+        ranges = [
+            (first, min(first + self.range_size - 1, hi))
+            for first in range(lo, hi + 1, self.range_size)
+        ]
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            results = list(pool.map(lambda r: self.reconcile_range(*r), ranges))
+
+        return {
+            "accounts": sum(r[0] for r in results),
+            "mismatches": sum(r[1] for r in results),
+            "seconds": time.perf_counter() - start,
+        }
+
+    # -------------------------------------------------
+    # One account range (own connection)
+    # -------------------------------------------------
+    def reconcile_range(self, first, last):
+        with get_conn() as con:
+            cur = con.cursor()
+
+            # one read snapshot, so a posting can't land between the queries
+            cur.execute("BEGIN")
+            state = {
+                row[0]: list(row[1:])
+                for row in cur.execute(_START, (first, last))
+            }
+            deltas = {r[0]: r[1:] for r in cur.execute(_DELTA, (first, last))}
+            con.commit()
+
+            checkpoints = []
+            mismatches = 0
+            for account_id, (balance, seen, expected, last_id, prev) in state.items():
+                delta, max_id = deltas.get(account_id, (0, last_id))
+                expected += delta
+
+                # nothing new and still in balance
+                if seen and not delta and not prev \
+                        and abs(balance - expected) <= TOLERANCE:
+                    continue
+
+                diff = round(balance - expected, 2)
+
+                if abs(diff) > TOLERANCE:
+                    mismatches += 1
+                    if diff != prev:
+                        log_event(
+                            account_id, "RECON_MISMATCH", diff,
+                            f"Expected {expected:.2f}, balance {balance:.2f}",
+                            conn=con
+                        )
+
+                checkpoints.append((account_id, max_id, expected, diff))
+
+            cur.executemany("""
+                INSERT INTO recon_checkpoints
+                    (account_id, last_posting_id, expected_balance, mismatch)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(account_id) DO UPDATE SET
+                    last_posting_id = excluded.last_posting_id,
+                    expected_balance = excluded.expected_balance,
+                    mismatch = excluded.mismatch,
+                    checked_at = CURRENT_TIMESTAMP
+            """, checkpoints)
+            con.commit()
+
+        return len(state), mismatches
+
+
+def start_background(interval=3600, **kwargs):
+    """Reconcile every `interval` seconds on a daemon thread."""
+    def loop():
+        reconciler = Reconciler(**kwargs)
+        while True:
+            try:
+                reconciler.run()
+            except Exception:
+                traceback.print_exc()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, daemon=True, name="reconcile")
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--range-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    init_db()
+    summary = Reconciler(args.workers, args.range_size).run()
+    print(
+        f"Reconciled {summary['accounts']} accounts in {summary['seconds']:.2f}s, "
+        f"{summary['mismatches']} mismatched."
+    )
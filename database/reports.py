@@ -0,0 +1,442 @@
+# database/reports.py
+"""
+Aggregate reports for the admin panel.
+
+    python -m database.reports [--days 30] [--top 10]
+
+Reports are read through their own read-only connection. Hourly rollups
+of transactions (by type and currency), per-account volume and login
+outcomes are kept in an in-memory database attached to it. Each refresh
+folds in only the rows past the last seen transaction and audit ids, so
+the cost follows new activity, not the size of the history. The reports
+themselves are aggregates and window functions over those small rollup
+tables. While neither id (nor the rates version) has moved, the last
+report is returned as is.
+
+Amounts are summed in the currency they were entered in (deposits in
+kiosk cash, everything else in the account's currency) and converted to
+BASE_CURRENCY at the current rates when a report is built. Times are
+UTC, like the CURRENT_TIMESTAMP columns they come from.
+"""
+import argparse
+import datetime
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+from database import db, fx
+
+REPORT_DAYS = int(os.environ.get("KIOSK_REPORT_DAYS", "30"))
+TOP_ACCOUNTS = int(os.environ.get("KIOSK_REPORT_TOP", "10"))
+
+CACHE_SCHEMA = """
+CREATE TABLE cache.tx_hourly (
+    hour TEXT NOT NULL,             -- 'YYYY-MM-DD HH'
+    type TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (hour, type, currency)
+) WITHOUT ROWID;
+
+-- the last fold's new rows, grouped as in tx_hourly
+CREATE TABLE cache.tx_delta (
+    hour TEXT NOT NULL,
+    type TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL
+);
+
+CREATE TABLE cache.tx_types (
+    type TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (type, currency)
+) WITHOUT ROWID;
+
+CREATE TABLE cache.tx_hod (
+    hod INTEGER NOT NULL,           -- hour of day, 0-23
+    currency TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (hod, currency)
+) WITHOUT ROWID;
+
+CREATE TABLE cache.acct_volume (
+    account_id INTEGER NOT NULL,
+    currency TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (account_id, currency)
+) WITHOUT ROWID;
+
+-- acct_volume in BASE_CURRENCY, indexed for the top-N seek
+CREATE TABLE cache.acct_base (
+    account_id INTEGER PRIMARY KEY,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL
+);
+CREATE INDEX cache.idx_acct_base_total ON acct_base(total);
+
+CREATE TABLE cache.logins_hourly (
+    hour TEXT PRIMARY KEY,
+    ok INTEGER NOT NULL,
+    fail INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE cache.rates (
+    currency TEXT PRIMARY KEY,
+    rate REAL NOT NULL              -- BASE_CURRENCY per unit
+) WITHOUT ROWID;
+"""
+
+_ROLLUPS = (
+    "tx_hourly", "tx_types", "tx_hod", "acct_volume", "acct_base", "logins_hourly"
+)
+
+# ------------------------------------------------------------
+# Folding new rows into the rollups
+# ------------------------------------------------------------
+_ENTRY_CURRENCY = """
+    CASE WHEN t.type = 'CASH_DEPOSIT' THEN :cash
+         ELSE COALESCE(a.currency, :base) END
+"""
+
+# one pass over the new transactions; the rest fold from tx_delta
+_STAGE_TX = f"""
+    INSERT INTO cache.tx_delta (hour, type, currency, n, total)
+    SELECT strftime('%Y-%m-%d %H', t.timestamp), t.type, {_ENTRY_CURRENCY},
+           COUNT(*), SUM(t.amount)
+    FROM transactions t
+    LEFT JOIN accounts a ON a.id = t.account_id
+    WHERE t.id > :after AND t.id <= :upto
+    GROUP BY 1, 2, 3
+"""
+
+_FOLD_HOURLY = """
+    INSERT INTO cache.tx_hourly (hour, type, currency, n, total)
+    SELECT hour, type, currency, n, total FROM cache.tx_delta WHERE true
+    ON CONFLICT (hour, type, currency)
+    DO UPDATE SET n = n + excluded.n, total = total + excluded.total
+"""
+
+_FOLD_TYPES = """
+    INSERT INTO cache.tx_types (type, currency, n, total)
+    SELECT type, currency, SUM(n), SUM(total) FROM cache.tx_delta
+    GROUP BY 1, 2
+    ON CONFLICT (type, currency)
+    DO UPDATE SET n = n + excluded.n, total = total + excluded.total
+"""
+
+_FOLD_HOD = """
+    INSERT INTO cache.tx_hod (hod, currency, n, total)
+    SELECT CAST(substr(hour, 12, 2) AS INTEGER), currency, SUM(n), SUM(total)
+    FROM cache.tx_delta
+    GROUP BY 1, 2
+    ON CONFLICT (hod, currency)
+    DO UPDATE SET n = n + excluded.n, total = total + excluded.total
+"""
+
+_FOLD_ACCOUNTS = f"""
+    INSERT INTO cache.acct_volume (account_id, currency, n, total)
+    SELECT t.account_id, {_ENTRY_CURRENCY}, COUNT(*), SUM(t.amount)
+    FROM transactions t
+    LEFT JOIN accounts a ON a.id = t.account_id
+    WHERE t.id > :after AND t.id <= :upto AND t.account_id IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (account_id, currency)
+    DO UPDATE SET n = n + excluded.n, total = total + excluded.total
+"""
+
+# re-total the accounts the new rows touched (or all of them)
+_TOTAL_ACCOUNTS = """
+    INSERT OR REPLACE INTO cache.acct_base (account_id, n, total)
+    SELECT v.account_id, SUM(v.n), SUM(v.total * r.rate)
+    FROM cache.acct_volume v
+    JOIN cache.rates r USING (currency)
+    {where}
+    GROUP BY v.account_id
+"""
+
+_TOUCHED = """
+    WHERE v.account_id IN (
+        SELECT account_id FROM transactions WHERE id > :after AND id <= :upto
+    )
+"""
+
+# walks idx_audit_event (event_type, id) from the watermark
+_FOLD_LOGINS = """
+    INSERT INTO cache.logins_hourly (hour, ok, fail)
+    SELECT strftime('%Y-%m-%d %H', ts),
+           SUM(event_type = 'LOGIN_SUCCESS'), SUM(event_type = 'LOGIN_FAIL')
+    FROM audit_log
+    WHERE event_type IN ('LOGIN_SUCCESS', 'LOGIN_FAIL')
+      AND id > :after AND id <= :upto
+    GROUP BY 1
+    ON CONFLICT (hour)
+    DO UPDATE SET ok = ok + excluded.ok, fail = fail + excluded.fail
+"""
+
+# ------------------------------------------------------------
+# Reports over the rollups
+# ------------------------------------------------------------
+_BY_TYPE = """
+    SELECT t.type, SUM(t.n), SUM(t.total * r.rate) AS total,
+           SUM(t.total * r.rate) * 100.0 / SUM(SUM(t.total * r.rate)) OVER ()
+    FROM cache.tx_types t
+    JOIN cache.rates r USING (currency)
+    GROUP BY t.type
+    ORDER BY total DESC
+"""
+
+_BY_DAY = """
+    WITH days AS (
+        SELECT substr(h.hour, 1, 10) AS day, SUM(h.n) AS n,
+               SUM(h.total * r.rate) AS total
+        FROM cache.tx_hourly h
+        JOIN cache.rates r USING (currency)
+        WHERE h.hour >= :since
+        GROUP BY day
+    )
+    SELECT day, n, total,
+           total - LAG(total) OVER w,
+           SUM(total) OVER w
+    FROM days
+    WINDOW w AS (ORDER BY day)
+    ORDER BY day DESC
+"""
+
+_BY_HOUR = """
+    SELECT h.hod, SUM(h.n), SUM(h.total * r.rate),
+           SUM(h.n) * 100.0 / SUM(SUM(h.n)) OVER ()
+    FROM cache.tx_hod h
+    JOIN cache.rates r USING (currency)
+    GROUP BY h.hod
+    ORDER BY h.hod
+"""
+
+# failure rate over the trailing 7 calendar days, gaps included
+_LOGINS = """
+    WITH days AS (
+        SELECT substr(hour, 1, 10) AS day, SUM(ok) AS ok, SUM(fail) AS fail
+        FROM cache.logins_hourly
+        WHERE hour >= :since
+        GROUP BY day
+    )
+    SELECT day, ok, fail,
+           fail * 100.0 / NULLIF(ok + fail, 0),
+           SUM(fail) OVER w * 100.0 / NULLIF(SUM(ok + fail) OVER w, 0)
+    FROM days
+    WINDOW w AS (ORDER BY julianday(day) RANGE 6 PRECEDING)
+    ORDER BY day DESC
+"""
+
+_LOGIN_TOTALS = """
+    SELECT COALESCE(SUM(ok), 0), COALESCE(SUM(fail), 0) FROM cache.logins_hourly
+"""
+
+# ranks only the accounts at or above the top-th total (an index seek),
+# ties included; share is of all volume
+_TOP_ACCOUNTS = """
+    SELECT k.rank, k.account_id, a.card_number, k.n, k.total,
+           k.total * 100.0 / (
+               SELECT SUM(t.total * r.rate)
+               FROM cache.tx_types t JOIN cache.rates r USING (currency)
+           )
+    FROM (
+        SELECT account_id, n, total, RANK() OVER (ORDER BY total DESC) AS rank
+        FROM cache.acct_base
+        WHERE total >= (
+            SELECT MIN(total) FROM (
+                SELECT total FROM cache.acct_base ORDER BY total DESC LIMIT :top
+            )
+        )
+    ) k
+    LEFT JOIN accounts a ON a.id = k.account_id
+    ORDER BY k.rank, k.account_id
+"""
+
+
+def _bounds(con, table):
+    # separate subqueries: MIN and MAX together would scan the table
+    return con.execute(f"""
+        SELECT (SELECT MIN(id) FROM {table}),
+               COALESCE((SELECT MAX(id) FROM {table}), 0)
+    """).fetchone()
+
+
+class ReportCache:
+    """Rollups plus the last report, keyed on the ids they cover."""
+
+    def __init__(self, days=REPORT_DAYS, top=TOP_ACCOUNTS):
+        self.days = days
+        self.top = top
+        self._con = None
+        self._path = None
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        # (first id, last id) folded from each table
+        self._tx = (None, 0)
+        self._audit = (None, 0)
+        self._rates_version = None
+        self._report = None
+        self._key = None
+
+    def _connect(self):
+        path = os.path.abspath(db.DB_PATH)
+        if self._con is not None and self._path == path:
+            return self._con
+        self._drop()
+        con = sqlite3.connect(
+            pathlib.Path(path).as_uri() + "?mode=ro", uri=True,
+            isolation_level=None, check_same_thread=False
+        )
+        con.execute("ATTACH ':memory:' AS cache")
+        con.executescript(CACHE_SCHEMA)
+        self._con, self._path = con, path
+        self._clear()
+        return con
+
+    def _drop(self):
+        if self._con is not None:
+            self._con.close()
+        self._con = self._path = None
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+    def invalidate(self):
+        """Drop the rollups; the next report() rebuilds them."""
+        self.close()
+
+    # -------------------------------------------------
+    # Refresh
+    # -------------------------------------------------
+    def report(self):
+        """
+        Current report dict: by_type, by_day, by_hour, logins,
+        login_totals and top_accounts rows, plus the ids it covers,
+        whether it came straight from the cache and how long it took.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            con = self._connect()
+            # one snapshot for the watermarks, the folds and the reports
+            con.execute("BEGIN")
+            try:
+                tx = _bounds(con, "transactions")
+                audit = _bounds(con, "audit_log")
+                rates = fx.rates.current()
+                key = (tx, audit, rates.version)
+                if key == self._key:
+                    report = dict(self._report, cached=True)
+                else:
+                    repriced = self._load_rates(con, rates)
+                    folded = self._fold(con, tx, audit, repriced)
+                    report = self._build(con)
+                    report.update(
+                        tx_id=tx[1], audit_id=audit[1], rates_version=rates.version,
+                        folded=folded, cached=False
+                    )
+                    self._report, self._key = report, key
+                con.execute("COMMIT")
+            except BaseException:
+                # rollups may be half folded: start over next time
+                self._drop()
+                raise
+            report["seconds"] = time.perf_counter() - start
+            return report
+
+    def _fold(self, con, tx, audit, repriced):
+        """
+        Fold rows past the watermarks (rebuilding if history was
+        deleted). Returns how many ids each table moved on.
+        """
+        if self._stale(self._tx, tx) or self._stale(self._audit, audit):
+            for table in _ROLLUPS:
+                con.execute(f"DELETE FROM cache.{table}")
+            self._tx = self._audit = (None, 0)
+
+        params = {
+            "after": self._tx[1], "upto": tx[1],
+            "cash": fx.CASH_CURRENCY, "base": fx.BASE_CURRENCY,
+        }
+        if tx[1] > self._tx[1]:
+            con.execute("DELETE FROM cache.tx_delta")
+            con.execute(_STAGE_TX, params)
+            for sql in (_FOLD_HOURLY, _FOLD_TYPES, _FOLD_HOD):
+                con.execute(sql)
+            con.execute(_FOLD_ACCOUNTS, params)
+        if repriced or self._tx[1] == 0:
+            con.execute(_TOTAL_ACCOUNTS.format(where=""))
+        elif tx[1] > self._tx[1]:
+            con.execute(_TOTAL_ACCOUNTS.format(where=_TOUCHED), params)
+        if audit[1] > self._audit[1]:
+            con.execute(_FOLD_LOGINS, {"after": self._audit[1], "upto": audit[1]})
+        folded = (tx[1] - self._tx[1], audit[1] - self._audit[1])
+
+        self._tx = (self._tx[0] if self._tx[0] is not None else tx[0], tx[1])
+        self._audit = (
+            self._audit[0] if self._audit[0] is not None else audit[0], audit[1]
+        )
+        return folded
+
+    @staticmethod
+    def _stale(seen, now):
+        """Rows below the watermark went away (reset_history, pruning)."""
+        first, last = seen
+        return now[1] < last or (first is not None and now[0] != first)
+
+    def _load_rates(self, con, rates):
+        """Load a new rates version; True if it changed."""
+        if rates.version == self._rates_version:
+            return False
+        con.execute("DELETE FROM cache.rates")
+        con.executemany(
+            "INSERT INTO cache.rates (currency, rate) VALUES (?, ?)",
+            ((c, rates.rate(c, fx.BASE_CURRENCY)) for c in rates.rates)
+        )
+        self._rates_version = rates.version
+        return True
+
+    def _build(self, con):
+        since = (
+            datetime.datetime.utcnow().date() - datetime.timedelta(days=self.days - 1)
+        ).isoformat()
+        return {
+            "by_type": con.execute(_BY_TYPE).fetchall(),
+            "by_day": con.execute(_BY_DAY, {"since": since}).fetchall(),
+            "by_hour": con.execute(_BY_HOUR).fetchall(),
+            "logins": con.execute(_LOGINS, {"since": since}).fetchall(),
+            "login_totals": con.execute(_LOGIN_TOTALS).fetchone(),
+            "top_accounts": con.execute(_TOP_ACCOUNTS, {"top": self.top}).fetchall(),
+        }
+
+
+cache = ReportCache()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=REPORT_DAYS)
+    parser.add_argument("--top", type=int, default=TOP_ACCOUNTS)
+    args = parser.parse_args()
+
+    report = ReportCache(args.days, args.top).report()
+    for section in ("by_type", "by_day", "by_hour", "logins", "top_accounts"):
+        print(f"== {section}")
+        for row in report[section]:
+            print(*row, sep=" | ")
+    ok, fail = report["login_totals"]
+    print(f"logins: {ok} ok, {fail} failed")
+    print(
+        f"tx<={report['tx_id']} audit<={report['audit_id']} "
+        f"in {report['seconds'] * 1000:.2f} ms"
+    )
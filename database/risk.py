@@ -0,0 +1,233 @@
+# database/risk.py
+"""
+Streaming velocity and anomaly scoring.
+
+The scorer subscribes to log_event and keeps sliding-window features per
+card, per sender and per recipient:
+    - failed-login bursts per card
+    - fan-out: distinct recipients a sender paid recently
+    - fan-in: distinct senders paying one recipient
+    - amounts far above the account's usual (EWMA of past postings)
+ledger.post() asks assess() before writing; "hold" refuses the posting,
+"flag" lets it through with a RISK_FLAG audit row.
+
+Memory is bounded: windows are trimmed by age and length, and each
+per-key table is an LRU capped at MAX_KEYS.
+
+Replay a historical audit log:
+    python -m database.risk --replay [--since AUDIT_ID]
+"""
+import argparse
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+
+from database import db
+
+MAX_KEYS = 50_000
+MAX_EVENTS = 256
+
+LOGIN_WINDOW = 300
+LOGIN_FAIL_FLAG = 5
+
+FANOUT_WINDOW = 3600
+FANOUT_FLAG = 3
+FANOUT_HOLD = 6
+
+FANIN_WINDOW = 3600
+FANIN_FLAG = 10
+
+AMOUNT_MIN_HISTORY = 5
+AMOUNT_FLAG_RATIO = 5.0
+AMOUNT_HOLD_RATIO = 10.0
+EWMA_ALPHA = 0.1
+
+POSTING_EVENTS = ("TRANSFER", "BILL_PAYMENT")
+
+Assessment = namedtuple("Assessment", "action reasons")
+OK = Assessment("ok", ())
+
+
+class _LRU(OrderedDict):
+    def __init__(self, factory, max_keys=MAX_KEYS):
+        super().__init__()
+        self.factory = factory
+        self.max_keys = max_keys
+
+    def touch(self, key):
+        value = self.get(key)
+        if value is None:
+            value = self[key] = self.factory()
+            if len(self) > self.max_keys:
+                self.popitem(last=False)
+        else:
+            self.move_to_end(key)
+        return value
+
+
+def _trim(events, now, window):
+    while events and events[0][0] <= now - window:
+        events.popleft()
+
+
+def _distinct(events):
+    return len({e[1] for e in events})
+
+
+class RiskScorer:
+    def __init__(self):
+        self.login_fails = _LRU(lambda: deque(maxlen=MAX_EVENTS))
+        self.fanout = _LRU(lambda: deque(maxlen=MAX_EVENTS))
+        self.fanin = _LRU(lambda: deque(maxlen=MAX_EVENTS))
+        self.amounts = _LRU(lambda: [0, 0.0])  # [count, ewma]
+        self.flags = 0
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------
+    # Pre-posting assessment
+    # -------------------------------------------------
+    def assess(self, account_id, kind, amount, target="", now=None):
+        if kind == "deposit":
+            return OK
+        now = now or time.time()
+        hold, flag = [], []
+
+        with self._lock:
+            stats = self.amounts.get(account_id)
+            if stats and stats[0] >= AMOUNT_MIN_HISTORY and stats[1] > 0:
+                ratio = amount / stats[1]
+                if ratio >= AMOUNT_HOLD_RATIO:
+                    hold.append(f"amount {ratio:.0f}x usual")
+                elif ratio >= AMOUNT_FLAG_RATIO:
+                    flag.append(f"amount {ratio:.0f}x usual")
+
+            if kind == "transfer":
+                sent = self.fanout.get(account_id)
+                if sent is not None:
+                    _trim(sent, now, FANOUT_WINDOW)
+                    recipients = {e[1] for e in sent} | {target}
+                    if len(recipients) >= FANOUT_HOLD:
+                        hold.append(f"{len(recipients)} recipients in 1h")
+                    elif len(recipients) >= FANOUT_FLAG:
+                        flag.append(f"{len(recipients)} recipients in 1h")
+
+                received = self.fanin.get(target)
+                if received is not None:
+                    _trim(received, now, FANIN_WINDOW)
+                    senders = {e[1] for e in received} | {account_id}
+                    if len(senders) >= FANIN_FLAG:
+                        flag.append(f"recipient paid by {len(senders)} accounts in 1h")
+
+        if hold:
+            return Assessment("hold", tuple(hold + flag))
+        if flag:
+            return Assessment("flag", tuple(flag))
+        return OK
+
+    # -------------------------------------------------
+    # Event stream
+    # -------------------------------------------------
+    def observe(self, account_id, event_type, amount, details, now=None):
+        """Fold one audit event into the features. Returns flag reasons."""
+        now = now or time.time()
+        reasons = []
+
+        with self._lock:
+            if event_type == "LOGIN_FAIL":
+                card = details.rsplit(" ", 1)[-1] if details else ""
+                fails = self.login_fails.touch(card)
+                fails.append((now, card))
+                _trim(fails, now, LOGIN_WINDOW)
+                if len(fails) == LOGIN_FAIL_FLAG:
+                    reasons.append(f"{len(fails)} failed logins in 5 min for card {card}")
+
+            elif event_type in POSTING_EVENTS and account_id is not None:
+                stats = self.amounts.touch(account_id)
+                stats[1] = amount if stats[0] == 0 else (
+                    EWMA_ALPHA * amount + (1 - EWMA_ALPHA) * stats[1]
+                )
+                stats[0] += 1
+
+                if event_type == "TRANSFER" and details.startswith("To "):
+                    recipient = details[3:]
+                    sent = self.fanout.touch(account_id)
+                    sent.append((now, recipient))
+                    _trim(sent, now, FANOUT_WINDOW)
+
+                    received = self.fanin.touch(recipient)
+                    received.append((now, account_id))
+                    _trim(received, now, FANIN_WINDOW)
+
+        self.flags += bool(reasons)
+        return reasons
+
+    def listener(self, account_id, event_type, amount, details, conn):
+        """log_event listener: writes RISK_FLAG rows for login bursts."""
+        if event_type.startswith("RISK_"):
+            return
+        reasons = self.observe(account_id, event_type, amount, details or "")
+        if reasons:
+            db.log_event(
+                account_id, "RISK_FLAG", details="; ".join(reasons), conn=conn
+            )
+
+    # -------------------------------------------------
+    # Replay
+    # -------------------------------------------------
+    def replay(self, since=0, batch=5000):
+        """
+        Score a historical audit_log in id order.
+        Returns (events, flagged, seconds).
+        """
+        start = time.perf_counter()
+        events = flagged = 0
+
+        with db.get_conn() as con:
+            cur = con.execute("""
+                SELECT id, account_id, event_type, amount, details,
+                       CAST(strftime('%s', ts) AS INTEGER)
+                FROM audit_log
+                WHERE id > ?
+                ORDER BY id
+            """, (since,))
+
+            while True:
+                rows = cur.fetchmany(batch)
+                if not rows:
+                    break
+                for _, account_id, event_type, amount, details, ts in rows:
+                    if event_type in POSTING_EVENTS and account_id is not None:
+                        kind = "transfer" if event_type == "TRANSFER" else "bill"
+                        target = details[3:] if kind == "transfer" and details else ""
+                        if self.assess(account_id, kind, amount or 0.0, target, ts).action != "ok":
+                            flagged += 1
+                    if self.observe(account_id, event_type, amount or 0.0, details or "", ts):
+                        flagged += 1
+                    events += 1
+
+        return events, flagged, time.perf_counter() - start
+
+
+scorer = RiskScorer()
+
+
+def install(warm_events=10_000):
+    """Warm the features from recent history, then follow log_event."""
+    with db.get_conn() as con:
+        last = con.execute("SELECT COALESCE(MAX(id), 0) FROM audit_log").fetchone()[0]
+    scorer.replay(since=max(0, last - warm_events))
+    db.add_listener(scorer.listener)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replay", action="store_true")
+    parser.add_argument("--since", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.replay:
+        events, flagged, seconds = RiskScorer().replay(args.since)
+        print(
+            f"Replayed {events} events in {seconds:.2f}s "
+            f"({events / max(seconds, 1e-9):,.0f}/s), {flagged} flagged."
+        )
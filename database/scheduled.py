@@ -0,0 +1,386 @@
+# database/scheduled.py
+"""
+Scheduled and recurring bill payments.
+
+    python -m database.scheduled [--chunk 200]
+
+The runner pays due schedules in small chunks. Each chunk is one short
+BEGIN IMMEDIATE transaction of set-based statements: the chunk is staged
+in a temp table, balance checks are window queries, and balances,
+transactions, postings, audit and journal rows are written with one
+statement each, so live kiosk postings only ever wait for one chunk.
+Every payment reserves its daily-limit headroom and is risk-scored like
+a live one first.
+
+A schedule whose account can't cover it is retried with exponential
+back-off; after MAX_ATTEMPTS the cycle is skipped and audited.
+"""
+import argparse
+import threading
+import time
+import traceback
+
+from database.db import get_conn, log_event
+from database import fx, journal, ledger, limits, risk
+
+CHUNK_SIZE = 200
+CHUNK_PAUSE = 0.05
+MAX_ATTEMPTS = 5
+RETRY_BASE_MINUTES = 15
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduled_payments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER NOT NULL,
+    bill_ref TEXT NOT NULL,
+    amount REAL NOT NULL,
+    interval_days INTEGER NOT NULL,
+    next_run DATETIME NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    last_paid_at DATETIME,
+    active INTEGER NOT NULL DEFAULT 1,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_due
+    ON scheduled_payments(next_run) WHERE active = 1;
+"""
+
+_STAGE = """
+CREATE TEMP TABLE IF NOT EXISTS due (
+    sched_id INTEGER PRIMARY KEY,
+    account_id INTEGER,
+    bill_ref TEXT,
+    amount REAL,
+    base_amount REAL,
+    ok INTEGER DEFAULT 1,
+    error TEXT,
+    flag TEXT,
+    tx_id INTEGER,
+    balance_after REAL,
+    biller_after REAL
+)
+"""
+
+# Next due date, skipping cycles missed while the kiosk was off
+_ADVANCE = """
+    CASE WHEN datetime(next_run, '+' || interval_days || ' days') <= datetime('now')
+         THEN datetime('now', '+' || interval_days || ' days')
+         ELSE datetime(next_run, '+' || interval_days || ' days')
+    END
+"""
+
+
+def init_db():
+    with get_conn() as con:
+        con.executescript(SCHEMA)
+
+
+def schedule(account_id, bill_ref, amount, interval_days, conn=None):
+    """First run is one interval from now (today's payment was just made)."""
+    if conn is None:
+        with get_conn() as con:
+            schedule_id = schedule(account_id, bill_ref, amount, interval_days, conn=con)
+            con.commit()
+        return schedule_id
+
+    cur = conn.execute("""
+        INSERT INTO scheduled_payments (account_id, bill_ref, amount, interval_days, next_run)
+        VALUES (?, ?, ?, ?, datetime('now', ?))
+    """, (account_id, bill_ref, amount, interval_days, f"+{interval_days} days"))
+    return cur.lastrowid
+
+
+class BillRunner:
+    def __init__(self, chunk_size=CHUNK_SIZE, pause=CHUNK_PAUSE):
+        self.chunk_size = chunk_size
+        self.pause = pause
+
+    def run(self):
+        """Pay everything due. Returns a summary dict."""
+        start = time.perf_counter()
+        paid = failed = chunks = 0
+
+        with get_conn() as con:
+            con.isolation_level = None
+            con.execute(_STAGE)
+            while True:
+                n_paid, n_failed = self._run_chunk(con)
+                if not n_paid and not n_failed:
+                    break
+                paid += n_paid
+                failed += n_failed
+                chunks += 1
+                time.sleep(self.pause)
+
+        seconds = time.perf_counter() - start
+        return {
+            "paid": paid,
+            "failed": failed,
+            "chunks": chunks,
+            "seconds": seconds,
+            "per_sec": paid / seconds if seconds else 0.0,
+        }
+
+    # -------------------------------------------------
+    # One chunk = one short write transaction
+    # -------------------------------------------------
+    def _run_chunk(self, con):
+        reserved = {}
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            con.execute("DELETE FROM temp.due")
+            staged = con.execute("""
+                INSERT INTO temp.due (sched_id, account_id, bill_ref, amount)
+                SELECT id, account_id, bill_ref, amount
+                FROM scheduled_payments
+                WHERE active = 1 AND next_run <= datetime('now')
+                ORDER BY next_run, id
+                LIMIT ?
+            """, (self.chunk_size,)).rowcount
+            if not staged:
+                con.execute("ROLLBACK")
+                return 0, 0
+
+            con.execute("""
+                UPDATE temp.due SET ok = 0, error = 'Account not found'
+                WHERE account_id NOT IN (SELECT id FROM accounts)
+            """)
+            # Biller legs and limits are kept in the base currency
+            version = fx.rates.current().version
+            con.execute("""
+                UPDATE temp.due SET base_amount = round(temp.due.amount * r.rate, 2)
+                FROM accounts a
+                JOIN fx_rates r ON r.currency = a.currency AND r.version = ?
+                WHERE a.id = temp.due.account_id
+            """, (version,))
+            con.execute("""
+                UPDATE temp.due SET ok = 0, error = 'No FX rate'
+                WHERE ok = 1 AND base_amount IS NULL
+            """)
+            self._reserve_limits(con, reserved)
+            self._assess(con)
+            # Pay in schedule order while the running total fits the balance
+            con.execute("""
+                UPDATE temp.due SET ok = 0, error = 'Insufficient balance'
+                FROM (
+                    SELECT d.sched_id, a.balance - SUM(d.amount) OVER (
+                        PARTITION BY d.account_id ORDER BY d.sched_id
+                    ) AS left_over
+                    FROM temp.due d JOIN accounts a ON a.id = d.account_id
+                    WHERE d.ok = 1
+                ) r
+                WHERE r.sched_id = temp.due.sched_id AND r.left_over < 0
+            """)
+            # Held or unaffordable: give their headroom back
+            self._release(reserved, [
+                sched_id for sched_id, in
+                con.execute("SELECT sched_id FROM temp.due WHERE ok = 0")
+                if sched_id in reserved
+            ])
+
+            paid = self._pay(con, version)
+            failed = self._fail(con)
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            self._release(reserved, list(reserved))
+            raise
+
+        for account_id, amount, base_amount, bill_ref in paid:
+            risk.scorer.observe(account_id, "BILL_PAYMENT", amount, bill_ref)
+        return len(paid), failed
+
+    def _reserve_limits(self, con, reserved):
+        """
+        Same daily limits as a live posting. Reserved row by row in
+        schedule order, so a kiosk session posting meanwhile can't
+        spend the same headroom; fills `reserved` for _release().
+        """
+        rows = con.execute("""
+            SELECT sched_id, account_id, base_amount
+            FROM temp.due WHERE ok = 1 ORDER BY sched_id
+        """).fetchall()
+        refused = []
+        for sched_id, account_id, base_amount in rows:
+            try:
+                bucket = limits.engine.reserve(account_id, "bill", base_amount)
+            except limits.LimitExceeded as e:
+                refused.append((str(e), sched_id))
+                continue
+            reserved[sched_id] = (account_id, base_amount, bucket)
+        con.executemany(
+            "UPDATE temp.due SET ok = 0, error = ? WHERE sched_id = ?", refused
+        )
+
+    def _release(self, reserved, sched_ids):
+        for sched_id in sched_ids:
+            account_id, base_amount, bucket = reserved.pop(sched_id)
+            limits.engine.release(account_id, "bill", base_amount, bucket)
+
+    def _assess(self, con):
+        """
+        Risk-score each payment. Holds are retried like any failure;
+        flags are audited by _pay if the payment goes through.
+        """
+        rows = con.execute("""
+            SELECT sched_id, account_id, bill_ref, amount
+            FROM temp.due WHERE ok = 1 ORDER BY sched_id
+        """).fetchall()
+        verdicts = []
+        for sched_id, account_id, bill_ref, amount in rows:
+            verdict = risk.scorer.assess(account_id, "bill", amount, bill_ref)
+            if verdict.action == "ok":
+                continue
+            reasons = "; ".join(verdict.reasons)
+            if verdict.action == "hold":
+                log_event(account_id, "RISK_HOLD", amount, reasons, conn=con)
+            verdicts.append((verdict.action, reasons, sched_id))
+        con.executemany("""
+            UPDATE temp.due
+            SET ok = (?1 != 'hold'),
+                error = CASE WHEN ?1 = 'hold' THEN 'Held: ' || ?2 END,
+                flag = CASE WHEN ?1 = 'flag' THEN ?2 END
+            WHERE sched_id = ?3
+        """, verdicts)
+
+    def _pay(self, con, version):
+        biller = ledger.latest_balance(ledger.BILLER_ACCOUNT, conn=con)
+
+        con.execute("""
+            WITH base AS (
+                SELECT MAX(
+                    COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'transactions'), 0),
+                    COALESCE((SELECT MAX(id) FROM transactions), 0)
+                ) AS b
+            ),
+            numbered AS (
+                SELECT d.sched_id,
+                       (SELECT b FROM base) + ROW_NUMBER() OVER (ORDER BY d.sched_id) AS tx_id,
+                       a.balance - SUM(d.amount) OVER (
+                           PARTITION BY d.account_id ORDER BY d.sched_id
+                       ) AS balance_after,
+                       ? + SUM(d.base_amount) OVER (ORDER BY d.sched_id) AS biller_after
+                FROM temp.due d JOIN accounts a ON a.id = d.account_id
+                WHERE d.ok = 1
+            )
+            UPDATE temp.due
+            SET tx_id = n.tx_id,
+                balance_after = n.balance_after,
+                biller_after = n.biller_after
+            FROM numbered n
+            WHERE n.sched_id = temp.due.sched_id
+        """, (biller,))
+
+        con.execute("""
+            UPDATE accounts
+            SET balance = balance - (
+                SELECT SUM(amount) FROM temp.due
+                WHERE temp.due.account_id = accounts.id AND ok = 1
+            )
+            WHERE id IN (SELECT account_id FROM temp.due WHERE ok = 1)
+        """)
+        con.execute("""
+            INSERT INTO transactions (id, account_id, amount, type)
+            SELECT tx_id, account_id, amount, 'BILL_PAYMENT'
+            FROM temp.due WHERE ok = 1 ORDER BY tx_id
+        """)
+        con.execute("""
+            INSERT INTO postings
+                (tx_id, account_id, leg, amount, balance_after, type, counterparty)
+            SELECT tx_id, account_id, 'DEBIT', amount, balance_after,
+                   'BILL_PAYMENT', bill_ref
+            FROM temp.due WHERE ok = 1 ORDER BY tx_id
+        """)
+        con.execute("""
+            INSERT INTO postings
+                (tx_id, account_id, leg, amount, balance_after, type, counterparty)
+            SELECT d.tx_id, ?, 'CREDIT', d.base_amount, d.biller_after,
+                   'BILL_PAYMENT', '•••• ' || substr(a.card_number, -4)
+            FROM temp.due d JOIN accounts a ON a.id = d.account_id
+            WHERE d.ok = 1 ORDER BY d.tx_id
+        """, (ledger.BILLER_ACCOUNT,))
+        con.execute("""
+            INSERT INTO audit_log (account_id, event_type, amount, details)
+            SELECT account_id, 'BILL_PAYMENT', amount, bill_ref || ' (scheduled)'
+            FROM temp.due WHERE ok = 1 ORDER BY tx_id
+        """)
+        con.execute("""
+            INSERT INTO audit_log (account_id, event_type, amount, details)
+            SELECT account_id, 'RISK_FLAG', amount,
+                   'BILL_PAYMENT ' || bill_ref || ' (scheduled): ' || flag
+            FROM temp.due WHERE ok = 1 AND flag IS NOT NULL ORDER BY tx_id
+        """)
+        con.execute("""
+            INSERT INTO journal
+                (entry_key, kiosk_id, account_id, type, amount, details,
+                 currency, credit_amount, credit_currency, fx_version)
+            SELECT ? || ':' || lower(hex(randomblob(16))), ?,
+                   d.account_id, 'BILL_PAYMENT', d.amount, d.bill_ref,
+                   a.currency, d.base_amount, ?, ?
+            FROM temp.due d JOIN accounts a ON a.id = d.account_id
+            WHERE d.ok = 1 ORDER BY d.tx_id
+        """, (journal.KIOSK_ID, journal.KIOSK_ID, fx.BASE_CURRENCY, version))
+        con.execute(f"""
+            UPDATE scheduled_payments
+            SET next_run = {_ADVANCE},
+                attempts = 0,
+                last_error = NULL,
+                last_paid_at = CURRENT_TIMESTAMP
+            WHERE id IN (SELECT sched_id FROM temp.due WHERE ok = 1)
+        """)
+
+        return con.execute(
+            "SELECT account_id, amount, base_amount, bill_ref FROM temp.due WHERE ok = 1"
+        ).fetchall()
+
+    def _fail(self, con):
+        con.execute("""
+            INSERT INTO audit_log (account_id, event_type, amount, details)
+            SELECT d.account_id, 'SCHEDULED_BILL_FAILED', d.amount,
+                   d.bill_ref || ': ' || d.error
+            FROM temp.due d JOIN scheduled_payments s ON s.id = d.sched_id
+            WHERE d.ok = 0 AND s.attempts + 1 >= ?
+        """, (MAX_ATTEMPTS,))
+
+        # SET expressions all see the pre-update row
+        return con.execute(f"""
+            UPDATE scheduled_payments
+            SET last_error = (SELECT error FROM temp.due WHERE sched_id = id),
+                next_run = CASE
+                    WHEN attempts + 1 >= ? THEN {_ADVANCE}
+                    ELSE datetime('now', '+' || (? * (1 << attempts)) || ' minutes')
+                END,
+                attempts = CASE WHEN attempts + 1 >= ? THEN 0 ELSE attempts + 1 END
+            WHERE id IN (SELECT sched_id FROM temp.due WHERE ok = 0)
+        """, (MAX_ATTEMPTS, RETRY_BASE_MINUTES, MAX_ATTEMPTS)).rowcount
+
+
+def start_background(interval=300, **kwargs):
+    """Run due payments every `interval` seconds on a daemon thread."""
+    def loop():
+        runner = BillRunner(**kwargs)
+        while True:
+            try:
+                runner.run()
+            except Exception:
+                traceback.print_exc()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, daemon=True, name="bill-runner")
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    summary = BillRunner(args.chunk).run()
+    print(
+        f"Paid {summary['paid']} in {summary['chunks']} chunks, "
+        f"{summary['failed']} failed, {summary['seconds']:.2f}s "
+        f"({summary['per_sec']:,.0f}/s)."
+    )
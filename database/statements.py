@@ -0,0 +1,301 @@
+# database/statements.py
+"""
+Monthly account statements.
+
+    python -m database.statements [--month 2026-09] [--workers 4] [--out statements]
+
+Every account gets an HTML statement for the month under
+OUT/YYYY-MM/<id // 1000>/<id>.html. Account id ranges are spread over a
+process pool (rendering is CPU bound); each worker reads its range in
+one snapshot and streams the month's postings through a single cursor,
+writing each statement as its rows arrive, so memory stays flat however
+many accounts or rows there are. Files are written as .part and renamed
+when complete: a killed run never leaves a half statement behind.
+
+Opening balances come from the last leg before the month that carries a
+running balance (legacy legs from before double entry do not).
+"""
+import argparse
+import datetime
+import html
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from database import db, fx
+from database.db import get_conn, log_event
+
+STATEMENT_DIR = os.environ.get("KIOSK_STATEMENT_DIR", "statements")
+RANGE_SIZE = 2000
+SHARD_SIZE = 1000
+BANK_NAME = "Nyxon Online Banking"
+
+_ACCOUNTS = """
+    SELECT a.id, a.card_number, a.currency, (
+        SELECT p.balance_after FROM postings p
+        WHERE p.account_id = a.id AND p.ts < ? AND p.balance_after IS NOT NULL
+        ORDER BY p.ts DESC, p.id DESC
+        LIMIT 1
+    )
+    FROM accounts a
+    WHERE a.id BETWEEN ? AND ?
+    ORDER BY a.id
+"""
+
+_POSTINGS = """
+    SELECT account_id, ts, type, leg, amount, balance_after, counterparty
+    FROM postings
+    WHERE account_id BETWEEN ? AND ? AND ts >= ? AND ts < ?
+    ORDER BY account_id, ts, id
+"""
+
+_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Statement {period} {card}</title>
+<style>
+body{{font-family:sans-serif;margin:32px;color:#212529}}
+h1{{color:#0d6efd;font-size:22px}}
+table{{border-collapse:collapse;width:100%}}
+th,td{{padding:4px 8px;border-bottom:1px solid #dee2e6;text-align:left}}
+td.n{{text-align:right}}
+</style></head><body>
+<h1>{bank}</h1>
+<p>Statement for card {card} &middot; {period} &middot; {currency}</p>
+<p>Opening balance: {opening}</p>
+<table>
+<tr><th>Date</th><th>Description</th><th>Debit</th><th>Credit</th><th>Balance</th></tr>
+"""
+
+_ROW = (
+    "<tr><td>{ts}</td><td>{desc}</td><td class=n>{debit}</td>"
+    "<td class=n>{credit}</td><td class=n>{balance}</td></tr>\n"
+)
+
+_FOOT = """</table>
+<p>Credits: {credits} &middot; Debits: {debits}</p>
+<p><b>Closing balance: {closing}</b></p>
+</body></html>
+"""
+
+
+def month_bounds(month):
+    """'2026-09' -> ('2026-09-01 00:00:00', '2026-10-01 00:00:00')."""
+    start = datetime.datetime.strptime(month, "%Y-%m")
+    end = (start + datetime.timedelta(days=32)).replace(day=1)
+    fmt = "%Y-%m-%d %H:%M:%S"
+    return start.strftime(fmt), end.strftime(fmt)
+
+
+def last_month():
+    first = datetime.date.today().replace(day=1)
+    return (first - datetime.timedelta(days=1)).strftime("%Y-%m")
+
+
+def _money(amount, currency):
+    return "—" if amount is None else fx.format_amount(amount, currency)
+
+
+def _masked(card_number):
+    return "•••• " + str(card_number)[-4:]
+
+
+# ============================================================
+#  Worker (one account range, own process and connection)
+# ============================================================
+class _Statement:
+    """One account's file, written as its rows stream past."""
+
+    def __init__(self, out_dir, period, account):
+        account_id, card_number, currency, opening = account
+        self.currency = currency or fx.BASE_CURRENCY
+        self.balance = opening
+        self.credits = 0.0
+        self.debits = 0.0
+
+        shard = os.path.join(out_dir, str(account_id // SHARD_SIZE))
+        os.makedirs(shard, exist_ok=True)
+        self.path = os.path.join(shard, f"{account_id}.html")
+        self.f = open(self.path + ".part", "w", encoding="utf-8")
+        self.f.write(_HEAD.format(
+            bank=BANK_NAME, period=period, card=_masked(card_number),
+            currency=self.currency, opening=_money(opening, self.currency)
+        ))
+
+    def row(self, ts, kind, leg, amount, balance_after, counterparty):
+        if kind == "OPENING_BALANCE":
+            self.balance = balance_after
+        else:
+            signed = amount if leg == "CREDIT" else -amount
+            if leg == "CREDIT":
+                self.credits += amount
+            else:
+                self.debits += amount
+            if balance_after is not None:
+                self.balance = balance_after
+            elif self.balance is not None:
+                self.balance += signed
+
+        desc = kind.replace("_", " ").title()
+        if counterparty:
+            # transfers name the other card; bills keep their reference
+            if kind == "TRANSFER":
+                counterparty = _masked(counterparty)
+            desc += f" ({html.escape(counterparty)})"
+        money = lambda v: fx.format_amount(v, self.currency)
+        self.f.write(_ROW.format(
+            ts=ts, desc=desc,
+            debit=money(amount) if leg == "DEBIT" else "",
+            credit=money(amount) if leg == "CREDIT" else "",
+            balance=_money(self.balance, self.currency)
+        ))
+
+    def close(self):
+        self.f.write(_FOOT.format(
+            credits=fx.format_amount(self.credits, self.currency),
+            debits=fx.format_amount(self.debits, self.currency),
+            closing=_money(self.balance, self.currency)
+        ))
+        size = self.f.tell()
+        self.f.close()
+        os.replace(self.path + ".part", self.path)
+        return size
+
+
+def render_range(db_path, out_dir, month, first, last):
+    """Write statements for accounts first..last. Returns counters."""
+    db.DB_PATH = db_path
+    start, end = month_bounds(month)
+    accounts = rows = size = 0
+
+    with get_conn() as con:
+        # one read snapshot for the balances and the rows
+        con.execute("BEGIN")
+        accts = con.execute(_ACCOUNTS, (start, first, last)).fetchall()
+        postings = con.execute(_POSTINGS, (first, last, start, end))
+
+        # merge join: accounts and postings are both in id order
+        i = 0
+        statement = current_id = None
+        for account_id, *row in postings:
+            if account_id != current_id:
+                if statement is not None:
+                    size += statement.close()
+                    accounts += 1
+                    statement = None
+                while i < len(accts) and accts[i][0] < account_id:
+                    size += _Statement(out_dir, month, accts[i]).close()
+                    accounts += 1
+                    i += 1
+                current_id = account_id
+                if i < len(accts) and accts[i][0] == account_id:
+                    statement = _Statement(out_dir, month, accts[i])
+                    i += 1
+
+            # rows of a deleted account have no statement to go to
+            if statement is not None:
+                statement.row(*row)
+                rows += 1
+
+        if statement is not None:
+            size += statement.close()
+            accounts += 1
+        for account in accts[i:]:
+            size += _Statement(out_dir, month, account).close()
+            accounts += 1
+        con.commit()
+
+    return {
+        "accounts": accounts,
+        "rows": rows,
+        "bytes": size,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+# ============================================================
+#  Batch
+# ============================================================
+def generate(month=None, out_dir=STATEMENT_DIR, workers=None,
+             range_size=RANGE_SIZE, progress=None):
+    """
+    Statements for every account. progress(done, total, seconds) is
+    called as ranges finish. Returns a summary dict.
+    """
+    month = month or last_month()
+    month_bounds(month)     # validate before starting a pool
+    target = os.path.join(out_dir, month)
+    started = time.perf_counter()
+
+    with get_conn() as con:
+        lo, hi, total = con.execute(
+            "SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), -1), COUNT(*) FROM accounts"
+        ).fetchone()
+
+    ranges = [
+        (first, min(first + range_size - 1, hi))
+        for first in range(lo, hi + 1, range_size)
+    ]
+
+    done = rows = size = worker_rss = 0
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(render_range, db.DB_PATH, target, month, first, last)
+            for first, last in ranges
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            done += result["accounts"]
+            rows += result["rows"]
+            size += result["bytes"]
+            worker_rss = max(worker_rss, result["max_rss_kb"])
+            if progress:
+                progress(done, total, time.perf_counter() - started)
+
+    seconds = time.perf_counter() - started
+    summary = {
+        "month": month,
+        "path": target,
+        "accounts": done,
+        "rows": rows,
+        "bytes": size,
+        "seconds": seconds,
+        "accounts_per_sec": done / seconds if seconds else 0.0,
+        "parent_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "worker_rss_mb": worker_rss / 1024,
+    }
+    log_event(
+        None, "STATEMENTS_GENERATED",
+        details=f"{month}: {done} accounts, {rows} rows in {seconds:.1f}s"
+    )
+    return summary
+
+
+def print_progress(done, total, seconds):
+    pct = done * 100 // total if total else 100
+    rate = done / seconds if seconds else 0.0
+    print(
+        f"\r{done}/{total} accounts ({pct}%) {rate:,.0f} accounts/s",
+        end="", file=sys.stderr, flush=True
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--month", help="YYYY-MM (default: last month)")
+    parser.add_argument("--out", default=STATEMENT_DIR)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--range-size", type=int, default=RANGE_SIZE)
+    args = parser.parse_args()
+
+    summary = generate(
+        args.month, args.out, args.workers, args.range_size, print_progress
+    )
+    print(file=sys.stderr)
+    print(
+        f"{summary['accounts']} statements ({summary['rows']} rows, "
+        f"{summary['bytes'] / 1e6:.1f} MB) for {summary['month']} in "
+        f"{summary['seconds']:.2f}s: {summary['accounts_per_sec']:,.0f} accounts/s, "
+        f"peak RSS {summary['parent_rss_mb']:.0f} MB parent / "
+        f"{summary['worker_rss_mb']:.0f} MB worker -> {summary['path']}"
+    )
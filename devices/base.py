@@ -0,0 +1,185 @@
+# devices/base.py
+"""
+Plumbing shared by the peripheral drivers.
+
+A Device is a QObject whose I/O runs on its own daemon thread. The
+thread reads lines from a source and hands them to handle(); drivers
+turn them into pyqtSignals. The QObject lives on the GUI thread, so
+those signals reach slots there as queued calls and the screens never
+wait on hardware.
+
+Sources are given as a spec string:
+
+    tcp://HOST:PORT    listen; every connected client sends lines
+    /path/to/file      follow a file or FIFO (simulators, tests)
+    /dev/ttyUSB0       a serial device that speaks lines (track data)
+
+Only tcp:// sources can carry commands back to the device (command());
+file and tty sources are read-only.
+
+A source that fails (device unplugged, socket error) is reopened after
+RECONNECT_SECONDS; the error is reported once through device_error.
+"""
+import os
+import socket
+import threading
+import traceback
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+import metrics
+
+RECONNECT_SECONDS = float(os.environ.get("KIOSK_DEVICE_RECONNECT", "2"))
+POLL_SECONDS = 0.05
+
+
+# ============================================================
+#  Line sources
+# ============================================================
+def _follow_file(path, stopping):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        # Regular files are tailed: lines left from a previous run are stale
+        if os.path.isfile(path):
+            f.seek(0, os.SEEK_END)
+        while not stopping.is_set():
+            line = f.readline()
+            if line:
+                yield line
+            else:
+                stopping.wait(POLL_SECONDS)
+
+
+def _serve_tcp(address, stopping, attach):
+    host, _, port = address.rpartition(":")
+    server = socket.create_server((host or "127.0.0.1", int(port)))
+    server.settimeout(POLL_SECONDS * 10)
+    try:
+        while not stopping.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+
+            with conn:
+                conn.settimeout(POLL_SECONDS * 10)
+                # one short line per event: don't let Nagle hold them back
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                attach(conn)
+                buf = b""
+                try:
+                    while not stopping.is_set():
+                        try:
+                            chunk = conn.recv(4096)
+                        except socket.timeout:
+                            continue
+                        if not chunk:
+                            break
+                        buf += chunk
+                        *lines, buf = buf.split(b"\n")
+                        for line in lines:
+                            yield line.decode("utf-8", "replace")
+                finally:
+                    attach(None)
+    finally:
+        server.close()
+
+
+def lines(spec, stopping, attach=lambda conn: None):
+    """
+    Yield lines from `spec` until `stopping` is set. For tcp:// sources
+    attach(conn) is called with each client socket (None once it goes)
+    so the caller can write back.
+    """
+    if spec.startswith("tcp://"):
+        return _serve_tcp(spec[len("tcp://"):], stopping, attach)
+    return _follow_file(spec, stopping)
+
+
+def send(spec, *messages):
+    """Write lines to a tcp:// or file source (simulators, tests)."""
+    payload = "".join(m.rstrip("\n") + "\n" for m in messages)
+    if spec.startswith("tcp://"):
+        host, _, port = spec[len("tcp://"):].rpartition(":")
+        with socket.create_connection((host or "127.0.0.1", int(port)), timeout=5) as s:
+            s.sendall(payload.encode())
+    else:
+        with open(spec, "a", encoding="utf-8") as f:
+            f.write(payload)
+
+
+# ============================================================
+#  Device
+# ============================================================
+class Device(QObject):
+    """Base driver: subclasses set NAME and implement handle(line)."""
+    NAME = "device"
+    device_error = pyqtSignal(str)
+
+    def __init__(self, spec, parent=None):
+        super().__init__(parent)
+        self.spec = spec
+        self._stopping = threading.Event()
+        self._thread = None
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self.events = {}
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name=f"{self.NAME}-io", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def count(self, event):
+        """Per-event counter (kiosk_device_events_total{device,event})."""
+        self.events[event] = self.events.get(event, 0) + 1
+        metrics.counter(
+            "kiosk_device_events_total", "Peripheral events",
+            device=self.NAME, event=event
+        ).inc()
+
+    def handle(self, line):
+        raise NotImplementedError
+
+    def command(self, line):
+        """Send one line to the device. False if there is no way to."""
+        with self._conn_lock:
+            if self._conn is None:
+                return False
+            try:
+                self._conn.sendall(line.encode() + b"\n")
+                return True
+            except OSError:
+                return False
+
+    def _attach(self, conn):
+        with self._conn_lock:
+            self._conn = conn
+
+    # -------------------------------------------------
+    # I/O thread
+    # -------------------------------------------------
+    def _run(self):
+        reported = False
+        while not self._stopping.is_set():
+            try:
+                for line in lines(self.spec, self._stopping, self._attach):
+                    reported = False
+                    line = line.strip()
+                    if line:
+                        self.handle(line)
+            except OSError as e:
+                # One report per outage, not one per reconnect attempt
+                if not reported:
+                    reported = True
+                    self.count("offline")
+                    self.device_error.emit(f"{self.NAME} unavailable: {e}")
+            except Exception:
+                traceback.print_exc()
+
+            self._stopping.wait(RECONNECT_SECONDS)
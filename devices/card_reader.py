@@ -0,0 +1,132 @@
+# devices/card_reader.py
+"""
+Card reader driver.
+
+Readers report over a line protocol (see devices.base for sources).
+Motorised EMV/NFC readers sit behind a small bridge that writes
+
+    INSERT <card number>
+    REMOVE
+    ERROR <text>
+
+while magnetic swipe readers send raw track data, which is parsed here:
+
+    ;4000123412341234=2512101?          track 2
+    %B4000123412341234^DOE/J^2512...?   track 1
+
+A swipe is reported as an insert with no matching remove.
+
+Readers bounce: a slow swipe reads twice and an NFC card held on the
+pad is seen again every few hundred ms. An insert of the card already
+in the slot is dropped, as is a swipe of the card last read within
+DEBOUNCE_SECONDS. So are repeats of the same error within that window
+and removes with no card in.
+
+    python -m devices.card_reader --simulate tcp://127.0.0.1:7600 insert 10020030
+"""
+import argparse
+import os
+import re
+import time
+
+from PyQt5.QtCore import pyqtSignal
+
+from devices.base import Device, send
+
+DEBOUNCE_SECONDS = float(os.environ.get("KIOSK_CARD_DEBOUNCE", "1.5"))
+
+CARD_RE = re.compile(r"^\d{6,19}$")
+TRACK2_RE = re.compile(r"^;(\d{6,19})=[^?]*\?")
+TRACK1_RE = re.compile(r"^%B(\d{6,19})\^[^?]*\?")
+
+
+def parse(line):
+    """(event, value) for one line; value is the card number or error text."""
+    word, _, rest = line.partition(" ")
+    word = word.upper()
+    rest = rest.strip()
+
+    if word == "INSERT":
+        if CARD_RE.match(rest):
+            return "inserted", rest
+        return "error", "Card number could not be read"
+    if word == "REMOVE":
+        return "removed", None
+    if word == "ERROR":
+        return "error", rest or "Card could not be read"
+
+    if line[:1] in (";", "%"):
+        match = TRACK2_RE.match(line) or TRACK1_RE.match(line)
+        if match:
+            return "swiped", match.group(1)
+        return "error", "Card could not be read, please swipe again"
+
+    return "error", f"Unknown reader message {line[:20]!r}"
+
+
+class CardReader(Device):
+    NAME = "card_reader"
+
+    card_inserted = pyqtSignal(str)
+    card_removed = pyqtSignal()
+    read_error = pyqtSignal(str)
+
+    def __init__(self, spec, debounce=DEBOUNCE_SECONDS, parent=None):
+        super().__init__(spec, parent)
+        self.debounce = debounce
+        self.present = None      # card in the slot (insert readers only)
+        self._last = (None, 0.0)
+        self._last_error = (None, 0.0)
+
+    # -------------------------------------------------
+    # I/O thread
+    # -------------------------------------------------
+    def handle(self, line):
+        event, value = parse(line)
+        now = time.monotonic()
+
+        if event in ("inserted", "swiped"):
+            card, at = self._last
+            bounced = event == "swiped" and value == card and now - at < self.debounce
+            if value == self.present or bounced:
+                self.count("duplicate")
+                return
+            self._last = (value, now)
+            if event == "inserted":
+                self.present = value
+            self.count("inserted")
+            self.card_inserted.emit(value)
+
+        elif event == "removed":
+            if self.present is None:
+                self.count("duplicate")
+                return
+            self.present = None
+            self.count("removed")
+            self.card_removed.emit()
+
+        else:
+            text, at = self._last_error
+            if value == text and now - at < self.debounce:
+                self.count("duplicate")
+                return
+            self._last_error = (value, now)
+            self.count("error")
+            self.read_error.emit(value)
+
+
+# ============================================================
+#  CLI (drive a simulated reader)
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send events to a card reader source")
+    parser.add_argument("--simulate", required=True, help="tcp://HOST:PORT or a file path")
+    parser.add_argument("event", choices=("insert", "remove", "error", "swipe"))
+    parser.add_argument("value", nargs="?", default="")
+    args = parser.parse_args()
+
+    if args.event == "swipe":
+        message = f";{args.value}=2512101?"
+    else:
+        message = f"{args.event.upper()} {args.value}".strip()
+    send(args.simulate, message)
@@ -0,0 +1,294 @@
+# devices/cash_acceptor.py
+"""
+Cash acceptor driver and protocol simulator.
+
+The acceptor validates one note at a time and holds it in escrow until
+the kiosk decides (see devices.base for sources):
+
+    acceptor -> kiosk              kiosk -> acceptor
+    ESCROW <denomination>          STACK     keep the note in escrow
+    STACKED <denomination>         RETURN    hand it back
+    RETURNED <denomination>        ENABLE    start taking notes
+    REJECTED <reason>              DISABLE   stop taking notes
+    JAM <where>
+    CLEARED
+
+A deposit is a session: begin() enables the acceptor, each STACKED note
+is added to the running count and pushed to the screen through
+`counted`, and end() disables it; the final count, for a single
+posting, follows on `settled` once escrow is empty. Notes arriving outside a session, of an unknown
+denomination, or past the session's max_total are returned from escrow.
+
+Read-only sources (files, ttys) cannot take commands; the acceptor is
+then expected to stack notes itself and the max_total cap cannot be
+enforced.
+
+    python -m devices.cash_acceptor --simulate tcp://127.0.0.1:7601 1000 500 500
+"""
+import argparse
+import os
+import socket
+import threading
+import time
+import traceback
+
+from PyQt5.QtCore import QTimer, pyqtSignal
+
+import metrics
+from database.db import log_event
+from devices.base import Device
+
+DENOMINATIONS = (20, 50, 100, 200, 500, 1000)
+SETTLE_SECONDS = float(os.environ.get("KIOSK_CASH_SETTLE", "3"))
+
+NOTE_TIMER = metrics.histogram(
+    "kiosk_cash_note_seconds", "Escrow to stacked, per note",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+
+def notes_text(notes):
+    """'2x1000, 1x500' — the breakdown kept with a deposit posting."""
+    return ", ".join(
+        f"{count}x{denom}" for denom, count in sorted(notes.items(), reverse=True)
+    )
+
+
+class CashAcceptor(Device):
+    NAME = "cash_acceptor"
+
+    escrowed = pyqtSignal(int)
+    counted = pyqtSignal(object)      # snapshot(): notes, total, at
+    returned = pyqtSignal(int, str)   # denomination (0 if unread), reason
+    jammed = pyqtSignal(str)
+    cleared = pyqtSignal()
+    settled = pyqtSignal(object)      # end()'s final snapshot
+
+    def __init__(self, spec, parent=None):
+        super().__init__(spec, parent)
+        self._lock = threading.Lock()
+        self.accepting = False      # new notes are stacked
+        self.session = False        # until end() has settled escrow
+        self.closing = None         # end() waiting on escrow (its number)
+        self.ends = 0
+        self.max_total = None
+        self.notes = {}
+        self.total = 0
+        self.escrow = None          # (denomination, arrival, told to stack)
+        self.last_at = None
+        self.jam = None
+
+    # -------------------------------------------------
+    # Session (GUI thread)
+    # -------------------------------------------------
+    def begin(self, max_total=None):
+        self._close()               # a previous end() still settling
+        with self._lock:
+            self.accepting = True
+            self.session = True
+            self.max_total = max_total
+            self.notes = {}
+            self.total = 0
+            self.last_at = None
+        self.command("ENABLE")
+
+    def end(self, settle=SETTLE_SECONDS):
+        """
+        Stop taking notes. Returns at once; the final snapshot comes on
+        `settled`. A note caught in escrow is given up to `settle`
+        seconds to be stacked or returned, so it lands in this count or
+        back in the hand.
+        """
+        with self._lock:
+            self.accepting = False
+            self.ends += 1
+            token = self.closing = self.ends
+            idle = self.escrow is None
+        self.command("DISABLE")
+
+        if idle:
+            self._close(token)
+        else:
+            QTimer.singleShot(int(settle * 1000), lambda: self._close(token))
+
+    def _close(self, token=None):
+        """Finish the session end() `token` opened (None: any pending one)."""
+        with self._lock:
+            if self.closing is None or token not in (None, self.closing):
+                return
+            self.closing = None
+            self.session = False
+            snap = self._snapshot()
+            self.notes = {}
+            self.total = 0
+        self.settled.emit(snap)
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        return {"notes": dict(self.notes), "total": self.total, "at": self.last_at}
+
+    # -------------------------------------------------
+    # I/O thread
+    # -------------------------------------------------
+    def handle(self, line):
+        word, _, rest = line.partition(" ")
+        word = word.upper()
+        rest = rest.strip()
+        denom = int(rest) if rest.isdigit() else 0
+
+        if word == "ESCROW":
+            self._on_escrow(denom)
+        elif word == "STACKED":
+            self._on_stacked(denom)
+        elif word == "RETURNED":
+            self._settle()
+            self.count("returned")
+            self.returned.emit(denom, "returned")
+        elif word == "REJECTED":
+            self._settle()
+            self.count("rejected")
+            self.returned.emit(0, rest or "not recognised")
+        elif word == "JAM":
+            self.jam = rest or "unknown"
+            self.count("jam")
+            self.jammed.emit(self.jam)
+        elif word == "CLEARED":
+            self.jam = None
+            self.cleared.emit()
+        else:
+            self.count("unknown")
+
+    def _on_escrow(self, denom):
+        with self._lock:
+            ok = (
+                self.accepting
+                and denom in DENOMINATIONS
+                and (self.max_total is None or self.total + denom <= self.max_total)
+            )
+            self.escrow = (denom, time.monotonic(), ok)
+        self.escrowed.emit(denom)
+        self.command("STACK" if ok else "RETURN")
+
+    def _on_stacked(self, denom):
+        now = time.monotonic()
+        with self._lock:
+            # counted if this session told the acceptor to stack it
+            claimed = False
+            if self.escrow is not None:
+                NOTE_TIMER.observe(now - self.escrow[1])
+                claimed = self.escrow[2] and self.session
+                self.escrow = None
+            closing = self.closing
+            if claimed:
+                self.notes[denom] = self.notes.get(denom, 0) + 1
+                self.total += denom
+                self.last_at = now
+                snap = self._snapshot()
+
+        if not claimed:
+            self._unclaimed(denom)
+        else:
+            self.count("stacked")
+            self.counted.emit(snap)
+        if closing is not None:
+            self._close(closing)
+
+    def _unclaimed(self, denom):
+        # Stacked after its session closed (or with none open): the cash
+        # is in the box but on nobody's deposit, so ops must hear of it
+        self.count("unclaimed")
+        try:
+            log_event(None, "CASH_UNCLAIMED", amount=denom, details=f"1x{denom}")
+        except Exception:
+            traceback.print_exc()
+
+    def _settle(self):
+        with self._lock:
+            self.escrow = None
+            closing = self.closing
+        if closing is not None:
+            self._close(closing)
+
+
+# ============================================================
+#  Simulator (the acceptor's side of the protocol)
+# ============================================================
+class Simulator:
+    """
+    Plays a cash acceptor against a kiosk listening on tcp://HOST:PORT.
+    insert() reports a note in escrow and follows the kiosk's
+    STACK/RETURN answer, like the hardware does.
+    """
+
+    def __init__(self, spec, timeout=5.0):
+        host, _, port = spec[len("tcp://"):].rpartition(":")
+        self.sock = socket.create_connection((host or "127.0.0.1", int(port)), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("r", encoding="utf-8")
+        self.enabled = False
+
+    def send(self, line):
+        self.sock.sendall(line.encode() + b"\n")
+
+    def _answer(self):
+        """Next escrow decision; ENABLE/DISABLE on the way are noted."""
+        while True:
+            line = self.reader.readline()
+            if not line:
+                raise ConnectionError("kiosk closed the connection")
+            word = line.strip().upper()
+            if word == "ENABLE":
+                self.enabled = True
+            elif word == "DISABLE":
+                self.enabled = False
+            elif word in ("STACK", "RETURN"):
+                return word
+
+    def insert(self, denom):
+        """Returns True if the note was stacked."""
+        self.send(f"ESCROW {denom}")
+        if self._answer() == "STACK":
+            self.send(f"STACKED {denom}")
+            return True
+        self.send(f"RETURNED {denom}")
+        return False
+
+    def reject(self, reason="not recognised"):
+        self.send(f"REJECTED {reason}")
+
+    def jam(self, where="transport"):
+        self.send(f"JAM {where}")
+
+    def clear(self):
+        self.send("CLEARED")
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+# ============================================================
+#  CLI
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate a cash acceptor")
+    parser.add_argument("--simulate", required=True, help="tcp://HOST:PORT the kiosk listens on")
+    parser.add_argument("notes", nargs="*", type=int)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--jam-after", type=int, default=0, help="jam after N notes, clear 2 s later")
+    args = parser.parse_args()
+
+    sim = Simulator(args.simulate)
+    try:
+        for i, denom in enumerate(args.notes, 1):
+            print(f"{denom}: {'stacked' if sim.insert(denom) else 'returned'}")
+            if i == args.jam_after:
+                sim.jam()
+                time.sleep(2)
+                sim.clear()
+            time.sleep(args.interval)
+    finally:
+        sim.close()
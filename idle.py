@@ -0,0 +1,94 @@
+# idle.py
+import time
+
+from PyQt5.QtCore import QObject, QTimer, QEvent
+
+
+class IdleTracker(QObject):
+    """
+    Application-wide idle detection.
+
+    The event filter only stamps the time of the last input event; a coarse
+    timer compares it with the timeout of the screen currently shown. When
+    it runs out, the warning dialog counts down and on_expire is called.
+    """
+    CHECK_MS = 1000
+    WARNING_SECONDS = 10
+
+    ACTIVITY_EVENTS = frozenset((
+        QEvent.MouseMove,
+        QEvent.MouseButtonPress,
+        QEvent.KeyPress,
+        QEvent.KeyRelease,
+        QEvent.TouchBegin,
+        QEvent.TouchUpdate,
+    ))
+
+    def __init__(self, default_timeout, current_screen, dialog, on_expire, parent=None):
+        super().__init__(parent)
+        self.default_timeout = default_timeout
+        self.current_screen = current_screen
+        self.dialog = dialog
+        self.on_expire = on_expire
+
+        self.timeouts = {}
+        self.last_activity = time.monotonic()
+        self.warning_since = None
+
+        self.dialog.accepted.connect(self.touch)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.CHECK_MS)
+        self.timer.timeout.connect(self._check)
+        self.timer.start()
+
+    # -------------------------------------------------
+    # Config
+    # -------------------------------------------------
+    def set_timeout(self, screen, seconds):
+        """Per-screen timeout in seconds; None disables idle reset there."""
+        self.timeouts[screen] = seconds
+
+    def timeout(self):
+        return self.timeouts.get(self.current_screen(), self.default_timeout)
+
+    # -------------------------------------------------
+    # Activity
+    # -------------------------------------------------
+    def eventFilter(self, obj, event):
+        if event.type() in self.ACTIVITY_EVENTS:
+            self.last_activity = time.monotonic()
+        return False
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+        self.warning_since = None
+
+    def idle_seconds(self):
+        return time.monotonic() - self.last_activity
+
+    # -------------------------------------------------
+    # Coarse check
+    # -------------------------------------------------
+    def _check(self):
+        now = time.monotonic()
+
+        if self.warning_since is not None:
+            remaining = self.WARNING_SECONDS - int(now - self.warning_since)
+            if remaining > 0:
+                self.dialog.set_seconds(remaining)
+                return
+
+            self.warning_since = None
+            self.dialog.hide()
+            self.touch()
+            self.on_expire()
+            return
+
+        timeout = self.timeout()
+        if timeout is None or now - self.last_activity < timeout:
+            return
+
+        self.warning_since = now
+        self.dialog.set_seconds(self.WARNING_SECONDS)
+        self.dialog.open()
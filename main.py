@@ -2,7 +2,9 @@ from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QStackedWidget,
     QDialog, QLabel, QPushButton, QLineEdit
 )
-from PyQt5.QtCore import QTimer, Qt, QEvent
+from PyQt5.QtCore import QTimer, Qt, QEvent, QObject
+from contextlib import contextmanager
+import os
 import sys
 import traceback
 
@@ -16,8 +18,42 @@ from screens.admin import AdminScreen
 from screens.account_info import AccountInfoScreen
 from screens.history import TransactionHistoryScreen
 
+import metrics
+import tracing
 from database.db import log_event
+from database import (
+    audit_search, backup, fx, idempotency, intents, journal, ledger, limits,
+    reconcile, risk, scheduled
+)
+from database.backend import backend
+from database.maintenance import maintenance
+from database.prefetch import prefetcher
+from devices.card_reader import CardReader
+from devices.cash_acceptor import CashAcceptor
+from services.sync_agent import SyncAgent
 from security import verify_pin
+from idle import IdleTracker
+from watchdog import StallWatchdog, STALL_MS
+
+
+NAV_TIMERS = {
+    target: metrics.histogram(
+        "kiosk_navigation_seconds", "Navigation callback time", target=target
+    )
+    for target in (
+        "home", "welcome", "auth", "menu", "transaction", "receipt", "admin"
+    )
+}
+
+
+# ============================================================
+#  Paint Probe (transition tracing)
+# ============================================================
+class PaintProbe(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            tracing.painted(obj)
+        return False
 
 
 # ============================================================
@@ -45,8 +81,8 @@ class IdleWarningDialog(QDialog):
     def _text(self):
         return f"Session will reset in {self.seconds} seconds"
 
-    def tick(self):
-        self.seconds -= 1
+    def set_seconds(self, seconds):
+        self.seconds = seconds
         self.label.setText(self._text())
 
 
@@ -94,6 +130,7 @@ class AdminPinDialog(QDialog):
 # ============================================================
 class MainWindow(QWidget):
     IDLE_SECONDS = 60
+    RECEIPT_IDLE_SECONDS = 20
 
     def __init__(self):
         super().__init__()
@@ -107,6 +144,21 @@ class MainWindow(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.addWidget(self.stack)
 
+        # ---------- Schema ----------
+        # Before any screen: their constructors already query (the admin
+        # screen loads accounts, with the currency column fx adds)
+        try:
+            ledger.init_db()
+            journal.init_db()
+            idempotency.init_db()
+            limits.init_db()
+            scheduled.init_db()
+            intents.init_db()
+            audit_search.init_db()
+            risk.install()
+        except Exception:
+            traceback.print_exc()
+
         # ---------- Screens ----------
         self.welcome = WelcomeScreen(self.go_auth)
         self.auth = AuthScreen(self.go_menu, self.go_welcome)
@@ -122,7 +174,7 @@ class MainWindow(QWidget):
         self.history = TransactionHistoryScreen(self.go_home)
         self.admin = AdminScreen(self.go_welcome)
 
-        for screen in (
+        self.screens = (
             self.welcome,
             self.auth,
             self.menu,
@@ -131,24 +183,134 @@ class MainWindow(QWidget):
             self.account_info,
             self.history,
             self.admin
-        ):
+        )
+        for screen in self.screens:
             self.stack.addWidget(screen)
 
         self.stack.setCurrentWidget(self.welcome)
 
+        # ---------- Tracing ----------
+        if os.environ.get("KIOSK_TRACE") == "1":
+            tracing.start()
+            self.paint_probe = PaintProbe(self)
+            for screen in self.screens:
+                screen.installEventFilter(self.paint_probe)
+
         # ---------- Audit ----------
         try:
             log_event(None, "SYSTEM_BOOT", details="Kiosk started")
         except Exception:
             traceback.print_exc()
 
-        # ---------- Idle Timer ----------
-        self.idle_timer = QTimer(self)
-        self.idle_timer.setInterval(self.IDLE_SECONDS * 1000)
-        self.idle_timer.timeout.connect(self._idle_trigger)
-        self.idle_timer.start()
+        # ---------- Recovery ----------
+        # Postings a previous run left half-done: audit rows and receipts
+        try:
+            intents.recover(backend)
+        except Exception:
+            traceback.print_exc()
+
+        # ---------- Metrics ----------
+        try:
+            metrics.start_http_server()
+            metrics.start_json_dump()
+        except OSError:
+            traceback.print_exc()
 
-        QApplication.instance().installEventFilter(self)
+        # ---------- Ledger Sync ----------
+        self.sync_agent = None
+        try:
+            ledger_url = os.environ.get("LEDGER_URL")
+            if ledger_url:
+                self.sync_agent = SyncAgent(ledger_url)
+                self.sync_agent.start()
+        except Exception:
+            traceback.print_exc()
+
+        # ---------- FX Rates ----------
+        try:
+            fx_source = os.environ.get("KIOSK_FX_SOURCE")
+            if fx_source:
+                fx.start_background(fx_source)
+            fx.watch()
+        except Exception:
+            traceback.print_exc()
+
+        # ---------- Reconciliation ----------
+        # Only when the local database is the ledger of record
+        try:
+            if not os.environ.get("LEDGER_ADDR"):
+                reconcile.init_db()
+                reconcile.start_background()
+        except Exception:
+            traceback.print_exc()
+
+        # ---------- Scheduled Bills ----------
+        # Against a central ledger, the ledger service pays them
+        try:
+            if not os.environ.get("LEDGER_ADDR"):
+                scheduled.start_background()
+        except Exception:
+            traceback.print_exc()
+
+        # ---------- Backups ----------
+        try:
+            backup.start_background()
+        except Exception:
+            traceback.print_exc()
+
+        # ---------- Maintenance ----------
+        # Heavy tasks only run while the welcome screen is showing
+        maintenance.set_idle(True)
+        maintenance.start()
+
+        # ---------- Idle Tracking ----------
+        self.idle_dialog = IdleWarningDialog(IdleTracker.WARNING_SECONDS)
+        self.idle = IdleTracker(
+            self.IDLE_SECONDS,
+            self.stack.currentWidget,
+            self.idle_dialog,
+            self.go_welcome,
+            self
+        )
+        self.idle.set_timeout(self.welcome, None)
+        self.idle.set_timeout(self.receipt, self.RECEIPT_IDLE_SECONDS)
+
+        QApplication.instance().installEventFilter(self.idle)
+
+        # ---------- Card Reader ----------
+        # Signals arrive queued from the reader's I/O thread
+        self.card_reader = None
+        self.card_session = None
+        try:
+            reader_spec = os.environ.get("KIOSK_CARD_READER")
+            if reader_spec:
+                self.card_reader = CardReader(reader_spec, parent=self)
+                self.card_reader.card_inserted.connect(self.on_card_inserted)
+                self.card_reader.card_removed.connect(self.on_card_removed)
+                self.card_reader.read_error.connect(self.on_card_error)
+                self.card_reader.device_error.connect(self.on_device_error)
+                self.card_reader.start()
+        except Exception:
+            traceback.print_exc()
+
+        # ---------- Cash Acceptor ----------
+        # Without one, deposits fall back to a typed amount
+        self.cash_acceptor = None
+        try:
+            acceptor_spec = os.environ.get("KIOSK_CASH_ACCEPTOR")
+            if acceptor_spec:
+                self.cash_acceptor = CashAcceptor(acceptor_spec, parent=self)
+                self.cash_acceptor.device_error.connect(self.on_device_error)
+                self.transaction.set_acceptor(self.cash_acceptor)
+                self.cash_acceptor.start()
+        except Exception:
+            traceback.print_exc()
+
+        # ---------- Stall Watchdog ----------
+        self.watchdog = None
+        if STALL_MS > 0:
+            self.watchdog = StallWatchdog(self.stack.currentWidget, parent=self)
+            self.admin.watchdog = self.watchdog
 
     # ========================================================
     #  HARD SESSION RESET (MOST IMPORTANT FIX)
@@ -160,8 +322,11 @@ class MainWindow(QWidget):
         """
         self.menu.account_id = None
         self.menu.balance = None
+        self.card_session = None
+        prefetcher.invalidate()
 
         for screen in (
+            self.auth,
             self.transaction,
             self.history,
             self.account_info,
@@ -175,77 +340,104 @@ class MainWindow(QWidget):
     # ========================================================
     #  Navigation
     # ========================================================
+    @contextmanager
+    def _navigate(self, name):
+        start = tracing.now()
+        with NAV_TIMERS[name].time():
+            yield
+        current = self.stack.currentWidget()
+        maintenance.set_idle(current is self.welcome)
+        tracing.transition(name, current, start)
+
     def go_home(self):
-        self.reset_session()
-        self.stack.setCurrentWidget(self.welcome)
+        with self._navigate("home"):
+            self.reset_session()
+            self.stack.setCurrentWidget(self.welcome)
 
     def go_welcome(self):
-        self.reset_session()
-        self.stack.setCurrentWidget(self.welcome)
+        with self._navigate("welcome"):
+            self.reset_session()
+            self.stack.setCurrentWidget(self.welcome)
 
     def go_auth(self):
-        self.stack.setCurrentWidget(self.auth)
+        with self._navigate("auth"):
+            self.stack.setCurrentWidget(self.auth)
 
     def go_menu(self, account_id, balance):
-        self.menu.set_user(account_id, balance)
-        self.stack.setCurrentWidget(self.menu)
+        with self._navigate("menu"):
+            self.menu.set_user(account_id, balance)
+            self.stack.setCurrentWidget(self.menu)
 
     def go_transaction(self, option, account_id, balance):
-        if option == "info":
-            self.account_info.reset()
-            self.account_info.set_account(account_id)
-            self.stack.setCurrentWidget(self.account_info)
-            return
-
-        if option == "statement":
-            self.history.reset()
-            self.history.set_account(account_id)
-            self.stack.setCurrentWidget(self.history)
-            return
-
-        self.transaction.reset()
-        self.transaction.set_context(option, account_id, balance)
-        self.stack.setCurrentWidget(self.transaction)
+        with self._navigate("transaction"):
+            if option == "info":
+                self.account_info.reset()
+                self.account_info.set_account(account_id)
+                self.stack.setCurrentWidget(self.account_info)
+                return
+
+            if option == "statement":
+                self.history.reset()
+                self.history.set_account(account_id)
+                self.stack.setCurrentWidget(self.history)
+                return
+
+            self.transaction.reset()
+            self.transaction.set_context(option, account_id, balance)
+            self.stack.setCurrentWidget(self.transaction)
 
     def go_receipt(self, receipt_data):
-        self.receipt.reset()
-        self.receipt.set_receipt(receipt_data)
-        self.stack.setCurrentWidget(self.receipt)
+        with self._navigate("receipt"):
+            self.receipt.reset()
+            self.receipt.set_receipt(receipt_data)
+            self.stack.setCurrentWidget(self.receipt)
 
     def go_admin(self):
-        self.stack.setCurrentWidget(self.admin)
+        with self._navigate("admin"):
+            self.admin.load_stalls()
+            self.stack.setCurrentWidget(self.admin)
 
     # ========================================================
-    #  Idle Handling
+    #  Card Reader
     # ========================================================
-    def eventFilter(self, obj, event):
-        if event.type() in (
-            QEvent.MouseMove,
-            QEvent.MouseButtonPress,
-            QEvent.KeyPress,
-            QEvent.KeyRelease
-        ):
-            self.idle_timer.start()
-        return super().eventFilter(obj, event)
-
-    def _idle_trigger(self):
-        dlg = IdleWarningDialog(10)
-        timer = QTimer(self)
-
-        def tick():
-            dlg.tick()
-            if dlg.seconds <= 0:
-                timer.stop()
-                dlg.reject()
-                self.reset_session()
-                self.stack.setCurrentWidget(self.welcome)
-
-        timer.timeout.connect(tick)
-        timer.start(1000)
-
-        if dlg.exec_():
-            timer.stop()
-            self.idle_timer.start()
+    def _card_idle(self):
+        """No session to interrupt: welcome, or auth before a PIN."""
+        current = self.stack.currentWidget()
+        return current is self.welcome or current is self.auth
+
+    def on_card_inserted(self, card_number):
+        if not self._card_idle():
+            return
+        with self._navigate("auth"):
+            self.card_session = card_number
+            self.auth.reset()
+            self.auth.ask_pin(card_number)
+            self.stack.setCurrentWidget(self.auth)
+
+    def on_card_removed(self):
+        # Taking the card ends the session it started
+        if self.card_session is None:
+            return
+        self.card_session = None
+        if self.stack.currentWidget() is not self.welcome:
+            self.go_welcome()
+
+    def on_card_error(self, message):
+        try:
+            log_event(None, "CARD_READ_ERROR", details=message)
+        except Exception:
+            traceback.print_exc()
+        if self._card_idle():
+            with self._navigate("auth"):
+                self.auth.card_error(message)
+                self.stack.setCurrentWidget(self.auth)
+
+    def on_device_error(self, message):
+        # Typed card numbers still work; only the audit trail hears of it
+        try:
+            log_event(None, "DEVICE_OFFLINE", details=message)
+        except Exception:
+            traceback.print_exc()
 
     # ========================================================
     #  Admin Shortcut
@@ -0,0 +1,258 @@
+# metrics.py
+"""
+In-process metrics: counters, gauges and latency histograms.
+
+Samples are plain attribute updates (no locks) so recording stays well
+under a microsecond; a rare lost increment under thread contention is
+acceptable for field telemetry. Everything can be switched off at runtime
+with set_enabled(False) or KIOSK_METRICS=0.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.environ.get("KIOSK_METRICS_PORT", "9108"))
+DUMP_PATH = os.environ.get("KIOSK_METRICS_DUMP", "logs/metrics.json")
+DUMP_INTERVAL = 60
+
+# Seconds. Tuned for everything from a SQLite connect to a PBKDF2 verify.
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+_enabled = os.environ.get("KIOSK_METRICS", "1") != "0"
+
+
+def set_enabled(on):
+    global _enabled
+    _enabled = bool(on)
+
+
+def enabled():
+    return _enabled
+
+
+# -------------------------------------------------
+# Metric types
+# -------------------------------------------------
+class Counter:
+    kind = "counter"
+    __slots__ = ("name", "labels", "help", "value")
+
+    def __init__(self, name, labels, help=""):
+        self.name = name
+        self.labels = labels
+        self.help = help
+        self.value = 0
+
+    def inc(self, n=1):
+        if _enabled:
+            self.value += n
+
+    def samples(self):
+        yield self.name, self.labels, self.value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+    __slots__ = ()
+
+    def set(self, value):
+        if _enabled:
+            self.value = value
+
+    def dec(self, n=1):
+        if _enabled:
+            self.value -= n
+
+
+class Histogram:
+    kind = "histogram"
+    __slots__ = ("name", "labels", "help", "buckets", "counts", "sum", "count")
+
+    def __init__(self, name, labels, help="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.help = help
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        if _enabled:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def samples(self):
+        running = 0
+        for bound, n in zip(self.buckets, self.counts):
+            running += n
+            yield self.name + "_bucket", self.labels + (("le", repr(bound)),), running
+        yield self.name + "_bucket", self.labels + (("le", "+Inf"),), self.count
+        yield self.name + "_sum", self.labels, self.sum
+        yield self.name + "_count", self.labels, self.count
+
+
+class _Timer:
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+
+
+# -------------------------------------------------
+# Registry
+# -------------------------------------------------
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = cls(name, key[1], help, **kwargs)
+                    self._metrics[key] = metric
+        return metric
+
+    def counter(self, name, help="", **labels):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help="", **labels):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render_prometheus(self):
+        lines = []
+        seen = set()
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            if metric.name not in seen:
+                seen.add(metric.name)
+                if metric.help:
+                    lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    body = ",".join(f'{k}="{v}"' for k, v in labels)
+                    lines.append(f"{name}{{{body}}} {value}")
+                else:
+                    lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        out = []
+        for metric in list(self._metrics.values()):
+            entry = {
+                "name": metric.name,
+                "type": metric.kind,
+                "labels": dict(metric.labels),
+            }
+            if isinstance(metric, Histogram):
+                entry.update(
+                    buckets=list(metric.buckets),
+                    counts=list(metric.counts),
+                    sum=metric.sum,
+                    count=metric.count
+                )
+            else:
+                entry["value"] = metric.value
+            out.append(entry)
+        return {"ts": time.time(), "metrics": out}
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+def timed(name, help="", **labels):
+    """Decorator recording the call duration in a histogram."""
+    hist = REGISTRY.histogram(name, help, **labels)
+
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - start)
+        return wrapper
+
+    return decorate
+
+
+# -------------------------------------------------
+# Exporters
+# -------------------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def start_http_server(port=METRICS_PORT):
+    """Serve /metrics on localhost from a daemon thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def dump_json(path=DUMP_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(REGISTRY.snapshot(), f)
+    os.replace(tmp, path)
+
+
+def start_json_dump(path=DUMP_PATH, interval=DUMP_INTERVAL):
+    def loop():
+        while True:
+            time.sleep(interval)
+            if _enabled:
+                try:
+                    dump_json(path)
+                except OSError:
+                    pass
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
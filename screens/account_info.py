@@ -4,7 +4,9 @@ from PyQt5.QtWidgets import (
     QMessageBox, QSizePolicy, QApplication
 )
 from PyQt5.QtCore import Qt, QTimer
-from database.db import get_conn
+from database import fx
+from database.prefetch import prefetcher
+import tracing
 
 
 def scale(px: int) -> int:
@@ -99,37 +101,25 @@ class AccountInfoScreen(QWidget):
         self.reset()
         self.account_id = account_id
 
+        # Prefetched on the menu: render straight from cache
+        row = prefetcher.account(account_id, block=False)
+        if row:
+            self._render(row)
+            return
+
         # Defer DB load until widget is visible
         QTimer.singleShot(0, self._load_data)
 
     def _load_data(self):
         try:
-            with get_conn() as con:
-                cur = con.cursor()
-                cur.execute(
-                    "SELECT id, card_number, balance FROM accounts WHERE id=?",
-                    (self.account_id,)
-                )
-                row = cur.fetchone()
+            with tracing.span("db.account"):
+                row = prefetcher.account(self.account_id)
 
             if not row:
                 QMessageBox.warning(self, "Error", "Account not found.")
                 return
 
-            acc_id, card, balance = row
-            masked = (
-                f"**** **** **** {card[-4:]}"
-                if card and len(card) >= 4
-                else card
-            )
-
-            self.id_label.setText(f"Account ID: {acc_id}")
-            self.card_label.setText(f"Card Number: {masked}")
-            self.balance_label.setText(f"Balance: ₱{balance:,.2f}")
-
-            # Force repaint (prevents blank screen)
-            self.updateGeometry()
-            self.repaint()
+            self._render(row)
 
         except Exception as e:
             QMessageBox.critical(
@@ -137,3 +127,22 @@ class AccountInfoScreen(QWidget):
                 "Database Error",
                 f"Failed to load account info:\n{e}"
             )
+
+    def _render(self, row):
+        acc_id, card, balance, currency = row
+        masked = (
+            f"**** **** **** {card[-4:]}"
+            if card and len(card) >= 4
+            else card
+        )
+
+        self.id_label.setText(f"Account ID: {acc_id}")
+        self.card_label.setText(f"Card Number: {masked}")
+        self.balance_label.setText(
+            f"Balance: {fx.format_amount(balance, currency)} ({currency})"
+        )
+
+        # Force repaint (prevents blank screen)
+        self.updateGeometry()
+        self.repaint()
+        tracing.data_ready(self)
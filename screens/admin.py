@@ -1,17 +1,30 @@
 # screens/admin.py
+import datetime
 import sqlite3
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QTableWidget, QTableWidgetItem,
-    QMessageBox, QLineEdit, QFormLayout
+    QMessageBox, QLineEdit, QFormLayout, QComboBox, QTabWidget, QGridLayout
 )
 from PyQt5.QtCore import Qt
 
 from database.db import get_conn, log_event
+from database import audit_search, fx, ledger, reconcile, reports
 from security import hash_pin
+from watchdog import STALL_BUCKETS
+from widgets.keypad import PIN_MAX, PIN_MIN
 
 
 class AdminScreen(QWidget):
+    # label -> hours back (None = any time)
+    AUDIT_PERIODS = (
+        ("Any time", None),
+        ("Last hour", 1),
+        ("Last 24 hours", 24),
+        ("Last 7 days", 24 * 7),
+        ("Last 30 days", 24 * 30),
+    )
+
     def __init__(self, back_callback):
         super().__init__()
         self.back_callback = back_callback
@@ -47,45 +60,151 @@ class AdminScreen(QWidget):
         btn_row.addWidget(back_btn)
         root.addLayout(btn_row)
 
+        # ================= Tabs =================
+        self.tabs = QTabWidget()
+        root.addWidget(self.tabs)
+
+        overview = QWidget()
+        page = QVBoxLayout(overview)
+        page.setSpacing(12)
+        self.tabs.addTab(overview, "Overview")
+
         # ================= Accounts Table =================
-        root.addWidget(QLabel("Accounts"))
+        page.addWidget(QLabel("Accounts"))
 
-        self.accounts = QTableWidget(0, 3)
+        self.accounts = QTableWidget(0, 4)
         self.accounts.setHorizontalHeaderLabels(
-            ["ID", "Card Number", "Balance"]
+            ["ID", "Card Number", "Balance", "Currency"]
         )
         self.accounts.horizontalHeader().setStretchLastSection(True)
-        root.addWidget(self.accounts)
+        page.addWidget(self.accounts)
 
         # ================= Create Account =================
-        root.addWidget(QLabel("Create New Account"))
+        page.addWidget(QLabel("Create New Account"))
 
         form = QFormLayout()
         self.in_card = QLineEdit()
         self.in_pin = QLineEdit()
         self.in_pin.setEchoMode(QLineEdit.Password)
+        self.in_pin.setMaxLength(PIN_MAX)
         self.in_balance = QLineEdit()
+        self.in_currency = QComboBox()
+        self.in_currency.addItems(sorted(fx.SYMBOLS))
+        self.in_currency.setCurrentText(fx.BASE_CURRENCY)
 
         form.addRow("Card Number:", self.in_card)
         form.addRow("PIN:", self.in_pin)
         form.addRow("Initial Balance:", self.in_balance)
+        form.addRow("Currency:", self.in_currency)
 
-        root.addLayout(form)
+        page.addLayout(form)
 
         create_btn = QPushButton("Create Account")
         create_btn.setFixedHeight(45)
         create_btn.clicked.connect(self.create_account)
-        root.addWidget(create_btn)
+        page.addWidget(create_btn)
 
         # ================= Audit Log =================
-        root.addWidget(QLabel("Audit Log"))
+        page.addWidget(QLabel("Audit Log"))
+
+        filters = QHBoxLayout()
+        self.audit_text = QLineEdit()
+        self.audit_text.setPlaceholderText("Search details…")
+        self.audit_text.returnPressed.connect(self.search_audit)
+        self.audit_event = QComboBox()
+        self.audit_account = QLineEdit()
+        self.audit_account.setPlaceholderText("Account ID")
+        self.audit_account.setFixedWidth(100)
+        self.audit_account.returnPressed.connect(self.search_audit)
+        self.audit_period = QComboBox()
+        for label, hours in self.AUDIT_PERIODS:
+            self.audit_period.addItem(label, hours)
+        search_btn = QPushButton("Search")
+        search_btn.clicked.connect(self.search_audit)
+
+        filters.addWidget(self.audit_text, 1)
+        filters.addWidget(self.audit_event)
+        filters.addWidget(self.audit_account)
+        filters.addWidget(self.audit_period)
+        filters.addWidget(search_btn)
+        page.addLayout(filters)
 
         self.audit = QTableWidget(0, 5)
         self.audit.setHorizontalHeaderLabels(
             ["Time", "Account ID", "Event", "Amount", "Details"]
         )
         self.audit.horizontalHeader().setStretchLastSection(True)
-        root.addWidget(self.audit)
+        page.addWidget(self.audit)
+
+        pager = QHBoxLayout()
+        self.audit_newer = QPushButton("◀ Newer")
+        self.audit_newer.clicked.connect(lambda: self.audit_page(-1))
+        self.audit_older = QPushButton("Older ▶")
+        self.audit_older.clicked.connect(lambda: self.audit_page(1))
+        self.audit_status = QLabel("")
+        self.audit_status.setStyleSheet("color:#777;")
+        pager.addWidget(self.audit_newer)
+        pager.addWidget(self.audit_older)
+        pager.addStretch()
+        pager.addWidget(self.audit_status)
+        page.addLayout(pager)
+
+        # `before` id of every page shown so far; last is the current one
+        self._audit_pages = [None]
+        self._audit_next = None
+
+        # ================= GUI Stalls =================
+        page.addWidget(QLabel("GUI Stalls"))
+
+        # Set by MainWindow once the watchdog is running
+        self.watchdog = None
+
+        bucket_labels = [f"≤{b:g}s" for b in STALL_BUCKETS]
+        self.stalls = QTableWidget(0, len(bucket_labels) + 3)
+        self.stalls.setHorizontalHeaderLabels(
+            ["Screen"] + bucket_labels + [f">{STALL_BUCKETS[-1]:g}s", "Total"]
+        )
+        self.stalls.horizontalHeader().setStretchLastSection(True)
+        page.addWidget(self.stalls)
+
+        self.recent_stalls = QTableWidget(0, 4)
+        self.recent_stalls.setHorizontalHeaderLabels(
+            ["Time", "Screen", "Seconds", "Where"]
+        )
+        self.recent_stalls.horizontalHeader().setStretchLastSection(True)
+        page.addWidget(self.recent_stalls)
+
+        # ================= Reports =================
+        self.reports_page = QWidget()
+        grid = QGridLayout(self.reports_page)
+        grid.setSpacing(12)
+        self.tabs.addTab(self.reports_page, "Reports")
+
+        self.report_status = QLabel("")
+        self.report_status.setStyleSheet("color:#777;")
+        grid.addWidget(self.report_status, 0, 0, 1, 2)
+
+        self.report_types = self._report_table(
+            grid, 1, 0, "Totals by Type", ["Type", "Count", "Total", "Share"]
+        )
+        self.report_hours = self._report_table(
+            grid, 1, 1, "By Hour of Day (UTC)", ["Hour", "Count", "Total", "Share"]
+        )
+        self.report_days = self._report_table(
+            grid, 3, 0, f"Last {reports.cache.days} Days",
+            ["Day", "Count", "Total", "vs Prev Day", "Running"]
+        )
+        self.report_logins = self._report_table(
+            grid, 3, 1, "Logins",
+            ["Day", "Success", "Failed", "Fail %", "7-Day Fail %"]
+        )
+        self.report_top = self._report_table(
+            grid, 5, 0, f"Top {reports.cache.top} Accounts by Volume",
+            ["Rank", "Account ID", "Card Number", "Count", "Total", "Share"],
+            span=2
+        )
+
+        self.tabs.currentChanged.connect(self._on_tab)
 
         self.refresh_all()
 
@@ -95,12 +214,15 @@ class AdminScreen(QWidget):
     def refresh_all(self):
         self.load_accounts()
         self.load_audit()
+        self.load_stalls()
+        if self.tabs.currentWidget() is self.reports_page:
+            self.load_reports()
 
     def load_accounts(self):
         self.accounts.setRowCount(0)
         with get_conn() as con:
             cur = con.cursor()
-            cur.execute("SELECT id, card_number, balance FROM accounts")
+            cur.execute("SELECT id, card_number, balance, currency FROM accounts")
             for row in cur.fetchall():
                 r = self.accounts.rowCount()
                 self.accounts.insertRow(r)
@@ -108,20 +230,154 @@ class AdminScreen(QWidget):
                     self.accounts.setItem(r, c, QTableWidgetItem(str(val)))
 
     def load_audit(self):
+        selected = self.audit_event.currentData()
+        self.audit_event.clear()
+        self.audit_event.addItem("All events", None)
+        for event_type in audit_search.event_types():
+            self.audit_event.addItem(event_type, event_type)
+        index = self.audit_event.findData(selected)
+        self.audit_event.setCurrentIndex(max(index, 0))
+        self.search_audit()
+
+    def search_audit(self):
+        """New search: back to the newest page."""
+        self._audit_pages = [None]
+        self._load_audit_page()
+
+    def audit_page(self, step):
+        if step > 0 and self._audit_next is not None:
+            self._audit_pages.append(self._audit_next)
+        elif step < 0 and len(self._audit_pages) > 1:
+            self._audit_pages.pop()
+        else:
+            return
+        self._load_audit_page()
+
+    def _load_audit_page(self):
+        account_txt = self.audit_account.text().strip()
+        if account_txt and not account_txt.isdigit():
+            self.audit_status.setText("Account ID must be a number.")
+            return
+
+        since = None
+        hours = self.audit_period.currentData()
+        if hours:
+            # audit_log.ts is CURRENT_TIMESTAMP, i.e. UTC
+            since = (
+                datetime.datetime.utcnow() - datetime.timedelta(hours=hours)
+            ).strftime("%Y-%m-%d %H:%M:%S")
+
+        try:
+            page = audit_search.search(
+                self.audit_text.text(),
+                event_type=self.audit_event.currentData(),
+                account_id=int(account_txt) if account_txt else None,
+                since=since,
+                before=self._audit_pages[-1]
+            )
+        except sqlite3.Error as e:
+            self.audit_status.setText(f"Search failed: {e}")
+            return
+
         self.audit.setRowCount(0)
-        with get_conn() as con:
-            cur = con.cursor()
-            cur.execute("""
-                SELECT ts, account_id, event_type, amount, details
-                FROM audit_log
-                ORDER BY ts DESC
-                LIMIT 200
-            """)
-            for row in cur.fetchall():
-                r = self.audit.rowCount()
-                self.audit.insertRow(r)
-                for c, val in enumerate(row):
-                    self.audit.setItem(r, c, QTableWidgetItem(str(val)))
+        for row in page["rows"]:
+            r = self.audit.rowCount()
+            self.audit.insertRow(r)
+            for c, val in enumerate(row[1:5]):
+                self.audit.setItem(r, c, QTableWidgetItem(str(val)))
+            details = QLabel(audit_search.highlight(row[5]))
+            details.setTextFormat(Qt.RichText)
+            self.audit.setCellWidget(r, 4, details)
+
+        self._audit_next = page["next_before"]
+        self.audit_newer.setEnabled(len(self._audit_pages) > 1)
+        self.audit_older.setEnabled(self._audit_next is not None)
+        self.audit_status.setText(
+            f"Page {len(self._audit_pages)} · {len(page['rows'])} rows · "
+            f"{page['seconds'] * 1000:.1f} ms"
+        )
+
+    def load_stalls(self):
+        self.stalls.setRowCount(0)
+        self.recent_stalls.setRowCount(0)
+        if self.watchdog is None:
+            return
+
+        for screen, hist in sorted(self.watchdog.histograms.items()):
+            r = self.stalls.rowCount()
+            self.stalls.insertRow(r)
+            for c, val in enumerate([screen] + list(hist.counts) + [hist.count]):
+                self.stalls.setItem(r, c, QTableWidgetItem(str(val)))
+
+        for stall in reversed(self.watchdog.recent):
+            r = self.recent_stalls.rowCount()
+            self.recent_stalls.insertRow(r)
+            row = (stall["ts"], stall["screen"], stall["seconds"], stall["where"])
+            for c, val in enumerate(row):
+                self.recent_stalls.setItem(r, c, QTableWidgetItem(str(val)))
+
+    # ====================================================
+    # Reports
+    # ====================================================
+    def _report_table(self, grid, row, col, title, headers, span=1):
+        grid.addWidget(QLabel(title), row, col, 1, span)
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setStretchLastSection(True)
+        grid.addWidget(table, row + 1, col, 1, span)
+        return table
+
+    def _on_tab(self, index):
+        # built on first open, cheap to reopen: only new rows are folded
+        if self.tabs.widget(index) is self.reports_page:
+            self.load_reports()
+
+    def load_reports(self):
+        try:
+            report = reports.cache.report()
+        except (sqlite3.Error, fx.FxError) as e:
+            self.report_status.setText(f"Reports unavailable: {e}")
+            return
+
+        money = lambda v: "—" if v is None else fx.format_amount(v, fx.BASE_CURRENCY)
+        pct = lambda v: "—" if v is None else f"{v:.1f}%"
+
+        self._fill(self.report_types, [
+            (kind, n, money(total), pct(share))
+            for kind, n, total, share in report["by_type"]
+        ])
+        self._fill(self.report_hours, [
+            (f"{hod:02d}:00", n, money(total), pct(share))
+            for hod, n, total, share in report["by_hour"]
+        ])
+        self._fill(self.report_days, [
+            (day, n, money(total), money(change), money(running))
+            for day, n, total, change, running in report["by_day"]
+        ])
+        self._fill(self.report_logins, [
+            (day, ok, fail, pct(rate), pct(week))
+            for day, ok, fail, rate, week in report["logins"]
+        ])
+        self._fill(self.report_top, [
+            (rank, account_id, card or "(deleted)", n, money(total), pct(share))
+            for rank, account_id, card, n, total, share in report["top_accounts"]
+        ])
+
+        ok, fail = report["login_totals"]
+        ratio = f"{ok * 100 / (ok + fail):.1f}%" if ok + fail else "—"
+        self.report_status.setText(
+            f"Logins: {ok} ok / {fail} failed ({ratio} success) · "
+            f"up to tx #{report['tx_id']}, audit #{report['audit_id']} · "
+            f"{'cached' if report['cached'] else 'refreshed'} in "
+            f"{report['seconds'] * 1000:.1f} ms · amounts in {fx.BASE_CURRENCY} "
+            f"at current rates"
+        )
+
+    def _fill(self, table, rows):
+        table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, val in enumerate(row):
+                table.setItem(r, c, QTableWidgetItem(str(val)))
 
     # ====================================================
     # Create Account (FIXED – NO DB LOCK)
@@ -135,6 +391,13 @@ class AdminScreen(QWidget):
             QMessageBox.warning(self, "Missing fields", "Fill all fields.")
             return
 
+        # Whatever the login keypad can't type could never log in
+        if not (pin.isascii() and pin.isdigit()) or not PIN_MIN <= len(pin) <= PIN_MAX:
+            QMessageBox.warning(
+                self, "Invalid PIN", f"PIN must be {PIN_MIN}-{PIN_MAX} digits."
+            )
+            return
+
         try:
             balance = float(bal_txt)
             if balance < 0:
@@ -152,11 +415,12 @@ class AdminScreen(QWidget):
                 cur = con.cursor()
 
                 cur.execute("""
-                    INSERT INTO accounts (card_number, pin_hash, balance)
-                    VALUES (?, ?, ?)
-                """, (card, pin_hash_hex, balance))
+                    INSERT INTO accounts (card_number, pin_hash, balance, currency)
+                    VALUES (?, ?, ?, ?)
+                """, (card, pin_hash_hex, balance, self.in_currency.currentText()))
 
                 account_id = cur.lastrowid
+                ledger.open_account(account_id, balance, conn=con)
 
                 # 🔑 IMPORTANT: reuse same connection
                 log_event(
@@ -196,8 +460,8 @@ class AdminScreen(QWidget):
 
         try:
             with get_conn() as con:
-                cur = con.cursor()
-                cur.execute("DELETE FROM transactions")
+                ledger.reset_history(con)
+                reconcile.clear_checkpoints(con)
 
                 # 🔑 IMPORTANT: reuse same connection
                 log_event(
@@ -1,19 +1,19 @@
 # screens/auth.py
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QPushButton,
-    QMessageBox, QInputDialog, QLineEdit
+    QWidget, QVBoxLayout, QLabel, QPushButton, QMessageBox
 )
 from PyQt5.QtCore import Qt
 import traceback
 
-from database.db import get_conn, log_event
-from security import verify_pin
+from database.backend import backend
+from widgets.keypad import KeypadField, Keypad
 
 
 class AuthScreen(QWidget):
     def __init__(self, next_callback, back_callback):
         super().__init__()
         self.next_callback = next_callback
+        self.card_number = None
 
         layout = QVBoxLayout()
         layout.setAlignment(Qt.AlignCenter)
@@ -22,40 +22,54 @@ class AuthScreen(QWidget):
         label.setStyleSheet("font-size: 26px; font-weight: bold; color: #0d6efd;")
         layout.addWidget(label, alignment=Qt.AlignCenter)
 
-        card_btn = QPushButton("Login via Card")
-        card_btn.clicked.connect(self.login_card)
-        layout.addWidget(card_btn, alignment=Qt.AlignCenter)
+        self.prompt = QLabel("")
+        self.prompt.setStyleSheet("font-size: 18px; color: #555;")
+        layout.addWidget(self.prompt, alignment=Qt.AlignCenter)
+
+        # ---------- Keypad (built once, reused every login) ----------
+        self.field = KeypadField("card", "Card Number")
+        layout.addWidget(self.field, alignment=Qt.AlignCenter)
+
+        self.keypad = Keypad()
+        self.keypad.setFixedWidth(320)
+        self.keypad.bind(self.field)
+        self.keypad.entered.connect(self.login_card)
+        layout.addWidget(self.keypad, alignment=Qt.AlignCenter)
 
         back_btn = QPushButton("Back")
         back_btn.clicked.connect(back_callback)
         layout.addWidget(back_btn, alignment=Qt.AlignCenter)
 
         self.setLayout(layout)
+        self.reset()
+
+    # -------------------------------------------------
+    # RESET (session boundary)
+    # -------------------------------------------------
+    def reset(self):
+        self.card_number = None
+        self.prompt.setText("Enter your card number")
+        self.field.set_mode("card", "Card Number")
+        self.keypad.attach(self.field)
+
+    def ask_pin(self, card_number):
+        """Card number known (typed, or read by a device): ask for the PIN."""
+        self.card_number = card_number
+        self.prompt.setText("Enter your PIN")
+        self.field.set_mode("pin", "PIN")
+        self.keypad.attach(self.field)
+
+    def card_error(self, message):
+        """Reader trouble: say so in place, without a modal."""
+        self.reset()
+        self.prompt.setText(f"{message}. Or enter your card number")
 
     # -------------------------------------------------
     # Authentication (PBKDF2 – CORRECT)
     # -------------------------------------------------
     def authenticate_user(self, card_number, pin):
         try:
-            with get_conn() as con:
-                cur = con.cursor()
-                cur.execute("""
-                    SELECT id, balance, pin_hash
-                    FROM accounts
-                    WHERE card_number = ?
-                """, (card_number,))
-                row = cur.fetchone()
-
-                if not row:
-                    return None
-
-                account_id, balance, stored_hash_hex = row
-
-                # ✅ Correct verification
-                if verify_pin(pin, stored_hash_hex):
-                    return account_id, balance
-
-                return None
+            return backend.authenticate(card_number, pin)
 
         except Exception:
             print("\n[ERROR IN authenticate_user]\n")
@@ -63,31 +77,30 @@ class AuthScreen(QWidget):
             return None
 
     # -------------------------------------------------
-    # Card login
+    # Card login: OK on the keypad, card number then PIN
     # -------------------------------------------------
     def login_card(self):
         try:
-            card_number, ok = QInputDialog.getText(
-                self, "Card Login", "Enter Card Number:"
-            )
-            if not ok or not card_number.strip():
+            value = self.field.value()
+            if not value:
                 return
 
-            pin, ok = QInputDialog.getText(
-                self, "PIN Login", "Enter PIN:", QLineEdit.Password
-            )
-            if not ok or not pin.strip():
+            if self.card_number is None:
+                self.ask_pin(value)
                 return
 
-            user = self.authenticate_user(card_number.strip(), pin.strip())
+            card_number = self.card_number
+            user = self.authenticate_user(card_number, value)
+
+            # Neither the PIN nor the card stays on screen
+            self.reset()
 
             if user:
                 account_id, balance = user
-                log_event(account_id, "LOGIN_SUCCESS", details="Card login")
-                QMessageBox.information(self, "Success", "Login successful!")
+                backend.audit(account_id, "LOGIN_SUCCESS", details="Card login")
                 self.next_callback(account_id, balance)
             else:
-                log_event(None, "LOGIN_FAIL", details=f"Card {card_number}")
+                backend.audit(None, "LOGIN_FAIL", details=f"Card {card_number}")
                 QMessageBox.warning(self, "Error", "Invalid card number or PIN.")
 
         except Exception:
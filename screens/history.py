@@ -5,7 +5,9 @@ from PyQt5.QtWidgets import (
     QMessageBox
 )
 from PyQt5.QtCore import Qt, QTimer
-from database.db import get_conn
+from database.ledger import masked_card
+from database.prefetch import prefetcher
+import tracing
 import sqlite3
 
 
@@ -34,10 +36,8 @@ class TransactionHistoryScreen(QWidget):
         self.root.addWidget(self.title)
 
         # ---------- Table ----------
-        self.table = QTableWidget(0, 3)
-        self.table.setHorizontalHeaderLabels([
-            "Transaction Type", "Amount (₱)", "Record ID"
-        ])
+        self.table = QTableWidget(0, 5)
+        self._set_headers(None)
         self.table.setEditTriggers(QTableWidget.NoEditTriggers)
         self.table.setSelectionBehavior(QTableWidget.SelectRows)
         self.table.setAlternatingRowColors(True)
@@ -100,36 +100,58 @@ class TransactionHistoryScreen(QWidget):
         self.reset()
         self.account_id = account_id
 
+        # Prefetched on the menu: render straight from cache
+        rows = prefetcher.history(account_id, block=False)
+        if rows is not None:
+            self._render(rows)
+            return
+
         # Defer DB load until visible
         QTimer.singleShot(0, self.load_data)
 
     def load_data(self):
         try:
-            with get_conn() as con:
-                cur = con.cursor()
-                cur.execute("""
-                    SELECT type, amount, id
-                    FROM transactions
-                    WHERE account_id = ?
-                    ORDER BY id DESC
-                    LIMIT 20
-                """, (self.account_id,))
-                rows = cur.fetchall()
-
-            for row in rows:
-                r = self.table.rowCount()
-                self.table.insertRow(r)
-                self.table.setItem(r, 0, QTableWidgetItem(str(row[0])))
-                self.table.setItem(r, 1, QTableWidgetItem(f"{float(row[1]):,.2f}"))
-                self.table.setItem(r, 2, QTableWidgetItem(str(row[2])))
-
-            self.table.resizeColumnsToContents()
-            self.update()
-            self.repaint()
-
-        except sqlite3.Error as e:
+            with tracing.span("db.history"):
+                rows = prefetcher.history(self.account_id)
+
+            self._render(rows)
+
+        except (sqlite3.Error, OSError) as e:
             QMessageBox.critical(
                 self,
                 "Database Error",
                 f"Failed to load transaction history:\n{e}"
             )
+
+    def _set_headers(self, currency):
+        unit = f" ({currency})" if currency else ""
+        self.table.setHorizontalHeaderLabels([
+            "Transaction Type", f"Amount{unit}", f"Balance{unit}",
+            "Counterparty", "Record ID"
+        ])
+
+    def _render(self, rows):
+        # Legs are in the account's currency; the menu prefetched the account
+        account = prefetcher.account(self.account_id, block=False)
+        self._set_headers(account[3] if account else None)
+
+        for tx_type, amount, balance, counterparty, tx_id in rows:
+            r = self.table.rowCount()
+            self.table.insertRow(r)
+            self.table.setItem(r, 0, QTableWidgetItem(str(tx_type)))
+            self.table.setItem(r, 1, QTableWidgetItem(f"{float(amount):+,.2f}"))
+            self.table.setItem(r, 2, QTableWidgetItem(
+                f"{float(balance):,.2f}" if balance is not None else "—"
+            ))
+            if tx_type == "TRANSFER" and counterparty:
+                # legs written before counterparties were stored masked
+                counterparty = masked_card(counterparty)
+            self.table.setItem(r, 3, QTableWidgetItem(counterparty or ""))
+            self.table.setItem(r, 4, QTableWidgetItem(
+                str(tx_id) if tx_id is not None else ""
+            ))
+
+        self.table.resizeColumnsToContents()
+        self.update()
+        self.repaint()
+        tracing.data_ready(self)
@@ -3,7 +3,9 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton,
     QSizePolicy, QApplication
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QEvent
+
+from database.prefetch import prefetcher
 
 
 def scale(px: int) -> int:
@@ -20,6 +22,7 @@ class MenuScreen(QWidget):
         self.account_id = None
         self.balance = None
         self.next_callback = next_callback
+        self.prefetch_buttons = {}
 
         root = QVBoxLayout(self)
         root.setContentsMargins(40, 30, 40, 30)
@@ -104,6 +107,11 @@ class MenuScreen(QWidget):
         btn.clicked.connect(lambda _, opt=option: self.open_option(opt))
         layout.addWidget(btn)
 
+        if option in ("info", "statement"):
+            self.prefetch_buttons[btn] = option
+            btn.installEventFilter(self)
+            btn.pressed.connect(lambda opt=option: self.prefetch(opt))
+
     # -------------------------------------------------
     # Called after login
     # -------------------------------------------------
@@ -111,6 +119,24 @@ class MenuScreen(QWidget):
         self.account_id = account_id
         self.balance = balance
 
+        # The next tap is almost always info or history
+        self.prefetch("info")
+        self.prefetch("statement")
+
+    # -------------------------------------------------
+    # Prefetch on hover / press
+    # -------------------------------------------------
+    def prefetch(self, option):
+        if option == "info":
+            prefetcher.prefetch_account(self.account_id)
+        elif option == "statement":
+            prefetcher.prefetch_history(self.account_id)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Enter and obj in self.prefetch_buttons:
+            self.prefetch(self.prefetch_buttons[obj])
+        return super().eventFilter(obj, event)
+
     # -------------------------------------------------
     # Route to MainWindow
     # -------------------------------------------------
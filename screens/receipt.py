@@ -5,6 +5,9 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 
+from database import fx
+from database.intents import conversion_text
+
 
 class ReceiptScreen(QWidget):
     def __init__(self, next_callback):
@@ -44,6 +47,13 @@ class ReceiptScreen(QWidget):
         )
         self.root.addWidget(self.amount_label)
 
+        self.fx_label = QLabel("")
+        self.fx_label.setAlignment(Qt.AlignCenter)
+        self.fx_label.setStyleSheet(
+            "font-size:16px;color:#777;"
+        )
+        self.root.addWidget(self.fx_label)
+
         self.recipient_label = QLabel("")
         self.recipient_label.setAlignment(Qt.AlignCenter)
         self.recipient_label.setStyleSheet(
@@ -98,6 +108,8 @@ class ReceiptScreen(QWidget):
 
         self.type_label.setText("")
         self.amount_label.setText("")
+        self.fx_label.setText("")
+        self.fx_label.hide()
         self.recipient_label.setText("")
         self.balance_label.setText("")
         self.time_label.setText("")
@@ -113,17 +125,29 @@ class ReceiptScreen(QWidget):
         self.reset()
 
         self.type_label.setText(f"Transaction Type: {data['type']}")
-        self.amount_label.setText(f"Amount: ₱{data['amount']:.2f}")
+        currency = data.get("currency", fx.BASE_CURRENCY)
+        self.amount_label.setText(
+            f"Amount: {fx.format_amount(data['amount'], currency)}"
+        )
+
+        if data.get("converted"):
+            self.fx_label.setText(conversion_text(data))
+            self.fx_label.show()
 
         recipient = data.get("recipient")
         if recipient:
             self.recipient_label.setText(f"Recipient: {recipient}")
             self.recipient_label.show()
+        elif data.get("notes"):
+            self.recipient_label.setText(f"Notes: {data['notes']}")
+            self.recipient_label.show()
         else:
             self.recipient_label.hide()
 
+        account_currency = data.get("account_currency", currency)
         self.balance_label.setText(
-            f"Balance: ₱{data['old_balance']:.2f} → ₱{data['new_balance']:.2f}"
+            f"Balance: {fx.format_amount(data['old_balance'], account_currency)} → "
+            f"{fx.format_amount(data['new_balance'], account_currency)}"
         )
 
         self.time_label.setText(f"Timestamp: {data['timestamp']}")
@@ -1,16 +1,37 @@
 # screens/transaction.py
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel,
-    QLineEdit, QPushButton, QMessageBox
+    QPushButton, QMessageBox, QComboBox
 )
 from PyQt5.QtCore import Qt
-from datetime import datetime
+import time
 import traceback
+import uuid
 
-from database.db import get_conn, log_event
+import metrics
+
+from database import fx, intents
+from database.backend import backend
+from database.db import DatabaseBusy
+from database.ledger import PostingError
+from database.prefetch import prefetcher
+from devices.cash_acceptor import notes_text
+from widgets.keypad import KeypadField, Keypad
+
+CASH_UPDATE_TIMER = metrics.histogram(
+    "kiosk_cash_update_seconds", "Note stacked to running count on screen",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5)
+)
 
 
 class TransactionScreen(QWidget):
+    # label -> interval in days (None = pay once)
+    REPEAT_OPTIONS = (
+        ("One-time payment", None),
+        ("Repeat every week", 7),
+        ("Repeat every month", 30),
+    )
+
     def __init__(self, next_callback, cancel_callback):
         super().__init__()
         self.next_callback = next_callback
@@ -26,15 +47,44 @@ class TransactionScreen(QWidget):
         )
         self.layout.addWidget(self.title, alignment=Qt.AlignCenter)
 
-        self.account_input = QLineEdit()
+        self.account_input = KeypadField("card")
         self.account_input.setFixedWidth(300)
         self.layout.addWidget(self.account_input, alignment=Qt.AlignCenter)
 
-        self.amount_input = QLineEdit()
-        self.amount_input.setPlaceholderText("Amount (₱)")
+        self.amount_input = KeypadField("amount", "Amount")
         self.amount_input.setFixedWidth(300)
         self.layout.addWidget(self.amount_input, alignment=Qt.AlignCenter)
 
+        self.repeat_input = QComboBox()
+        self.repeat_input.setFixedWidth(300)
+        for label, days in self.REPEAT_OPTIONS:
+            self.repeat_input.addItem(label, days)
+        self.repeat_input.hide()
+        self.layout.addWidget(self.repeat_input, alignment=Qt.AlignCenter)
+
+        # ---------- Cash count (deposits through the acceptor) ----------
+        self.cash_label = QLabel("")
+        self.cash_label.setAlignment(Qt.AlignCenter)
+        self.cash_label.setStyleSheet("font-size:24px;font-weight:bold;")
+        self.cash_label.hide()
+        self.layout.addWidget(self.cash_label, alignment=Qt.AlignCenter)
+
+        self.cash_status = QLabel("")
+        self.cash_status.setStyleSheet("font-size:16px;color:#b02a37;")
+        self.cash_status.hide()
+        self.layout.addWidget(self.cash_status, alignment=Qt.AlignCenter)
+
+        self.limit_label = QLabel("")
+        self.limit_label.setStyleSheet("font-size:14px;color:#777;")
+        self.layout.addWidget(self.limit_label, alignment=Qt.AlignCenter)
+
+        # ---------- Keypad (OK moves recipient → amount → confirm) ----------
+        self.keypad = Keypad()
+        self.keypad.setFixedWidth(320)
+        self.keypad.bind(self.amount_input, self.account_input)
+        self.keypad.entered.connect(self.enter)
+        self.layout.addWidget(self.keypad, alignment=Qt.AlignCenter)
+
         # ---------- Action Buttons ----------
         self.confirm_btn = QPushButton("")
         self.confirm_btn.setFixedSize(260, 60)
@@ -50,21 +100,56 @@ class TransactionScreen(QWidget):
         self.option = None
         self.account_id = None
         self.balance = None
+        self.request_key = None
+        self.in_flight = False
+
+        # ---------- Cash acceptor (set by MainWindow, optional) ----------
+        self.acceptor = None
+        self.cash_open = False
+        self.cash_closing = None    # ("post" | "drop", account_id) until settled
+        self.cash = None
+
+    def set_acceptor(self, acceptor):
+        """Deposits count notes through `acceptor` instead of typed amounts."""
+        self.acceptor = acceptor
+        acceptor.counted.connect(self._on_counted)
+        acceptor.returned.connect(self._on_returned)
+        acceptor.jammed.connect(self._on_jammed)
+        acceptor.cleared.connect(self._on_cleared)
+        acceptor.settled.connect(self._on_settled)
 
     # -------------------------------------------------
     # RESET (ABSOLUTELY REQUIRED FOR KIOSK REUSE)
     # -------------------------------------------------
     def reset(self):
+        # cash first: it still needs the account
+        self._drop_cash()
+
         # state
         self.option = None
         self.account_id = None
         self.balance = None
+        self.request_key = None
+        self.in_flight = False
 
         # UI reset
         self.setGraphicsEffect(None)     # 🔥 critical
         self.title.setText("")
-        self.account_input.clear()
-        self.amount_input.clear()
+        self.account_input.reset()
+        self.amount_input.reset()
+        self.amount_input.set_placeholder("Amount")
+        self.amount_input.set_prefix("")
+        self.keypad.attach(self.amount_input)
+        self.keypad.setFixedWidth(320)
+        self.amount_input.show()
+        self.keypad.show()
+        self.cash_label.setText("")
+        self.cash_label.hide()
+        self.cash_status.setText("")
+        self.cash_status.hide()
+        self.limit_label.setText("")
+        self.repeat_input.setCurrentIndex(0)
+        self.repeat_input.hide()
 
         self.account_input.show()        # 🔥 undo previous hide()
         self.confirm_btn.setText("")
@@ -80,34 +165,180 @@ class TransactionScreen(QWidget):
         self.account_id = account_id
         self.balance = balance
 
+        # Identity of this submission: retries and double taps reuse it
+        self.request_key = uuid.uuid4().hex
+
         if option == "transfer":
             self.title.setText("Transfer Funds")
-            self.account_input.setPlaceholderText("Recipient Card Number")
+            self.account_input.set_mode("card", "Recipient Card Number")
             self.account_input.show()
+            self.keypad.attach(self.account_input)
             self.confirm_btn.setText("Confirm Transfer")
 
         elif option == "bill":
             self.title.setText("Pay Bills")
-            self.account_input.setPlaceholderText("Bill Reference / Account No.")
+            self.account_input.set_mode("text", "Bill Reference / Account No.")
             self.account_input.show()
+            self.keypad.setFixedWidth(460)      # room for the letter panel
+            self.keypad.attach(self.account_input)
+            self.repeat_input.show()
             self.confirm_btn.setText("Pay Bill")
 
         elif option == "deposit":
             self.title.setText("Cash Deposit")
             self.account_input.hide()
             self.confirm_btn.setText("Deposit Cash")
+            if self.acceptor is not None:
+                self.amount_input.hide()
+                self.keypad.hide()
+                self._open_cash()
 
         else:
             QMessageBox.warning(self, "Error", "Invalid transaction option.")
+            return
+
+        currency = self._entry_currency()
+        self.amount_input.set_placeholder(f"Amount ({currency})")
+        self.amount_input.set_prefix(fx.SYMBOLS.get(currency, ""))
+        self._show_limit()
+
+    def _entry_currency(self):
+        """Deposits are counted in kiosk cash, the rest in the account's currency."""
+        if self.option == "deposit":
+            return fx.CASH_CURRENCY
+        try:
+            row = prefetcher.account(self.account_id)
+            return row[3] if row else fx.BASE_CURRENCY
+        except Exception:
+            traceback.print_exc()
+            return fx.BASE_CURRENCY
+
+    def _show_limit(self):
+        try:
+            remaining = backend.remaining_limit(self.account_id, self.option)
+            self.limit_label.setText(
+                f"Remaining today: {fx.format_amount(remaining, fx.BASE_CURRENCY)}"
+            )
+        except Exception:
+            traceback.print_exc()
+            self.limit_label.setText("")
+
+    # -------------------------------------------------
+    # Cash acceptor session
+    # -------------------------------------------------
+    def _open_cash(self):
+        cap = None
+        try:
+            remaining = backend.remaining_limit(self.account_id, "deposit")
+            cap = fx.rates.current().convert(
+                remaining, fx.BASE_CURRENCY, fx.CASH_CURRENCY
+            )
+        except Exception:
+            traceback.print_exc()
+
+        self.cash = None
+        self.cash_open = True
+        self.acceptor.begin(cap)
+        self.cash_label.setText("Insert notes one at a time")
+        self.cash_label.show()
+
+    def _close_cash(self):
+        """Stop counting; _on_settled posts the final count."""
+        self.cash_open = False
+        self.cash_closing = ("post", self.account_id)
+        self.confirm_btn.setEnabled(False)
+        self.cash_label.setText("Finishing count...")
+        self.acceptor.end()
+
+    def _drop_cash(self):
+        """Session ending with counted cash that was never credited."""
+        if self.cash_open or self.cash_closing:
+            # audited by _on_settled once escrow is empty
+            self.cash_closing = ("drop", self.account_id)
+            if self.cash_open:
+                self.cash_open = False
+                self.acceptor.end()
+        else:
+            self._uncredited(self.account_id, self.cash)
+        self.cash = None
+
+    def _uncredited(self, account_id, cash):
+        if cash and cash["total"]:
+            try:
+                backend.audit(
+                    account_id, "CASH_UNCREDITED", cash["total"], notes_text(cash["notes"])
+                )
+            except Exception:
+                traceback.print_exc()
+
+    def _on_settled(self, snap):
+        if self.cash_closing is None:
+            return
+        action, account_id = self.cash_closing
+        self.cash_closing = None
+        if action == "drop":
+            self._uncredited(account_id, snap)
+            return
+
+        self.cash = snap
+        self._show_count(snap)
+        if not snap["total"]:
+            QMessageBox.warning(self, "Error", "Please insert your notes first.")
+            self.confirm_btn.setEnabled(True)
+            self._open_cash()
+            return
+        self._submit(snap["total"])
+
+    def _on_counted(self, snap):
+        if not self.cash_open:
+            return
+        self._show_count(snap)
+        if snap["at"] is not None:
+            CASH_UPDATE_TIMER.observe(time.monotonic() - snap["at"])
+
+    def _show_count(self, snap):
+        self.cash_label.setText(
+            f"Counted: {fx.format_amount(snap['total'], fx.CASH_CURRENCY)}\n"
+            f"{notes_text(snap['notes'])}"
+        )
+        self.cash_status.hide()
+        self.cash_label.repaint()
+
+    def _on_returned(self, denom, reason):
+        if not self.cash_open:
+            return
+        if denom:
+            text = f"{fx.format_amount(denom, fx.CASH_CURRENCY)} note returned"
+        else:
+            text = f"Note returned ({reason})"
+        self.cash_status.setText(text)
+        self.cash_status.show()
+
+    def _on_jammed(self, where):
+        if not self.cash_open:
+            return
+        self.cash_status.setText("Note jammed. Counted cash is safe; please wait.")
+        self.cash_status.show()
+        try:
+            backend.audit(self.account_id, "CASH_JAM", details=where)
+        except Exception:
+            traceback.print_exc()
+
+    def _on_cleared(self):
+        if self.cash_open:
+            self.cash_status.hide()
 
     # -------------------------------------------------
     # Cancel → back to menu
     # -------------------------------------------------
     def cancel(self):
+        text = "Are you sure you want to cancel this transaction?"
+        if self.cash_open and self.acceptor.snapshot()["total"]:
+            text += "\nNotes already counted will be refunded by staff."
         reply = QMessageBox.question(
             self,
             "Cancel Transaction",
-            "Are you sure you want to cancel this transaction?",
+            text,
             QMessageBox.Yes | QMessageBox.No
         )
 
@@ -115,149 +346,169 @@ class TransactionScreen(QWidget):
             self.reset()
             self.cancel_callback()
 
+    # -------------------------------------------------
+    # Keypad OK
+    # -------------------------------------------------
+    def enter(self):
+        if self.keypad.field is self.account_input and self.account_input.value():
+            self.keypad.attach(self.amount_input)
+        else:
+            self.process()
+
     # -------------------------------------------------
     # Dispatcher
     # -------------------------------------------------
     def process(self):
-        try:
-            amount = float(self.amount_input.text().strip())
-            if amount <= 0:
-                raise ValueError
-        except ValueError:
-            QMessageBox.warning(self, "Error", "Invalid amount.")
+        if self.in_flight:
             return
 
+        if self.option == "deposit" and self.acceptor is not None:
+            if self.cash_open:
+                self._close_cash()
+                return
+            # settling, or a count whose posting failed
+            if self.cash_closing or not self.cash:
+                return
+            amount = self.cash["total"]
+        else:
+            amount = self.amount_input.amount()
+            if amount is None:
+                QMessageBox.warning(self, "Error", "Invalid amount.")
+                return
+        self._submit(amount)
+
+    def _submit(self, amount):
+        # Stays disabled after a successful posting; taps queued
+        # during the commit are dropped by Qt
+        self.in_flight = True
+        self.confirm_btn.setEnabled(False)
+        done = False
+
         try:
             if self.option == "transfer":
-                self._process_transfer(amount)
+                done = self._process_transfer(amount)
             elif self.option == "bill":
-                self._process_bill(amount)
+                done = self._process_bill(amount)
             elif self.option == "deposit":
-                self._process_deposit(amount)
+                done = self._process_deposit(amount)
             else:
                 QMessageBox.warning(self, "Error", "Unsupported transaction.")
+        except PostingError as e:
+            QMessageBox.warning(self, "Error", str(e))
+        except DatabaseBusy:
+            # raised only before the posting committed (see _post); the
+            # same request key makes a retry safe
+            QMessageBox.warning(
+                self, "Busy", "The kiosk is busy right now. Please try again."
+            )
         except Exception:
             traceback.print_exc()
+            metrics.counter(
+                "kiosk_posting_failures_total", "Postings that raised", kind=str(self.option)
+            ).inc()
             QMessageBox.critical(self, "Error", "Transaction failed.")
+        finally:
+            self.in_flight = False
+            if not done:
+                self.confirm_btn.setEnabled(True)
 
     # -------------------------------------------------
     # Transfer
     # -------------------------------------------------
+    @metrics.timed("kiosk_posting_seconds", "Posting latency", kind="transfer")
     def _process_transfer(self, amount):
-        recipient = self.account_input.text().strip()
+        recipient = self.account_input.value()
         if not recipient:
             QMessageBox.warning(self, "Error", "Recipient is required.")
             return
 
-        with get_conn() as con:
-            cur = con.cursor()
-            cur.execute("SELECT balance FROM accounts WHERE id=?", (self.account_id,))
-            old_balance = cur.fetchone()[0]
-
-            if amount > old_balance:
-                QMessageBox.warning(self, "Error", "Insufficient balance.")
-                return
-
-            cur.execute(
-                "SELECT id, balance FROM accounts WHERE card_number=?",
-                (recipient,)
-            )
-            rec = cur.fetchone()
-            if not rec:
-                QMessageBox.warning(self, "Error", "Recipient not found.")
-                return
-
-            rec_id, rec_balance = rec
-            new_balance = old_balance - amount
-
-            cur.execute(
-                "UPDATE accounts SET balance=? WHERE id=?",
-                (new_balance, self.account_id)
-            )
-            cur.execute(
-                "UPDATE accounts SET balance=? WHERE id=?",
-                (rec_balance + amount, rec_id)
-            )
-            cur.execute(
-                "INSERT INTO transactions(account_id, amount, type) VALUES(?,?,?)",
-                (self.account_id, amount, "TRANSFER")
-            )
-            con.commit()
-
-        log_event(self.account_id, "TRANSFER", amount, f"To {recipient}")
-        self._finish("Transfer Funds", amount, old_balance, new_balance, recipient)
+        posting = self._post("transfer", amount, recipient)
+        return self._finish(posting)
 
     # -------------------------------------------------
     # Bill Payment
     # -------------------------------------------------
+    @metrics.timed("kiosk_posting_seconds", "Posting latency", kind="bill")
     def _process_bill(self, amount):
-        bill_ref = self.account_input.text().strip()
+        bill_ref = self.account_input.value()
         if not bill_ref:
             QMessageBox.warning(self, "Error", "Bill reference required.")
             return
 
-        with get_conn() as con:
-            cur = con.cursor()
-            cur.execute("SELECT balance FROM accounts WHERE id=?", (self.account_id,))
-            old_balance = cur.fetchone()[0]
-
-            if amount > old_balance:
-                QMessageBox.warning(self, "Error", "Insufficient balance.")
-                return
+        posting = self._post("bill", amount, bill_ref)
+        if not posting["duplicate"]:
+            self._schedule_bill(bill_ref, amount)
+        return self._finish(posting)
 
-            new_balance = old_balance - amount
+    def _schedule_bill(self, bill_ref, amount):
+        interval_days = self.repeat_input.currentData()
+        if not interval_days:
+            return
 
-            cur.execute(
-                "UPDATE accounts SET balance=? WHERE id=?",
-                (new_balance, self.account_id)
-            )
-            cur.execute(
-                "INSERT INTO transactions(account_id, amount, type) VALUES(?,?,?)",
-                (self.account_id, amount, "BILL_PAYMENT")
+        try:
+            backend.schedule_bill(self.account_id, bill_ref, amount, interval_days)
+        except Exception:
+            # Today's payment went through; only the repeat is lost
+            traceback.print_exc()
+            QMessageBox.warning(
+                self, "Schedule", "Payment made, but it could not be scheduled."
             )
-            con.commit()
-
-        log_event(self.account_id, "BILL_PAYMENT", amount, bill_ref)
-        self._finish("Bill Payment", amount, old_balance, new_balance, bill_ref)
 
     # -------------------------------------------------
     # Cash Deposit
     # -------------------------------------------------
+    @metrics.timed("kiosk_posting_seconds", "Posting latency", kind="deposit")
     def _process_deposit(self, amount):
-        with get_conn() as con:
-            cur = con.cursor()
-            cur.execute("SELECT balance FROM accounts WHERE id=?", (self.account_id,))
-            old_balance = cur.fetchone()[0]
-
-            new_balance = old_balance + amount
+        # Counted cash: the whole count is one posting, notes kept with it
+        notes = notes_text(self.cash["notes"]) if self.cash else ""
+        posting = self._post("deposit", amount, notes)
+        self.cash = None
+        return self._finish(posting)
 
-            cur.execute(
-                "UPDATE accounts SET balance=? WHERE id=?",
-                (new_balance, self.account_id)
-            )
-            cur.execute(
-                "INSERT INTO transactions(account_id, amount, type) VALUES(?,?,?)",
-                (self.account_id, amount, "CASH_DEPOSIT")
+    # -------------------------------------------------
+    # Posting under an intent (see database.intents)
+    # -------------------------------------------------
+    def _post(self, kind, amount, target=""):
+        intents.begin(self.request_key, self.account_id, kind, amount, target)
+        try:
+            posting = backend.post(
+                self.account_id, kind, amount, target, self.request_key
             )
-            con.commit()
+        except (PostingError, DatabaseBusy) as e:
+            intents.fail(self.request_key, str(e))
+            raise
 
-        log_event(self.account_id, "CASH_DEPOSIT", amount)
-        self._finish("Cash Deposit", amount, old_balance, new_balance)
+        # The money has moved: a busy database from here on only delays
+        # the bookkeeping, which boot recovery finishes from the intent
+        try:
+            # False when an earlier submit of this key was already audited
+            if intents.posted(self.request_key, posting):
+                backend.audit(self.account_id, *intents.audit_entry(posting))
+                intents.audited(self.request_key)
+        except DatabaseBusy:
+            self._defer_intent()
+        return posting
+
+    def _defer_intent(self):
+        traceback.print_exc()
+        metrics.counter(
+            "kiosk_intents_deferred_total", "Intents left open for boot recovery"
+        ).inc()
 
     # -------------------------------------------------
     # Finish → Receipt
     # -------------------------------------------------
-    def _finish(self, tx_type, amount, old, new, recipient=None):
-        receipt = {
-            "type": tx_type,
-            "amount": amount,
-            "old_balance": old,
-            "new_balance": new,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-
-        if recipient:
-            receipt["recipient"] = recipient
-
-        QMessageBox.information(self, "Success", f"{tx_type} completed.")
+    def _finish(self, posting):
+        prefetcher.invalidate(self.account_id)
+
+        # A duplicate submit gets the original receipt back
+        receipt = intents.receipt(posting)
+
+        QMessageBox.information(self, "Success", f"{receipt['type']} completed.")
         self.next_callback(receipt)
+        try:
+            intents.close(self.request_key)
+        except DatabaseBusy:
+            # recovery only re-issues the receipt
+            self._defer_intent()
+        return True
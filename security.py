@@ -2,6 +2,8 @@
 import os
 import hashlib
 
+import metrics
+
 ITERATIONS = 100_000
 
 def hash_pin(pin: str):
@@ -16,6 +18,7 @@ def hash_pin(pin: str):
     return salt + hash_bytes
 
 
+@metrics.timed("kiosk_verify_pin_seconds", "PBKDF2 PIN verification time")
 def verify_pin(pin: str, stored_hex: str) -> bool:
     data = bytes.fromhex(stored_hex)
     salt = data[:16]
@@ -0,0 +1,66 @@
+# services/fx_feed.py
+"""
+Local stand-in for an FX rate feed.
+
+    python -m services.fx_feed --port 8767
+
+GET /rates returns {"rates": {...}} in units of PHP per unit of each
+currency. Every request moves each rate by a small random step.
+"""
+import argparse
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from database.fx import BASE_CURRENCY, DEFAULT_RATES
+
+STEP = 0.002
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/rates":
+            self.send_error(404)
+            return
+
+        body = json.dumps({"rates": self.server.tick()}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+class FxFeed(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr):
+        super().__init__(addr, FeedHandler)
+        self.rates = dict(DEFAULT_RATES)
+        self.lock = threading.Lock()
+
+    def tick(self):
+        with self.lock:
+            for currency in self.rates:
+                if currency != BASE_CURRENCY:
+                    self.rates[currency] *= 1 + random.uniform(-STEP, STEP)
+            return {c: round(r, 6) for c, r in self.rates.items()}
+
+
+def serve(port=0):
+    """Start a feed on a background thread and return it."""
+    server = FxFeed(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    FxFeed(("127.0.0.1", args.port)).serve_forever()
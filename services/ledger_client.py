@@ -0,0 +1,120 @@
+# services/ledger_client.py
+import json
+import socket
+import threading
+
+from database.ledger import PostingError
+
+
+class LedgerUnavailable(OSError):
+    """The ledger service could not be reached or failed the request."""
+
+
+class LedgerClient:
+    """
+    Blocking client for services.ledger_service.
+    Exposes the same functions as database.ledger so the screens
+    don't care which one they are talking to.
+    """
+    TIMEOUT = 10.0
+
+    def __init__(self, addr):
+        host, port = addr.rsplit(":", 1)
+        self.addr = (host, int(port))
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------
+    # API (mirrors database.ledger)
+    # -------------------------------------------------
+    def authenticate(self, card_number, pin):
+        user = self._call("authenticate", True, card_number=card_number, pin=pin)
+        return tuple(user) if user else None
+
+    def account(self, account_id):
+        row = self._call("account", True, account_id=account_id)
+        return tuple(row) if row else None
+
+    def history(self, account_id, limit=20):
+        return [tuple(r) for r in self._call(
+            "history", True, account_id=account_id, limit=limit
+        )]
+
+    def remaining_limit(self, account_id, kind):
+        return self._call(
+            "remaining_limit", True, account_id=account_id, kind=kind
+        )
+
+    def lookup_requests(self, request_keys):
+        return self._call(
+            "lookup_requests", True, request_keys=list(request_keys)
+        )
+
+    def post(self, account_id, kind, amount, target="", request_key=None):
+        return self._call(
+            "post", False,
+            account_id=account_id, kind=kind, amount=amount, target=target,
+            request_key=request_key
+        )
+
+    def schedule_bill(self, account_id, bill_ref, amount, interval_days):
+        return self._call(
+            "schedule_bill", False,
+            account_id=account_id, bill_ref=bill_ref, amount=amount,
+            interval_days=interval_days
+        )
+
+    def audit(self, account_id, event_type, amount=0.0, details=""):
+        self._call(
+            "audit", False,
+            account_id=account_id, event_type=event_type,
+            amount=amount, details=details
+        )
+
+    def audit_many(self, entries):
+        self._call("audit_many", False, entries=[list(e) for e in entries])
+
+    # -------------------------------------------------
+    # Transport
+    # -------------------------------------------------
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+        self._sock = self._file = None
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.addr, timeout=self.TIMEOUT)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile("rwb")
+
+    def _call(self, op, retry, **args):
+        line = json.dumps({"op": op, "args": args}).encode() + b"\n"
+
+        with self._lock:
+            # Only reads are retried here: a write may have been applied
+            # even though the reply was lost. Postings are safe to resubmit
+            # by the caller with the same request_key.
+            for attempt in range(2 if retry else 1):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._file.write(line)
+                    self._file.flush()
+                    reply = self._file.readline()
+                    if not reply:
+                        raise ConnectionError("Ledger closed the connection")
+                    break
+                except OSError as e:
+                    self.close()
+                    error = e
+            else:
+                raise LedgerUnavailable(str(error))
+
+        reply = json.loads(reply)
+        if reply["ok"]:
+            return reply["result"]
+        if reply.get("posting"):
+            raise PostingError(reply["error"])
+        raise LedgerUnavailable(reply["error"])
@@ -0,0 +1,213 @@
+# services/ledger_service.py
+"""
+Central ledger service for multi-kiosk deployments.
+
+    python -m services.ledger_service --port 8766 --db database/kiosk.db
+
+Kiosks send one JSON object per line over TCP:
+    {"op": "post", "args": {...}}  ->  {"ok": true, "result": ...}
+
+Reads run concurrently on a small thread pool, each thread with its own
+connection. Writes are queued to a single writer task that applies them in
+group commits, one savepoint per request, so a refused posting never rolls
+back its neighbours. Scheduled bills are paid here too, by a BillRunner
+thread: kiosks pointed at the service don't run their own.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from database import db, fx, idempotency, journal, ledger, limits, risk, scheduled
+from database.ledger import PostingError, PostingHeld
+
+READ_OPS = {
+    "authenticate": ledger.authenticate,
+    "account": ledger.account,
+    "history": ledger.history,
+    "remaining_limit": ledger.remaining_limit,
+    "lookup_requests": ledger.lookup_requests,
+}
+
+WRITE_OPS = {
+    "post": ledger.post,
+    "schedule_bill": ledger.schedule_bill,
+    "audit": ledger.audit,
+    "audit_many": ledger.audit_many,
+}
+
+
+class LedgerService:
+    READ_WORKERS = 8
+    MAX_BATCH = 128
+
+    def __init__(self, host="127.0.0.1", port=8766):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.queue = None
+        self.requests = 0
+
+        self._local = threading.local()
+        self._read_pool = ThreadPoolExecutor(self.READ_WORKERS, "ledger-read")
+        self._write_pool = ThreadPoolExecutor(1, "ledger-write")
+        self._write_con = None
+
+    # -------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------
+    async def start(self):
+        journal.init_db()
+        ledger.init_db()
+        idempotency.init_db()
+        limits.init_db()
+        scheduled.init_db()
+        risk.install()
+        scheduled.start_background()
+        fx.watch()
+        self.queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer())
+        self.server = await asyncio.start_server(
+            self._handle, self.host, self.port
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self._writer_task.cancel()
+        self._read_pool.shutdown()
+        self._write_pool.shutdown()
+
+    # -------------------------------------------------
+    # Connections
+    # -------------------------------------------------
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = await self._dispatch(line)
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, line):
+        self.requests += 1
+        try:
+            req = json.loads(line)
+            op = req["op"]
+            args = req.get("args", {})
+
+            if op in READ_OPS:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self._read_pool, self._read, READ_OPS[op], args
+                )
+            elif op in WRITE_OPS:
+                fut = asyncio.get_running_loop().create_future()
+                await self.queue.put((WRITE_OPS[op], args, fut))
+                result = await fut
+            else:
+                return {"ok": False, "error": f"Unknown op {op!r}"}
+
+            return {"ok": True, "result": result}
+
+        except PostingError as e:
+            return {"ok": False, "error": str(e), "posting": True}
+        except Exception as e:
+            traceback.print_exc()
+            return {"ok": False, "error": str(e)}
+
+    # -------------------------------------------------
+    # Reads (thread pool)
+    # -------------------------------------------------
+    def _read(self, fn, args):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._local.con = db.get_conn()
+        try:
+            return fn(conn=con, **args)
+        finally:
+            # end the implicit read transaction so the snapshot moves on
+            con.rollback()
+
+    # -------------------------------------------------
+    # Writes (single writer)
+    # -------------------------------------------------
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.MAX_BATCH and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            try:
+                results = await loop.run_in_executor(
+                    self._write_pool, self._apply, batch
+                )
+            except Exception as e:
+                results = [e] * len(batch)
+
+            for (_, _, fut), res in zip(batch, results):
+                if fut.done():
+                    continue
+                if isinstance(res, Exception):
+                    fut.set_exception(res)
+                else:
+                    fut.set_result(res)
+
+    def _apply(self, batch):
+        if self._write_con is None:
+            self._write_con = db.get_conn()
+            self._write_con.isolation_level = None
+
+        con = self._write_con
+        results = []
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for fn, args, _ in batch:
+                con.execute("SAVEPOINT req")
+                try:
+                    results.append(fn(conn=con, **args))
+                    con.execute("RELEASE req")
+                except Exception as e:
+                    con.execute("ROLLBACK TO req")
+                    con.execute("RELEASE req")
+                    if isinstance(e, PostingHeld):
+                        ledger.held(args["account_id"], args["amount"], e, conn=con)
+                    results.append(e)
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            for (fn, args, _), res in zip(batch, results):
+                if fn is ledger.post and isinstance(res, dict):
+                    ledger.rolled_back(args["account_id"], res)
+            raise
+
+        for (fn, args, _), res in zip(batch, results):
+            if fn is ledger.post and isinstance(res, dict):
+                ledger.committed(args["account_id"], res, args.get("request_key"))
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--db", default=db.DB_PATH)
+    args = parser.parse_args()
+
+    db.DB_PATH = args.db
+    asyncio.run(LedgerService(args.host, args.port).serve_forever())
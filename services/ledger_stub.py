@@ -0,0 +1,112 @@
+# services/ledger_stub.py
+"""
+Local stand-in for the central ledger.
+
+    python -m services.ledger_stub --port 8765 --db ledger.db
+"""
+import argparse
+import gzip
+import json
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledger_entries (
+    entry_key TEXT PRIMARY KEY,
+    kiosk_id TEXT NOT NULL,
+    account_id INTEGER,
+    type TEXT NOT NULL,
+    amount REAL DEFAULT 0,
+    details TEXT,
+    currency TEXT,
+    credit_amount REAL,
+    credit_currency TEXT,
+    fx_version INTEGER,
+    created_at DATETIME,
+    received_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Added with per-account currencies; kiosks journalling before them
+# send entries without these fields
+FX_COLUMNS = (
+    ("currency", "TEXT"),
+    ("credit_amount", "REAL"),
+    ("credit_currency", "TEXT"),
+    ("fx_version", "INTEGER"),
+)
+
+
+class LedgerHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != "/journal":
+            self.send_error(404)
+            return
+
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+
+        try:
+            entries = json.loads(raw.decode())["entries"]
+        except (ValueError, KeyError):
+            self.send_error(400)
+            return
+
+        accepted = self.server.apply(entries)
+
+        body = json.dumps({"accepted": accepted}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+class LedgerStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, db_path):
+        super().__init__(addr, LedgerHandler)
+        self.con = sqlite3.connect(db_path, check_same_thread=False)
+        self.con.executescript(SCHEMA)
+        cols = [r[1] for r in self.con.execute("PRAGMA table_info(ledger_entries)")]
+        for name, decl in FX_COLUMNS:
+            if name not in cols:
+                self.con.execute(f"ALTER TABLE ledger_entries ADD COLUMN {name} {decl}")
+        self.con.commit()
+        self.lock = threading.Lock()
+
+    def apply(self, entries):
+        # INSERT OR IGNORE makes replays idempotent: a key already
+        # stored is still reported back as accepted
+        with self.lock, self.con:
+            self.con.executemany("""
+                INSERT OR IGNORE INTO ledger_entries
+                    (entry_key, kiosk_id, account_id, type, amount, details,
+                     currency, credit_amount, credit_currency, fx_version, created_at)
+                VALUES
+                    (:entry_key, :kiosk_id, :account_id, :type, :amount, :details,
+                     :currency, :credit_amount, :credit_currency, :fx_version, :created_at)
+            """, [dict({name: None for name, _ in FX_COLUMNS}, **e) for e in entries])
+        return [e["entry_key"] for e in entries]
+
+
+def serve(port=0, db_path=":memory:"):
+    """Start a stub on a background thread and return it."""
+    server = LedgerStub(("127.0.0.1", port), db_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="ledger.db")
+    args = parser.parse_args()
+
+    LedgerStub(("127.0.0.1", args.port), args.db).serve_forever()
@@ -0,0 +1,100 @@
+# services/sync_agent.py
+import gzip
+import json
+import random
+import threading
+import traceback
+import urllib.error
+import urllib.request
+
+from database import journal
+
+
+class SyncAgent(threading.Thread):
+    """
+    Ships the local journal to the central ledger in batches.
+    The ledger dedupes on entry_key, so replaying a batch after a
+    lost response is harmless.
+    """
+    BATCH_SIZE = 500
+    INTERVAL = 5.0
+    BACKOFF_BASE = 1.0
+    BACKOFF_MAX = 300.0
+    TIMEOUT = 10.0
+
+    def __init__(self, url):
+        super().__init__(daemon=True)
+        self.url = url.rstrip("/") + "/journal"
+        self.failures = 0
+        self.shipped = 0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    # -------------------------------------------------
+    # Control
+    # -------------------------------------------------
+    def poke(self):
+        """Ship as soon as possible (e.g. right after a posting)."""
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                self.sync_once()
+                self.failures = 0
+                delay = self.INTERVAL
+            except (urllib.error.URLError, OSError, ValueError):
+                self.failures += 1
+                delay = self._backoff()
+            except Exception:
+                traceback.print_exc()
+                self.failures += 1
+                delay = self._backoff()
+
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def _backoff(self):
+        ceiling = min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** self.failures)
+        return random.uniform(ceiling / 2, ceiling)
+
+    # -------------------------------------------------
+    # Shipping
+    # -------------------------------------------------
+    def sync_once(self):
+        """Drain the journal. Returns the number of entries shipped."""
+        total = 0
+        while not self._stopping.is_set():
+            batch = journal.pending(self.BATCH_SIZE)
+            if not batch:
+                break
+
+            accepted = self._ship(batch)
+            journal.mark_shipped(accepted)
+            total += len(accepted)
+
+            if len(accepted) < len(batch):
+                # Ledger refused part of the batch; retry later
+                raise ValueError("Ledger accepted a partial batch")
+
+        self.shipped += total
+        return total
+
+    def _ship(self, batch):
+        body = gzip.compress(json.dumps({"entries": batch}).encode())
+        req = urllib.request.Request(
+            self.url,
+            data=body,
+            method="POST",
+            headers={
+                "Content-Type": "application/json",
+                "Content-Encoding": "gzip",
+            }
+        )
+        with urllib.request.urlopen(req, timeout=self.TIMEOUT) as resp:
+            reply = json.loads(resp.read().decode())
+        return reply.get("accepted", [])
@@ -0,0 +1,146 @@
+# tracing.py
+"""
+Screen transition tracing in Chrome trace format.
+
+Each session streams events to logs/trace-<time>.json; open it in
+chrome://tracing or ui.perfetto.dev. The file is a JSON array written
+without its closing bracket, which both viewers accept, so a crash never
+loses what was already recorded.
+
+Per navigation two spans are emitted from the tap (the go_* call):
+    first_paint:<screen>   until the target screen receives its first paint
+    data_ready:<screen>    until the screen reports its data is on screen
+where <screen> is the target widget's class (e.g. TransactionHistoryScreen);
+the go_* call itself is the nav:<name> span.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_DIR = os.environ.get("KIOSK_TRACE_DIR", "logs")
+
+_session = None
+
+
+def now():
+    """Trace clock in microseconds."""
+    return time.perf_counter_ns() // 1000
+
+
+class TraceSession:
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self.pending = {}
+        self.ready = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "w", buffering=1)
+        self._file.write("[\n")
+        self.emit({
+            "name": "process_name", "ph": "M", "pid": self.pid,
+            "args": {"name": "kiosk"}
+        })
+
+    def emit(self, event):
+        line = json.dumps(event) + ",\n"
+        with self._lock:
+            self._file.write(line)
+
+    def complete(self, name, cat, start, end=None, args=None):
+        event = {
+            "name": name, "cat": cat, "ph": "X",
+            "ts": start, "dur": (end or now()) - start,
+            "pid": self.pid, "tid": threading.get_ident()
+        }
+        if args:
+            event["args"] = args
+        self.emit(event)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+# -------------------------------------------------
+# Module API (no-ops while tracing is off)
+# -------------------------------------------------
+def start(path=None):
+    global _session
+    if path is None:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(TRACE_DIR, f"trace-{stamp}.json")
+    _session = TraceSession(path)
+    return _session
+
+
+def stop():
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
+
+
+def active():
+    return _session is not None
+
+
+@contextmanager
+def span(name, cat="db", **args):
+    if _session is None:
+        yield
+        return
+    start_ts = now()
+    try:
+        yield
+    finally:
+        _session.complete(name, cat, start_ts, args=args or None)
+
+
+def transition(name, target, start_ts):
+    """A go_* call for `name` finished and `target` is now current."""
+    if _session is None:
+        return
+    _session.complete(f"nav:{name}", "nav", start_ts)
+
+    # Spans name the screen shown, not the go_* call: several screens
+    # are reached through one (e.g. go_transaction)
+    screen = type(target).__name__
+
+    # pending[target] = [screen, start_ts, painted, data ready], dropped
+    # once both spans are out
+    ready_ts = _session.ready.pop(target, None)
+    if ready_ts is not None and ready_ts >= start_ts:
+        # data rendered synchronously inside the go_* call (e.g. from cache)
+        _session.complete(f"data_ready:{screen}", "nav", start_ts, ready_ts)
+        _session.pending[target] = [screen, start_ts, False, True]
+        return
+
+    _session.pending[target] = [screen, start_ts, False, False]
+
+
+def painted(target):
+    if _session is None:
+        return
+    entry = _session.pending.get(target)
+    if entry and not entry[2]:
+        entry[2] = True
+        _session.complete(f"first_paint:{entry[0]}", "nav", entry[1])
+        if entry[3]:
+            del _session.pending[target]
+
+
+def data_ready(target):
+    if _session is None:
+        return
+    entry = _session.pending.get(target)
+    if entry and not entry[3]:
+        entry[3] = True
+        _session.complete(f"data_ready:{entry[0]}", "nav", entry[1])
+        if entry[2]:
+            del _session.pending[target]
+    else:
+        _session.ready[target] = now()
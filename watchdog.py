@@ -0,0 +1,160 @@
+# watchdog.py
+"""
+GUI event-loop stall watchdog.
+
+A QTimer on the main thread stamps a heartbeat every HEARTBEAT_MS. A
+daemon thread watches the stamp; once it is more than the threshold
+late it captures the main thread's Python stack (sys._current_frames)
+and the screen that was showing. When the event loop comes back the
+stall is timed, added to the kiosk_gui_stall_seconds histogram and
+written to logs/stalls.log (rotated).
+
+Stalls still going after HANG_SECONDS are written straight away, so a
+kiosk that is power-cycled while frozen still leaves a report.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from PyQt5.QtCore import QObject, QTimer
+
+import metrics
+
+STALL_MS = int(os.environ.get("KIOSK_STALL_MS", "500"))
+LOG_PATH = os.environ.get("KIOSK_STALL_LOG", "logs/stalls.log")
+LOG_BYTES = 1024 * 1024
+LOG_BACKUPS = 5
+
+HEARTBEAT_MS = 100
+HANG_SECONDS = 15
+RECENT_MAX = 50
+
+STALL_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+def _logger(path):
+    log = logging.getLogger("kiosk.stalls")
+    if not log.handlers:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        handler = RotatingFileHandler(
+            path, maxBytes=LOG_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    return log
+
+
+class StallWatchdog(QObject):
+    """Create on the main thread; current_screen() returns the shown widget."""
+
+    def __init__(self, current_screen, threshold_ms=STALL_MS, parent=None):
+        super().__init__(parent)
+        self.current_screen = current_screen
+        self.threshold = threshold_ms / 1000.0
+        self.histograms = {}             # screen name -> metrics.Histogram
+        self.recent = deque(maxlen=RECENT_MAX)
+
+        self._main_ident = threading.get_ident()
+        self._beat = time.monotonic()
+        self._screen = ""
+        self._capture = None             # taken by the watcher mid-stall
+        self._lock = threading.Lock()
+        self._log = _logger(LOG_PATH)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(HEARTBEAT_MS)
+        self.timer.timeout.connect(self._heartbeat)
+        self.timer.start()
+
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._watch, daemon=True, name="gui-watchdog"
+        )
+        self._thread.start()
+
+    def stop(self):
+        self.timer.stop()
+        self._stopping.set()
+
+    def histogram(self, screen):
+        hist = self.histograms.get(screen)
+        if hist is None:
+            hist = self.histograms[screen] = metrics.histogram(
+                "kiosk_gui_stall_seconds", "GUI event loop stalls",
+                buckets=STALL_BUCKETS, screen=screen
+            )
+        return hist
+
+    # -------------------------------------------------
+    # Main thread
+    # -------------------------------------------------
+    def _heartbeat(self):
+        now = time.monotonic()
+        late = now - self._beat - HEARTBEAT_MS / 1000.0
+        self._beat = now
+        widget = self.current_screen()
+        self._screen = type(widget).__name__ if widget is not None else ""
+
+        if late < self.threshold:
+            return
+        with self._lock:
+            capture, self._capture = self._capture, None
+        if capture is None:
+            # watcher didn't get to it (stall right at the threshold)
+            capture = {"screen": self._screen, "stack": [], "reported": False}
+
+        self.histogram(capture["screen"]).observe(late)
+        self._report(capture, late, ongoing=False)
+
+    # -------------------------------------------------
+    # Watcher thread
+    # -------------------------------------------------
+    def _watch(self):
+        poll = min(0.05, self.threshold / 4)
+        while not self._stopping.wait(poll):
+            beat = self._beat
+            late = time.monotonic() - beat - HEARTBEAT_MS / 1000.0
+            if late < self.threshold:
+                continue
+
+            with self._lock:
+                capture = self._capture
+                if capture is None or capture["beat"] != beat:
+                    frame = sys._current_frames().get(self._main_ident)
+                    capture = self._capture = {
+                        "beat": beat,
+                        "screen": self._screen,
+                        "stack": traceback.format_stack(frame) if frame else [],
+                        "reported": False,
+                    }
+                if late >= HANG_SECONDS and not capture["reported"]:
+                    capture["reported"] = True
+                    self._report(capture, late, ongoing=True)
+
+    # -------------------------------------------------
+    # Reports
+    # -------------------------------------------------
+    def _report(self, capture, seconds, ongoing):
+        stack = [line.rstrip() for line in capture["stack"]]
+        entry = {
+            "ts": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "screen": capture["screen"],
+            "seconds": round(seconds, 3),
+            "ongoing": ongoing,
+            "where": stack[-1].strip().splitlines()[0] if stack else "",
+            "stack": stack,
+        }
+        if not ongoing:
+            self.recent.append(entry)
+        try:
+            self._log.info(json.dumps(entry))
+        except Exception:
+            traceback.print_exc()
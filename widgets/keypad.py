@@ -0,0 +1,280 @@
+# widgets/keypad.py
+"""
+On-screen numeric keypad.
+
+Both widgets are built once with their screen and reused for every
+session: reset() only clears text, nothing is created per login.
+
+    field = KeypadField("card", "Card Number")
+    keypad = Keypad()
+    keypad.bind(field)
+    keypad.entered.connect(self.submit)
+
+A KeypadField keeps the raw digits and renders them for its mode:
+
+    pin     masked, at most PIN_MAX digits
+    amount  thousands separators, two decimals at most, optional prefix
+    card    grouped in fours, at most CARD_MAX digits
+    digits  plain digits (account numbers)
+    text    upper-case letters, digits, '-' and '/' (bill references);
+            the keypad shows its letter panel while one is attached
+
+A physical keyboard still works on the focused field.
+"""
+from PyQt5.QtWidgets import (
+    QWidget, QGridLayout, QVBoxLayout, QLabel, QPushButton, QSizePolicy
+)
+from PyQt5.QtCore import Qt, pyqtSignal
+
+PIN_MIN = 4                      # ISO 9564 PIN lengths; the admin
+PIN_MAX = 12                     # create-account form enforces them too
+CARD_MAX = 19
+DIGITS_MAX = 24
+TEXT_MAX = 32
+AMOUNT_INT_MAX = 9
+
+BACK = "⌫"
+CLEAR = "C"
+ENTER = "OK"
+POINT = "."
+
+LETTERS = ("QWERTYUIOP", "ASDFGHJKL-", "ZXCVBNM/")
+TEXT_KEYS = frozenset("".join(LETTERS))
+
+FIELD_STYLE = """
+    QLabel {
+        font-size:24px;
+        padding:10px;
+        border:2px solid %s;
+        border-radius:10px;
+        background:white;
+        color:%s;
+    }
+"""
+
+
+class KeypadField(QLabel):
+    changed = pyqtSignal(str)
+    activated = pyqtSignal(object)
+    submitted = pyqtSignal()
+    MODES = ("pin", "amount", "card", "digits", "text")
+
+    def __init__(self, mode="digits", placeholder="", parent=None):
+        super().__init__(parent)
+        self.setAlignment(Qt.AlignCenter)
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setMinimumWidth(300)
+
+        self.placeholder = placeholder
+        self.prefix = ""
+        self.active = False
+        self._raw = ""
+        self._style = None
+        self.set_mode(mode)
+
+    # -------------------------------------------------
+    # State
+    # -------------------------------------------------
+    def set_mode(self, mode, placeholder=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown keypad mode {mode!r}")
+        self.mode = mode
+        if placeholder is not None:
+            self.placeholder = placeholder
+        self.clear()
+
+    def set_placeholder(self, text):
+        self.placeholder = text
+        self._render()
+
+    def set_prefix(self, prefix):
+        """Shown before amounts, e.g. a currency symbol."""
+        self.prefix = prefix
+        self._render()
+
+    def set_active(self, active):
+        self.active = active
+        self._render()
+
+    def value(self):
+        return self._raw
+
+    def amount(self):
+        """The entered amount, or None if it isn't a positive number."""
+        try:
+            value = float(self._raw)
+        except ValueError:
+            return None
+        return value if value > 0 else None
+
+    def clear(self):
+        self._raw = ""
+        self._render()
+        self.changed.emit(self._raw)
+
+    def reset(self):
+        self.clear()
+
+    # -------------------------------------------------
+    # Input
+    # -------------------------------------------------
+    def press(self, key):
+        raw = self._raw
+        if key == BACK:
+            raw = raw[:-1]
+        elif key == CLEAR:
+            raw = ""
+        elif key == POINT:
+            if self.mode == "amount" and POINT not in raw:
+                raw = (raw or "0") + POINT
+        elif key.isdigit() or (self.mode == "text" and key in TEXT_KEYS):
+            raw = self._append(raw, key)
+
+        if raw != self._raw:
+            self._raw = raw
+            self._render()
+            self.changed.emit(raw)
+
+    def _append(self, raw, digit):
+        if self.mode == "pin":
+            return raw + digit if len(raw) < PIN_MAX else raw
+        if self.mode == "card":
+            return raw + digit if len(raw) < CARD_MAX else raw
+        if self.mode == "digits":
+            return raw + digit if len(raw) < DIGITS_MAX else raw
+        if self.mode == "text":
+            return raw + digit if len(raw) < TEXT_MAX else raw
+
+        whole, point, cents = raw.partition(POINT)
+        if point:
+            return raw + digit if len(cents) < 2 else raw
+        if whole == "0":
+            return digit
+        return raw + digit if len(whole) < AMOUNT_INT_MAX else raw
+
+    def keyPressEvent(self, event):
+        key = event.key()
+        if Qt.Key_0 <= key <= Qt.Key_9:
+            self.press(event.text())
+        elif key == Qt.Key_Backspace:
+            self.press(BACK)
+        elif key == Qt.Key_Period:
+            self.press(POINT)
+        elif key in (Qt.Key_Return, Qt.Key_Enter):
+            self.submitted.emit()
+        elif key == Qt.Key_Escape:
+            event.ignore()
+        elif self.mode == "text" and event.text().upper() in TEXT_KEYS:
+            self.press(event.text().upper())
+        else:
+            super().keyPressEvent(event)
+
+    def mousePressEvent(self, event):
+        self.activated.emit(self)
+        super().mousePressEvent(event)
+
+    # -------------------------------------------------
+    # Rendering
+    # -------------------------------------------------
+    def display_text(self):
+        raw = self._raw
+        if self.mode == "pin":
+            return " ".join("●" * len(raw))
+        if self.mode == "card":
+            return " ".join(raw[i:i + 4] for i in range(0, len(raw), 4))
+        if self.mode == "amount":
+            whole, point, cents = raw.partition(POINT)
+            return f"{self.prefix}{int(whole or 0):,}{point}{cents}"
+        return raw
+
+    def _render(self):
+        # restyling re-polishes the widget: only when the look changes
+        style = (self.active, bool(self._raw))
+        if style != self._style:
+            self._style = style
+            self.setStyleSheet(FIELD_STYLE % (
+                "#0d6efd" if self.active else "#ced4da",
+                "#212529" if self._raw else "#adb5bd"
+            ))
+        self.setText(self.display_text() if self._raw else self.placeholder)
+
+
+class Keypad(QWidget):
+    """
+    3x4 digit grid plus a bottom row, and a letter panel for text
+    fields; routes presses to the attached field.
+    """
+    entered = pyqtSignal()
+
+    ROWS = (
+        ("1", "2", "3"),
+        ("4", "5", "6"),
+        ("7", "8", "9"),
+        (POINT, "0", BACK),
+        (CLEAR, ENTER),
+    )
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.field = None
+        self.buttons = {}
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(8)
+
+        self.letters = QWidget()
+        letters = QGridLayout(self.letters)
+        letters.setContentsMargins(0, 0, 0, 0)
+        letters.setSpacing(4)
+        for r, row in enumerate(LETTERS):
+            for c, key in enumerate(row):
+                letters.addWidget(self._button(key, 40, 52, 18), r, c)
+        self.letters.hide()
+        layout.addWidget(self.letters)
+
+        grid = QGridLayout()
+        grid.setSpacing(8)
+        for r, row in enumerate(self.ROWS):
+            span = 3 // len(row)
+            for c, key in enumerate(row):
+                grid.addWidget(self._button(key, 90, 64, 24), r, c * span, 1, span)
+        layout.addLayout(grid)
+
+        self.buttons[ENTER].setStyleSheet(
+            "font-size:24px;font-weight:bold;border-radius:10px;"
+            "background:#0d6efd;color:white;"
+        )
+
+    def _button(self, key, width, height, font_size):
+        btn = QPushButton(key)
+        btn.setFocusPolicy(Qt.NoFocus)   # keep focus on the field
+        btn.setMinimumSize(width, height)
+        btn.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        btn.setStyleSheet(f"font-size:{font_size}px;font-weight:bold;border-radius:10px;")
+        btn.clicked.connect(lambda _=False, k=key: self.press(k))
+        self.buttons[key] = btn
+        return btn
+
+    def bind(self, *fields):
+        """Fields this keypad can type into; the first one starts active."""
+        for field in fields:
+            field.activated.connect(self.attach)
+            field.submitted.connect(self.entered)
+        self.attach(fields[0])
+
+    def attach(self, field):
+        """Send presses to `field` (tapping a bound field does this too)."""
+        if self.field is not None and self.field is not field:
+            self.field.set_active(False)
+        self.field = field
+        field.set_active(True)
+        field.setFocus()
+        self.buttons[POINT].setEnabled(field.mode == "amount")
+        self.letters.setVisible(field.mode == "text")
+
+    def press(self, key):
+        if key == ENTER:
+            self.entered.emit()
+        elif self.field is not None:
+            self.field.press(key)